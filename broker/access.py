@@ -0,0 +1,151 @@
+"""
+Access grant maintenance
+Keeps the AccessGrant table in step with business ownership, business
+membership and campaign collaboration, so list endpoints can filter with one
+indexed semi-join instead of OR-ing across several join paths
+"""
+from itertools import chain
+
+from django.db import transaction
+
+from .models import AccessGrant, BusinessMember, BusinessProfile, Campaign, CampaignCollaborator
+
+BUSINESS = AccessGrant.ObjectType.BUSINESS
+CAMPAIGN = AccessGrant.ObjectType.CAMPAIGN
+Role = AccessGrant.GrantRole
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def accessible_ids(user, object_type, roles=None):
+    """Subquery of object ids of `object_type` the user holds a grant on"""
+    grants = AccessGrant.objects.filter(user=user, object_type=object_type)
+    if roles:
+        grants = grants.filter(role__in=roles)
+    return grants.values('object_id')
+
+
+def _sync(existing, desired):
+    """
+    Make the grants matched by `existing` equal to the `desired` set of
+    (user_id, object_type, object_id, role) tuples
+    """
+    current = {
+        (user_id, object_type, object_id, role): pk
+        for pk, user_id, object_type, object_id, role in existing.values_list(
+            'pk', 'user_id', 'object_type', 'object_id', 'role'
+        )
+    }
+    stale = [pk for key, pk in current.items() if key not in desired]
+    if stale:
+        AccessGrant.objects.filter(pk__in=stale).delete()
+    AccessGrant.objects.bulk_create(
+        [_grant(row) for row in desired if row not in current],
+        ignore_conflicts=True,
+    )
+
+
+def _grant(row):
+    user_id, object_type, object_id, role = row
+    return AccessGrant(user_id=user_id, object_type=object_type, object_id=object_id, role=role)
+
+
+@transaction.atomic
+def sync_business_owner(business_id):
+    """Re-point the owner grants of a business and its campaigns"""
+    owner_id = BusinessProfile.objects.filter(pk=business_id).values_list('user_id', flat=True).first()
+    campaign_ids = list(Campaign.objects.filter(business_id=business_id).values_list('pk', flat=True))
+    _sync(
+        AccessGrant.objects.filter(object_type=BUSINESS, object_id=business_id, role=Role.BUSINESS_OWNER),
+        {(owner_id, BUSINESS, business_id, Role.BUSINESS_OWNER)} if owner_id else set(),
+    )
+    _sync(
+        AccessGrant.objects.filter(object_type=CAMPAIGN, object_id__in=campaign_ids, role=Role.BUSINESS_OWNER),
+        {(owner_id, CAMPAIGN, pk, Role.BUSINESS_OWNER) for pk in campaign_ids} if owner_id else set(),
+    )
+
+
+@transaction.atomic
+def sync_user_memberships(user_id):
+    """Recompute the business-member grants of one user"""
+    desired = {
+        (user_id, BUSINESS, business_id, Role.BUSINESS_MEMBER)
+        for business_id in BusinessMember.objects.filter(user_id=user_id).values_list('business_id', flat=True)
+    }
+    desired |= {
+        (user_id, CAMPAIGN, campaign_id, Role.BUSINESS_MEMBER)
+        for campaign_id in Campaign.objects.filter(
+            business__members__user_id=user_id
+        ).values_list('pk', flat=True)
+    }
+    _sync(AccessGrant.objects.filter(user_id=user_id, role=Role.BUSINESS_MEMBER), desired)
+
+
+@transaction.atomic
+def sync_user_collaborations(user_id):
+    """Recompute the campaign-collaborator grants of one user"""
+    desired = {
+        (user_id, CAMPAIGN, campaign_id, Role.COLLABORATOR)
+        for campaign_id in CampaignCollaborator.objects.filter(user_id=user_id).values_list('campaign_id', flat=True)
+    }
+    _sync(AccessGrant.objects.filter(user_id=user_id, role=Role.COLLABORATOR), desired)
+
+
+def _campaign_rows(campaigns):
+    """Desired grants for a queryset of campaigns"""
+    for campaign_id, owner_id in campaigns.filter(business__isnull=False).values_list(
+        'pk', 'business__user_id'
+    ).iterator(chunk_size=REBUILD_BATCH_SIZE):
+        yield (owner_id, CAMPAIGN, campaign_id, Role.BUSINESS_OWNER)
+    for campaign_id, member_id in campaigns.filter(business__members__isnull=False).values_list(
+        'pk', 'business__members__user_id'
+    ).iterator(chunk_size=REBUILD_BATCH_SIZE):
+        yield (member_id, CAMPAIGN, campaign_id, Role.BUSINESS_MEMBER)
+    for campaign_id, user_id in CampaignCollaborator.objects.filter(
+        campaign__in=campaigns
+    ).values_list('campaign_id', 'user_id').iterator(chunk_size=REBUILD_BATCH_SIZE):
+        yield (user_id, CAMPAIGN, campaign_id, Role.COLLABORATOR)
+
+
+def _business_rows(businesses):
+    """Desired grants for a queryset of businesses"""
+    for business_id, owner_id in businesses.values_list('pk', 'user_id').iterator(chunk_size=REBUILD_BATCH_SIZE):
+        yield (owner_id, BUSINESS, business_id, Role.BUSINESS_OWNER)
+    for business_id, user_id in BusinessMember.objects.filter(
+        business__in=businesses
+    ).values_list('business_id', 'user_id').iterator(chunk_size=REBUILD_BATCH_SIZE):
+        yield (user_id, BUSINESS, business_id, Role.BUSINESS_MEMBER)
+
+
+@transaction.atomic
+def sync_campaign_access(campaign_id):
+    """Recompute every grant on one campaign"""
+    _sync(
+        AccessGrant.objects.filter(object_type=CAMPAIGN, object_id=campaign_id),
+        set(_campaign_rows(Campaign.objects.filter(pk=campaign_id))),
+    )
+
+
+def revoke_object_access(object_type, object_id):
+    """Drop every grant on a deleted business or campaign"""
+    AccessGrant.objects.filter(object_type=object_type, object_id=object_id).delete()
+
+
+@transaction.atomic
+def rebuild_access_grants(batch_size=REBUILD_BATCH_SIZE):
+    """Recreate the whole table from the source relations; returns the number of grants"""
+    AccessGrant.objects.all().delete()
+    total = 0
+    batch = []
+    rows = chain(
+        _business_rows(BusinessProfile.objects.all()),
+        _campaign_rows(Campaign.objects.all()),
+    )
+    for row in rows:
+        batch.append(_grant(row))
+        if len(batch) >= batch_size:
+            AccessGrant.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    AccessGrant.objects.bulk_create(batch, ignore_conflicts=True)
+    return total + len(batch)
@@ -14,7 +14,7 @@ from .admin_dashboard import admin_dashboard_view
 from .models import (
     UserProfile, SocialLink, BusinessProfile, BusinessMember,
     Promotion, PromotionClaim, Transaction, Wallet,
-    KYCVerification, BusinessDocument, Campaign, CampaignCollaborator,
+    KYCVerification, BusinessDocument, DocumentImageHash, Campaign, CampaignCollaborator,
     CampaignProduct, Listing, Conversation, Message
 )
 
@@ -241,7 +241,7 @@ class PromotionAdmin(admin.ModelAdmin):
     raw_id_fields = ('business',)
     list_per_page = 25
     list_display_links = ('title',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('current_claims', 'created_at', 'updated_at')
     show_full_result_count = False
     
     fieldsets = (
@@ -275,8 +275,8 @@ class PromotionAdmin(admin.ModelAdmin):
 @admin.register(PromotionClaim)
 class PromotionClaimAdmin(admin.ModelAdmin):
     # Show claimant next to timestamp for quicker scanning
-    list_display = ('user_email', 'claimed_at', 'promotion_title', 'points', 'shared_count')
-    list_filter = ('claimed_at',)
+    list_display = ('user_email', 'claimed_at', 'promotion_title', 'status', 'points', 'shared_count')
+    list_filter = ('status', 'claimed_at')
     search_fields = ('promotion__title', 'user__email')
     date_hierarchy = 'claimed_at'
     raw_id_fields = ('promotion', 'user')
@@ -371,7 +371,7 @@ class KYCVerificationAdmin(admin.ModelAdmin):
     raw_id_fields = ('user', 'verified_by')
     list_per_page = 25
     list_display_links = ('user_email',)
-    readonly_fields = ('created_at', 'updated_at', 'verified_at')
+    readonly_fields = ('created_at', 'updated_at', 'verified_at', 'claimed_by', 'lease_expires_at')
     show_full_result_count = False
     
     fieldsets = (
@@ -382,7 +382,7 @@ class KYCVerificationAdmin(admin.ModelAdmin):
             'fields': ('document_type', 'document_number', 'document_front', 'document_back', 'selfie')
         }),
         ('Verification', {
-            'fields': ('status', 'rejection_reason', 'verified_by', 'verified_at')
+            'fields': ('status', 'rejection_reason', 'verified_by', 'verified_at', 'claimed_by', 'lease_expires_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -416,6 +416,17 @@ class KYCVerificationAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
     status_badge.admin_order_field = 'status'
 
+@admin.register(DocumentImageHash)
+class DocumentImageHashAdmin(admin.ModelAdmin):
+    list_display = ('user', 'source_field', 'kyc', 'business_document', 'duplicate_of', 'duplicate_distance', 'error', 'created_at')
+    list_filter = (('duplicate_of', admin.EmptyFieldListFilter), 'source_field', 'created_at')
+    search_fields = ('user__email', 'source_url')
+    raw_id_fields = ('user', 'kyc', 'business_document', 'duplicate_of')
+    list_select_related = ('user', 'kyc__user', 'business_document__user', 'duplicate_of')
+    readonly_fields = ('ahash', 'dhash', 'dhash_band0', 'dhash_band1', 'dhash_band2', 'dhash_band3', 'created_at', 'updated_at')
+    list_per_page = 25
+    show_full_result_count = False
+
 # BusinessDocument is now managed as inline in BusinessProfile
 # Removed separate admin registration to simplify UI
 
@@ -149,6 +149,7 @@ class PromotionAdmin(admin.ModelAdmin):
     list_filter = ('category', 'is_active', 'start_date', 'end_date')
     search_fields = ('title', 'description', 'business__business_name')
     raw_id_fields = ('business',)
+    readonly_fields = ('current_claims',)
 
     def claimed_by_button(self, obj):
         from django.urls import reverse
@@ -182,10 +183,10 @@ class WalletAdmin(admin.ModelAdmin):
 
 @admin.register(KYCVerification, site=admin_site)
 class KYCVerificationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'document_type', 'status', 'created_at', 'verified_at')
+    list_display = ('user', 'document_type', 'status', 'claimed_by', 'lease_expires_at', 'created_at', 'verified_at')
     list_filter = ('document_type', 'status', 'created_at')
     search_fields = ('user__email', 'document_number')
-    raw_id_fields = ('user', 'verified_by')
+    raw_id_fields = ('user', 'verified_by', 'claimed_by')
 
 @admin.register(Listing, site=admin_site)
 class ListingAdmin(admin.ModelAdmin):
@@ -0,0 +1,20 @@
+# broker/api/v1/serializers/attachment.py
+from rest_framework import serializers
+from broker.attachments import MAX_CHUNK_SIZE
+from broker.models.conversation import AttachmentUpload
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received_size', read_only=True)
+    max_chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AttachmentUpload
+        fields = (
+            'id', 'conversation', 'filename', 'content_type', 'size', 'offset', 'max_chunk_size',
+            'sha256', 'message', 'completed_at', 'created_at',
+        )
+        read_only_fields = ('sha256', 'message', 'completed_at', 'created_at')
+        extra_kwargs = {'content_type': {'required': False}}
+
+    def get_max_chunk_size(self, obj):
+        return MAX_CHUNK_SIZE
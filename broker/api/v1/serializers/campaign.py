@@ -1,8 +1,21 @@
 # broker/api/v1/serializers/campaign.py
 from rest_framework import serializers
-from broker.models.campaign import Campaign, CampaignCollaborator
+from broker.models.campaign import Campaign, CampaignCollaborator, CampaignStats
 from broker.models.listing import CampaignProduct
 
+class CampaignProductItemSerializer(serializers.Serializer):
+    """One entry of a bulk product attach; the listing is checked in bulk by the caller"""
+    listing = serializers.IntegerField(min_value=1)
+    commission_rate = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=CampaignProduct.Status.choices, required=False)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class CampaignCollaboratorItemSerializer(serializers.Serializer):
+    """One entry of a bulk collaborator invite; the user is checked in bulk by the caller"""
+    user = serializers.IntegerField(min_value=1)
+    role = serializers.ChoiceField(choices=CampaignCollaborator.CollaboratorRole.choices)
+    status = serializers.ChoiceField(choices=CampaignCollaborator.CollaboratorStatus.choices, required=False)
+
 class CampaignProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = CampaignProduct
@@ -19,7 +32,7 @@ class CampaignCollaboratorSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at')
 
 class CampaignSerializer(serializers.ModelSerializer):
-    products = CampaignProductSerializer(many=True, read_only=True)
+    products = CampaignProductSerializer(source='campaign_products', many=True, read_only=True)
     collaborators = CampaignCollaboratorSerializer(many=True, read_only=True)
     created_by_email = serializers.EmailField(source='created_by.email', read_only=True)
     
@@ -30,4 +43,14 @@ class CampaignSerializer(serializers.ModelSerializer):
         
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class CampaignStatsSerializer(serializers.ModelSerializer):
+    campaign_name = serializers.CharField(source='campaign.name', read_only=True)
+    campaign_status = serializers.CharField(source='campaign.status', read_only=True)
+    acceptance_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = CampaignStats
+        fields = '__all__'
+        read_only_fields = [field.name for field in CampaignStats._meta.fields]
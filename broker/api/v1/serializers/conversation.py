@@ -1,5 +1,6 @@
 # broker/api/v1/serializers/conversation.py
 from rest_framework import serializers
+from broker.message_archive import archived_messages
 from broker.models.conversation import Conversation, Message
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -8,24 +9,79 @@ class MessageSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Message
-        fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'sender')
+        exclude = ('search_vector',)
+        # Read state only changes through mark_read, which keeps the unread counters in step
+        read_only_fields = ('created_at', 'updated_at', 'sender', 'conversation', 'is_read', 'read_at')
+
+class InboxConversationSerializer(serializers.ModelSerializer):
+    """Inbox row: read model fields only, never the message history"""
+    listing_title = serializers.CharField(source='listing.title', read_only=True, default=None)
+    other_participant = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = (
+            'id', 'listing', 'listing_title', 'status', 'other_participant',
+            'last_message_at', 'last_message_preview', 'last_message_sender', 'last_message_type',
+            'unread_count',
+        )
+        read_only_fields = fields
+
+    def get_other_participant(self, obj):
+        user = self.context['request'].user
+        other = obj.seller if obj.buyer_id == user.pk else obj.buyer
+        return {'id': other.pk, 'email': other.email, 'name': other.get_full_name()}
+
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    """A matching message with its highlighted snippet and the conversation it belongs to"""
+    sender_name = serializers.CharField(source='sender.get_full_name', read_only=True)
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.CharField(read_only=True)
+    conversation = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Message
+        fields = ('id', 'sender', 'sender_name', 'message_type', 'created_at', 'rank', 'snippet', 'conversation')
+        read_only_fields = fields
+
+    def get_conversation(self, obj):
+        user = self.context['request'].user
+        conversation = obj.conversation
+        other = conversation.seller if conversation.buyer_id == user.pk else conversation.buyer
+        return {
+            'id': conversation.pk,
+            'listing': conversation.listing_id,
+            'listing_title': conversation.listing.title if conversation.listing else None,
+            'other_participant': {'id': other.pk, 'email': other.email, 'name': other.get_full_name()},
+            'last_message_at': conversation.last_message_at,
+        }
 
 class ConversationSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
     participants_info = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'participants')
+        read_only_fields = (
+            'created_at', 'updated_at', 'last_message_at', 'last_message_preview', 'last_message_sender',
+            'last_message_type', 'buyer_unread_count', 'seller_unread_count', 'archived_message_count',
+        )
+
+    def get_messages(self, obj):
+        messages = list(obj.messages.all())
+        view = self.context.get('view')
+        if obj.archived_message_count and getattr(view, 'action', None) == 'retrieve':
+            # Only the detail view decompresses the archive; archived history comes
+            # back newest first and precedes the hot messages
+            messages = archived_messages(obj)[::-1] + messages
+        return MessageSerializer(messages, many=True, context=self.context).data
 
     def get_participants_info(self, obj):
         from broker.api.v1.serializers.user import UserSerializer
-        return UserSerializer(obj.participants.all(), many=True).data
+        return UserSerializer([obj.buyer, obj.seller], many=True).data
 
-    def create(self, validated_data):
-        participants = validated_data.pop('participants', [])
-        conversation = Conversation.objects.create(**validated_data)
-        conversation.participants.set(participants)
-        return conversation
\ No newline at end of file
+class ConversationListSerializer(ConversationSerializer):
+    """List rows leave out the history; fetch it from retrieve or conversations/{id}/messages/"""
+    messages = None
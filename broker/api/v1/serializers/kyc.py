@@ -1,6 +1,6 @@
 # broker/api/v1/serializers/kyc.py
 from rest_framework import serializers
-from broker.models.kyc import KYCVerification
+from broker.models.kyc import DocumentImageHash, KYCVerification
 
 class KYCVerificationSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
@@ -9,12 +9,35 @@ class KYCVerificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = KYCVerification
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'user', 'status', 'verified_by', 'verified_at')
+        read_only_fields = (
+            'created_at', 'updated_at', 'user', 'status', 'verified_by', 'verified_at', 'claimed_by', 'lease_expires_at',
+        )
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
+class DocumentDuplicateSerializer(serializers.ModelSerializer):
+    """A document image of this verification that matches another user's document"""
+    duplicate_user = serializers.IntegerField(source='duplicate_of.user_id', read_only=True)
+    duplicate_kyc = serializers.IntegerField(source='duplicate_of.kyc_id', read_only=True)
+    duplicate_business_document = serializers.IntegerField(source='duplicate_of.business_document_id', read_only=True)
+
+    class Meta:
+        model = DocumentImageHash
+        fields = (
+            'source_field', 'duplicate_distance', 'duplicate_user', 'duplicate_kyc', 'duplicate_business_document',
+        )
+
 class KYCVerificationAdminSerializer(KYCVerificationSerializer):
+    duplicates = serializers.SerializerMethodField()
+
+    def get_duplicates(self, obj):
+        # Views prefetch these into flagged_images
+        flagged = getattr(obj, 'flagged_images', None)
+        if flagged is None:
+            flagged = obj.image_hashes.filter(duplicate_of__isnull=False).select_related('duplicate_of')
+        return DocumentDuplicateSerializer(flagged, many=True).data
+
     class Meta(KYCVerificationSerializer.Meta):
-        read_only_fields = ('created_at', 'updated_at', 'verified_at')
\ No newline at end of file
+        read_only_fields = ('created_at', 'updated_at', 'verified_at', 'claimed_by', 'lease_expires_at')
\ No newline at end of file
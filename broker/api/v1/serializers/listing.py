@@ -11,9 +11,10 @@ class ListingSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Listing
-        fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
-        
+        exclude = ('search_vector',)
+        # expires_at is set on publish; owners must not push it back past the batch expiry
+        read_only_fields = ('created_at', 'updated_at', 'expires_at')
+
     def create(self, validated_data):
         # User is set in the view's perform_create
         return super().create(validated_data)
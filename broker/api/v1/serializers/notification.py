@@ -0,0 +1,9 @@
+# broker/api/v1/serializers/notification.py
+from rest_framework import serializers
+from broker.models.notification import Notification
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = '__all__'
+        read_only_fields = ('user', 'notification_type', 'title', 'message', 'data', 'is_read', 'created_at')
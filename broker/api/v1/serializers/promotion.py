@@ -1,14 +1,53 @@
 # broker/api/v1/serializers/promotion.py
 from rest_framework import serializers
+from broker.claims import promotion_claim_total
 from broker.models.promotion import Promotion, PromotionClaim
 
+MAX_COUNTER_SHARDS = 64
+
 class PromotionSerializer(serializers.ModelSerializer):
     business_name = serializers.CharField(source='business.business_name', read_only=True)
+    claimed_total = serializers.SerializerMethodField()
+    # Annotated by PromotionViewSet.get_queryset; omitted when not annotated
+    claim_count = serializers.IntegerField(read_only=True)
+    remaining_capacity = serializers.IntegerField(read_only=True)
+    has_claimed = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Promotion
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('created_at', 'updated_at', 'current_claims')
+
+    def get_claimed_total(self, obj):
+        return promotion_claim_total(obj)
+
+    def validate_counter_shards(self, value):
+        if value > MAX_COUNTER_SHARDS:
+            raise serializers.ValidationError(f"At most {MAX_COUNTER_SHARDS} counter shards are supported.")
+        return value
+
+    def validate(self, attrs):
+        campaign = attrs.get('campaign', getattr(self.instance, 'campaign', None))
+        business = attrs.get('business', getattr(self.instance, 'business', None))
+        if campaign is not None and campaign.business_id != getattr(business, 'pk', None):
+            raise serializers.ValidationError({'campaign': "The campaign must belong to the promotion's business."})
+        return attrs
+
+    def update(self, instance, validated_data):
+        # current_claims is maintained by conditional UPDATEs, so never write back
+        # the copy loaded at the start of this request
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+class PromotionFeedSerializer(PromotionSerializer):
+    """Public feed rows; cached, so live claim counters are left out"""
+    claimed_total = None
+
+    class Meta(PromotionSerializer.Meta):
+        fields = None
+        exclude = ('current_claims',)
 
 class PromotionClaimSerializer(serializers.ModelSerializer):
     promotion_title = serializers.CharField(source='promotion.title', read_only=True)
@@ -17,7 +56,10 @@ class PromotionClaimSerializer(serializers.ModelSerializer):
     class Meta:
         model = PromotionClaim
         fields = '__all__'
-        read_only_fields = ('claimed_at', 'updated_at')
+        # Claims are made by claim_promotion and moderated by moderate_claims only
+        read_only_fields = (
+            'user', 'status', 'rejection_reason', 'points', 'capacity_reserved', 'claimed_at', 'updated_at'
+        )
 
 
 
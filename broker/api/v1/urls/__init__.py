@@ -30,9 +30,11 @@ def api_root(request):
             'campaigns': '/api/v1/campaigns/',
             'campaign-collaborators': '/api/v1/campaign-collaborators/',
             'campaign-products': '/api/v1/campaign-products/',
+            'calendar': '/api/v1/calendar/',
         },
         'promotion': {
             'promotions': '/api/v1/promotions/',
+            'promotion-feed': '/api/v1/promotions/feed/',
             'promotion-claims': '/api/v1/promotion-claims/',
         },
         'transaction': {
@@ -49,6 +51,10 @@ def api_root(request):
         'conversation': {
             'conversations': '/api/v1/conversations/',
             'messages': '/api/v1/messages/',
+            'attachments': '/api/v1/attachments/',
+        },
+        'notification': {
+            'notifications': '/api/v1/notifications/',
         },
         'admin': {
             'dashboard-stats': '/api/v1/admin/dashboard/stats/',
@@ -15,8 +15,11 @@ from ..views.promotion import PromotionViewSet, PromotionClaimViewSet
 from ..views.transaction import TransactionViewSet, WalletViewSet
 from ..views.kyc import KYCVerificationViewSet
 from ..views.listing import ListingViewSet
-from ..views.conversation import ConversationViewSet, MessageViewSet
+from ..views.conversation import ConversationMessageViewSet, ConversationViewSet, MessageViewSet
+from ..views.notification import NotificationViewSet
+from ..views.attachment import AttachmentUploadViewSet
 from ..views.admin_dashboard import dashboard_stats_api
+from ..views.calendar import calendar_api
 
 # Create main router
 router = DefaultRouter()
@@ -55,6 +58,10 @@ router.register(r'listings', ListingViewSet, basename='listing')
 # Conversation endpoints
 router.register(r'conversations', ConversationViewSet, basename='conversation')
 router.register(r'messages', MessageViewSet, basename='message')
+router.register(r'attachments', AttachmentUploadViewSet, basename='attachment-upload')
+
+# Notification endpoints
+router.register(r'notifications', NotificationViewSet, basename='notification')
 
 # Nested routers for related resources
 campaigns_router = routers.NestedSimpleRouter(router, r'campaigns', lookup='campaign')
@@ -64,11 +71,13 @@ campaigns_router.register(r'products', CampaignProductViewSet, basename='campaig
 
 conversations_router = routers.NestedSimpleRouter(router, r'conversations', lookup='conversation')
 conversations_router.include_format_suffixes = False
-conversations_router.register(r'messages', MessageViewSet, basename='conversation-messages')
+conversations_router.register(r'messages', ConversationMessageViewSet, basename='conversation-messages')
 
 urlpatterns = [
     # Admin dashboard API
     path('admin/dashboard/stats/', dashboard_stats_api, name='admin-dashboard-stats'),
+    # Campaign and promotion calendar
+    path('calendar/', calendar_api, name='calendar'),
     # All other endpoints
     path('', include(router.urls)),
     path('', include(campaigns_router.urls)),
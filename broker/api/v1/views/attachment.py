@@ -0,0 +1,131 @@
+# broker/api/v1/views/attachment.py
+from django.conf import settings
+from django.db import models
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from broker.attachments import UploadRejected, attachment_path, complete_upload, start_upload, write_chunk
+from broker.models.conversation import AttachmentUpload
+from ..serializers.attachment import AttachmentUploadSerializer
+from ..serializers.conversation import MessageSerializer
+from .base import BaseViewSet
+
+# Raster types browsers render without running anything; everything else, SVG included, is downloaded
+INLINE_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp'}
+
+UPLOAD_REJECTION_STATUS = {
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'forbidden': status.HTTP_403_FORBIDDEN,
+    'offset_mismatch': status.HTTP_409_CONFLICT,
+    'complete': status.HTTP_409_CONFLICT,
+    'too_large': status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    'checksum_mismatch': status.HTTP_422_UNPROCESSABLE_ENTITY,
+}
+
+def rejection_response(exc):
+    body = {'error': exc.message, 'code': exc.code}
+    headers = {}
+    if exc.offset is not None:
+        body['offset'] = exc.offset
+        headers['Upload-Offset'] = str(exc.offset)
+    return Response(body, status=UPLOAD_REJECTION_STATUS.get(exc.code, status.HTTP_400_BAD_REQUEST), headers=headers)
+
+class AttachmentUploadViewSet(BaseViewSet):
+    """
+    Resumable uploads for IMAGE/FILE messages:
+    POST /attachments/ {conversation, filename, size, content_type} opens an upload,
+    PUT /attachments/{id}/chunk/ with an Upload-Offset header streams the next chunk,
+    GET /attachments/{id}/ reports the offset to resume from,
+    POST /attachments/{id}/complete/ {sha256, caption} creates the message,
+    GET /attachments/{id}/download/ serves the file
+    """
+    queryset = AttachmentUpload.objects.all()
+    serializer_class = AttachmentUploadSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'put', 'head', 'options']
+    filterset_fields = ['conversation']
+    ordering_fields = ['created_at']
+
+    def get_queryset(self):
+        return AttachmentUpload.objects.filter(
+            models.Q(conversation__buyer=self.request.user) |
+            models.Q(conversation__seller=self.request.user)
+        ).select_related('conversation')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            upload = start_upload(
+                request.user, data['conversation'], data['filename'], data['size'], data.get('content_type', '')
+            )
+        except UploadRejected as exc:
+            return rejection_response(exc)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_201_CREATED)
+
+    def update(self, request, *args, **kwargs):
+        return self.http_method_not_allowed(request, *args, **kwargs)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Raw request body appended at Upload-Offset; never buffered in memory as a whole"""
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            received = write_chunk(pk, request.user, offset, request.stream, length)
+        except UploadRejected as exc:
+            return rejection_response(exc)
+        return Response({'offset': received}, headers={'Upload-Offset': str(received)})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        try:
+            message = complete_upload(
+                pk, request.user,
+                sha256=str(request.data.get('sha256', '')),
+                caption=str(request.data.get('caption', '')),
+            )
+        except UploadRejected as exc:
+            return rejection_response(exc)
+        return Response(MessageSerializer(message).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        The file of a completed upload, streamed by FileResponse, which lets the
+        server hand it to sendfile; with ATTACHMENT_ACCEL_REDIRECT set, nginx serves
+        it from that internal location instead
+        """
+        upload = self.get_object()
+        if not upload.is_complete:
+            return Response({'error': 'This upload is not complete'}, status=status.HTTP_409_CONFLICT)
+        inline = upload.content_type.lower() in INLINE_CONTENT_TYPES
+        accel_prefix = getattr(settings, 'ATTACHMENT_ACCEL_REDIRECT', None)
+        if accel_prefix:
+            response = HttpResponse(content_type=upload.content_type)
+            response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{upload.conversation_id}/{upload.pk}"
+            response['Content-Disposition'] = content_disposition_header(not inline, upload.filename)
+            response['X-Content-Type-Options'] = 'nosniff'
+            return response
+        try:
+            handle = open(attachment_path(upload), 'rb')
+        except FileNotFoundError:
+            return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+        response = FileResponse(
+            handle,
+            as_attachment=not inline,
+            filename=upload.filename,
+            content_type=upload.content_type,
+        )
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
@@ -6,6 +6,8 @@ from rest_framework.permissions import IsAuthenticated
 from django.db import models
 from broker.models.business import BusinessProfile, BusinessMember
 from broker.models.kyc import BusinessDocument
+from broker.models.access import AccessGrant
+from broker.access import accessible_ids
 from ..serializers.business import (
     BusinessProfileSerializer,
     BusinessDocumentSerializer,
@@ -23,9 +25,8 @@ class BusinessProfileViewSet(BaseViewSet):
 
     def get_queryset(self):
         return self.queryset.filter(
-            models.Q(user=self.request.user) |
-            models.Q(members__user=self.request.user)
-        ).select_related('user').prefetch_related('members__user').distinct()
+            pk__in=accessible_ids(self.request.user, AccessGrant.ObjectType.BUSINESS)
+        ).select_related('user').prefetch_related('members__user')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,74 @@
+# broker/api/v1/views/calendar.py
+"""
+Calendar API: campaigns and promotions running inside a date window
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from broker.access import accessible_ids
+from broker.event_calendar import KINDS, calendar_occupancy
+from broker.models import AccessGrant, Campaign, Promotion
+
+MAX_CALENDAR_DAYS = 366
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def calendar_api(request):
+    """
+    Day-by-day occupancy between ?start=YYYY-MM-DD and ?end=YYYY-MM-DD (inclusive)
+    Optional ?types=campaign,promotion and ?business=<id> narrow the result
+    """
+    first_day = parse_date(request.GET.get('start', ''))
+    last_day = parse_date(request.GET.get('end', ''))
+    if first_day is None or last_day is None:
+        return Response(
+            {'error': 'start and end must be dates formatted as YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if last_day < first_day:
+        return Response({'error': 'end must not be before start'}, status=status.HTTP_400_BAD_REQUEST)
+    if last_day - first_day >= timedelta(days=MAX_CALENDAR_DAYS):
+        return Response(
+            {'error': f'The window can span at most {MAX_CALENDAR_DAYS} days'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    types = request.GET.get('types')
+    types = set(types.split(',')) if types else set(KINDS)
+    if not types <= set(KINDS):
+        return Response(
+            {'error': f'types must be a comma separated subset of {", ".join(KINDS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Same visibility as the campaign and promotion list endpoints
+    campaigns = Campaign.objects.filter(
+        pk__in=accessible_ids(request.user, AccessGrant.ObjectType.CAMPAIGN)
+    )
+    promotions = Promotion.objects.all()
+    if not request.user.is_staff:
+        promotions = promotions.filter(
+            Q(business_id__in=accessible_ids(request.user, AccessGrant.ObjectType.BUSINESS)) |
+            Q(is_active=True)
+        )
+    business = request.GET.get('business')
+    if business:
+        if not business.isdigit():
+            return Response({'error': 'business must be an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+        campaigns = campaigns.filter(business_id=business)
+        promotions = promotions.filter(business_id=business)
+
+    occupancy = calendar_occupancy(
+        campaigns if 'campaign' in types else None,
+        promotions if 'promotion' in types else None,
+        first_day,
+        last_day,
+    )
+    return Response({'start': first_day, 'end': last_day, **occupancy})
@@ -4,14 +4,26 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import models
-from broker.models.campaign import Campaign, CampaignCollaborator
+from broker.models.campaign import Campaign, CampaignCollaborator, CampaignStats
 from broker.models.listing import CampaignProduct
+from broker.models.access import AccessGrant
+from broker.access import accessible_ids
+from broker.campaign_bulk import attach_collaborators, attach_products
 from ..serializers.campaign import (
     CampaignSerializer,
     CampaignCollaboratorSerializer,
-    CampaignProductSerializer
+    CampaignCollaboratorItemSerializer,
+    CampaignProductSerializer,
+    CampaignProductItemSerializer,
+    CampaignStatsSerializer
 )
-from .base import BaseViewSet
+from .base import BaseViewSet, StandardResultsSetPagination
+
+MAX_BULK_ITEMS = 1000
+
+class AnalyticsResultsSetPagination(StandardResultsSetPagination):
+    """Rollup rows are small, so dashboards may fetch a few hundred at once"""
+    max_page_size = 500
 
 class CampaignViewSet(BaseViewSet):
     queryset = Campaign.objects.all()
@@ -23,16 +35,38 @@ class CampaignViewSet(BaseViewSet):
 
     def get_queryset(self):
         return self.queryset.filter(
-            models.Q(business__user=self.request.user) |
-            models.Q(business__members__user=self.request.user) |
-            models.Q(collaborators__user=self.request.user)
+            pk__in=accessible_ids(self.request.user, AccessGrant.ObjectType.CAMPAIGN)
         ).select_related('business', 'created_by').prefetch_related(
-            'products', 'collaborators__user'
-        ).distinct()
+            'campaign_products', 'collaborators__user'
+        )
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Precomputed performance rollups for every campaign the user can see,
+        read with a single query; refreshed by `manage.py refresh_campaign_stats`
+        """
+        stats = CampaignStats.objects.filter(
+            campaign_id__in=accessible_ids(request.user, AccessGrant.ObjectType.CAMPAIGN)
+        ).select_related('campaign').order_by('-campaign__created_at', 'campaign_id')
+
+        campaign_status = request.query_params.get('status')
+        if campaign_status:
+            stats = stats.filter(campaign__status=campaign_status)
+        business = request.query_params.get('business')
+        if business:
+            if not business.isdigit():
+                return Response({'error': 'business must be an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+            stats = stats.filter(campaign__business_id=business)
+
+        paginator = AnalyticsResultsSetPagination()
+        page = paginator.paginate_queryset(stats, request, view=self)
+        serializer = CampaignStatsSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def add_collaborator(self, request, pk=None):
         campaign = self.get_object()
@@ -70,6 +104,65 @@ class CampaignViewSet(BaseViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_attach(self, request, campaign, key, item_serializer_class, attach):
+        """
+        Validate a list of items under `key` one by one and attach the valid
+        ones in bulk; returns a result per item in input order
+        """
+        items = request.data.get(key)
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': f'{key} must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > MAX_BULK_ITEMS:
+            return Response(
+                {'error': f'At most {MAX_BULK_ITEMS} {key} can be added per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        valid, positions = [], []
+        for index, item in enumerate(items):
+            serializer = item_serializer_class(data=item)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+                positions.append(index)
+            else:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+        if valid:
+            for position, result in zip(positions, attach(campaign, valid)):
+                result['index'] = position
+                results[position] = result
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response(
+            {'created': created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['post'])
+    def bulk_add_products(self, request, pk=None):
+        """Attach many listings: {"products": [{"listing": id, "commission_rate": ..., "notes": ...}, ...]}"""
+        campaign = self.get_object()
+        if campaign.business and campaign.business.user != request.user and campaign.created_by != request.user:
+            return Response(
+                {'error': 'Only the campaign creator or business owner can add products'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return self.bulk_attach(request, campaign, 'products', CampaignProductItemSerializer, attach_products)
+
+    @action(detail=True, methods=['post'])
+    def bulk_add_collaborators(self, request, pk=None):
+        """Invite many users: {"collaborators": [{"user": id, "role": "MANAGER"}, ...]}"""
+        campaign = self.get_object()
+        if campaign.created_by != request.user:
+            return Response(
+                {'error': 'Only the campaign creator can add collaborators'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return self.bulk_attach(request, campaign, 'collaborators', CampaignCollaboratorItemSerializer, attach_collaborators)
+
 class CampaignCollaboratorViewSet(BaseViewSet):
     queryset = CampaignCollaborator.objects.all()
     serializer_class = CampaignCollaboratorSerializer
@@ -79,10 +172,15 @@ class CampaignCollaboratorViewSet(BaseViewSet):
     ordering_fields = ['joined_at']
 
     def get_queryset(self):
+        owned_campaigns = accessible_ids(
+            self.request.user,
+            AccessGrant.ObjectType.CAMPAIGN,
+            roles=[AccessGrant.GrantRole.BUSINESS_OWNER],
+        )
         return CampaignCollaborator.objects.filter(
-            models.Q(campaign__business__user=self.request.user) |
+            models.Q(campaign_id__in=owned_campaigns) |
             models.Q(user=self.request.user)
-        ).select_related('campaign', 'user').distinct()
+        ).select_related('campaign', 'user')
 
 class CampaignProductViewSet(BaseViewSet):
     queryset = CampaignProduct.objects.all()
@@ -93,7 +191,11 @@ class CampaignProductViewSet(BaseViewSet):
     ordering_fields = ['created_at']
 
     def get_queryset(self):
+        visible_campaigns = accessible_ids(
+            self.request.user,
+            AccessGrant.ObjectType.CAMPAIGN,
+            roles=[AccessGrant.GrantRole.BUSINESS_OWNER, AccessGrant.GrantRole.COLLABORATOR],
+        )
         return CampaignProduct.objects.filter(
-            models.Q(campaign__business__user=self.request.user) |
-            models.Q(campaign__collaborators__user=self.request.user)
-        ).select_related('campaign', 'listing').prefetch_related('campaign__collaborators').distinct()
\ No newline at end of file
+            campaign_id__in=visible_campaigns
+        ).select_related('campaign', 'listing')
\ No newline at end of file
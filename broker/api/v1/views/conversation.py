@@ -3,11 +3,156 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django.db import models
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from broker.inbox import ConversationRejected, inbox, mark_read, open_conversation
+from broker.message_archive import archived_messages
+from broker.message_search import search_messages
 from broker.models.conversation import Conversation, Message
-from ..serializers.conversation import ConversationSerializer, MessageSerializer
+from ..serializers.conversation import (
+    ConversationListSerializer, ConversationSerializer, InboxConversationSerializer, MessageSearchResultSerializer,
+    MessageSerializer,
+)
 from .base import BaseViewSet
 
+class InboxPagination(CursorPagination):
+    """Keyset pages over the (participant, -last_message_at) indexes; no COUNT query"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-last_message_at', '-pk')
+
+class KeysetPagination(BasePagination):
+    """Page size handling shared by the hand-written keyset paginators below"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+class MessageSearchPagination(KeysetPagination):
+    """
+    Keyset pages over ranked matches on (-rank, -id); deep pages cost no OFFSET
+    scan and there is no COUNT query. The cursor carries both the rank and the
+    id of the last row, so ties on rank never repeat or skip rows. Ranks are
+    float8 (see message_search), so the value in the cursor round-trips exactly
+    """
+    page_size = 20
+
+    def encode_cursor(self, message):
+        return urlsafe_base64_encode(f'{message.rank!r}|{message.pk}'.encode())
+
+    def decode_cursor(self, value):
+        try:
+            rank, pk = urlsafe_base64_decode(value).decode().split('|')
+            return float(rank), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            rank, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(models.Q(rank__lt=rank) | models.Q(rank=rank, pk__lt=pk))
+        rows = list(queryset.order_by('-rank', '-pk')[:size + 1])
+        self.last = rows[size - 1] if len(rows) > size else None
+        return rows[:size]
+
+    def get_paginated_response(self, data):
+        next_url = None
+        if self.last is not None:
+            next_url = replace_query_param(self.request.build_absolute_uri(), 'cursor', self.encode_cursor(self.last))
+        return Response({'next': next_url, 'results': data})
+
+class MessageHistoryPagination(KeysetPagination):
+    """
+    Keyset pages over one conversation on (conversation, created_at, id), newest first
+    ?before=<cursor> walks back into older messages and ?after=<cursor> returns the
+    messages newer than the cursor, so every page is one index range scan however
+    long the history is. Archived messages are read from their compressed
+    segments once a page reaches past the hot table
+    """
+    def encode_cursor(self, message):
+        return urlsafe_base64_encode(f'{message.created_at.isoformat()}|{message.pk}'.encode())
+
+    def decode_cursor(self, value):
+        try:
+            created_at, pk = urlsafe_base64_decode(value).decode().split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if created_at is None:
+            raise NotFound('Invalid cursor')
+        return created_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+        if before and after:
+            raise NotFound('Use either before or after, not both')
+
+        # Archived messages all sort before the hot ones, so the archive only tops up a page
+        conversation = getattr(view, 'conversation', None)
+        archived = conversation is not None and conversation.archived_message_count > 0
+
+        if after:
+            key = self.decode_cursor(after)
+            rows = archived_messages(conversation, after=key, limit=size + 1) if archived else []
+            rows += list(queryset.filter(
+                models.Q(created_at__gt=key[0]) | models.Q(created_at=key[0], pk__gt=key[1])
+            ).order_by('created_at', 'pk')[:size + 1 - len(rows)])
+            self.has_newer, self.has_older = len(rows) > size, True
+            rows = rows[:size][::-1]
+        else:
+            key = self.decode_cursor(before) if before else None
+            if key:
+                queryset = queryset.filter(
+                    models.Q(created_at__lt=key[0]) | models.Q(created_at=key[0], pk__lt=key[1])
+                )
+            rows = list(queryset.order_by('-created_at', '-pk')[:size + 1])
+            if archived and len(rows) <= size:
+                rows += archived_messages(conversation, before=key, limit=size + 1 - len(rows))
+            self.has_older, self.has_newer = len(rows) > size, bool(before)
+            rows = rows[:size]
+
+        self.oldest = rows[-1] if rows else None
+        self.newest = rows[0] if rows else None
+        # An empty page keeps the cursor it was asked with, so polling can continue from it
+        self.after_cursor = self.encode_cursor(self.newest) if rows else after
+        return rows
+
+    def link(self, param, cursor):
+        url = remove_query_param(self.request.build_absolute_uri(), 'before' if param == 'after' else 'after')
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_response(self, data):
+        older = self.link('before', self.encode_cursor(self.oldest)) if self.has_older and self.oldest else None
+        # Always offered when there is a reference point: the newest page polls it for new messages
+        newer = self.link('after', self.after_cursor) if self.after_cursor else None
+        return Response({
+            'older': older,
+            'newer': newer,
+            'has_older': self.has_older,
+            'has_newer': self.has_newer,
+            'results': data,
+        })
+
 class ConversationViewSet(BaseViewSet):
     queryset = Conversation.objects.all()
     serializer_class = ConversationSerializer
@@ -17,17 +162,56 @@ class ConversationViewSet(BaseViewSet):
     ordering_fields = ['last_message_at', 'created_at']
 
     def get_queryset(self):
-        return Conversation.objects.filter(
+        queryset = Conversation.objects.filter(
             models.Q(buyer=self.request.user) |
             models.Q(seller=self.request.user)
-        ).select_related('listing', 'buyer', 'seller').prefetch_related(
-            'messages__sender'
-        ).distinct()
+        ).select_related('listing', 'buyer', 'seller')
+        if self.action == 'retrieve':
+            # Only the detail view serializes the history
+            return queryset.prefetch_related('messages__sender')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ConversationListSerializer
+        return self.serializer_class
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """Conversations with their last message and the requester's unread count, newest first"""
+        queryset = inbox(request.user)
+        if request.query_params.get('unread', '').lower() == 'true':
+            queryset = queryset.filter(unread_count__gt=0)
+        paginator = InboxPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = InboxConversationSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def open(self, request):
+        """
+        Get or start the requester's conversation about a listing: {"listing": id}
+        Idempotent; answers with the inbox row, 201 when it was just created
+        """
+        listing_id = request.data.get('listing')
+        try:
+            listing_id = int(listing_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'listing must be a listing id'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            conversation, created = open_conversation(request.user, listing_id)
+        except ConversationRejected as exc:
+            return Response(
+                {'error': exc.message, 'code': exc.code},
+                status=status.HTTP_404_NOT_FOUND if exc.code == 'not_found' else status.HTTP_400_BAD_REQUEST
+            )
+        serializer = InboxConversationSerializer(conversation, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def send_message(self, request, pk=None):
         conversation = self.get_object()
-        if request.user not in conversation.participants.all():
+        if request.user.pk not in (conversation.buyer_id, conversation.seller_id):
             return Response(
                 {'error': 'You are not a participant in this conversation'},
                 status=status.HTTP_403_FORBIDDEN
@@ -42,7 +226,34 @@ class ConversationViewSet(BaseViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """Mark received messages read, all or up to up_to_id / up_to, and reset the unread counter"""
+        conversation = self.get_object()
+        up_to_id = request.data.get('up_to_id')
+        up_to = request.data.get('up_to')
+        if up_to_id is not None:
+            try:
+                up_to_id = int(up_to_id)
+            except (TypeError, ValueError):
+                return Response({'error': 'up_to_id must be a message id'}, status=status.HTTP_400_BAD_REQUEST)
+        if up_to is not None:
+            try:
+                up_to = parse_datetime(str(up_to))
+            except ValueError:
+                up_to = None
+            if up_to is None:
+                return Response({'error': 'up_to must be an ISO 8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(up_to):
+                up_to = timezone.make_aware(up_to)
+        try:
+            marked, unread = mark_read(conversation, request.user, up_to_id=up_to_id, up_to=up_to)
+        except Message.DoesNotExist:
+            return Response({'error': 'Message not found in this conversation'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'marked': marked, 'unread_count': unread})
+
 class MessageViewSet(BaseViewSet):
+    """Messages of the requester's conversations; new ones are sent through ConversationViewSet.send_message"""
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
@@ -54,4 +265,45 @@ class MessageViewSet(BaseViewSet):
         return Message.objects.filter(
             models.Q(conversation__buyer=self.request.user) |
             models.Q(conversation__seller=self.request.user)
-        ).select_related('sender', 'conversation').distinct()
\ No newline at end of file
+        ).select_related('sender', 'conversation').distinct()
+
+    def create(self, request, *args, **kwargs):
+        return self.http_method_not_allowed(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request, **kwargs):
+        """
+        Ranked search over the messages of the requester's conversations: ?q=
+        ?conversation=<id>, or the nested conversations/{id}/messages/search/ route,
+        narrows it to one conversation
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        conversation = self.kwargs.get('conversation_pk', request.query_params.get('conversation'))
+        if conversation is not None and not conversation.isdigit():
+            return Response({'error': 'conversation must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = search_messages(request.user, text, conversation=conversation).select_related(
+            'sender', 'conversation__listing', 'conversation__buyer', 'conversation__seller'
+        )
+        paginator = MessageSearchPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = MessageSearchResultSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+class ConversationMessageViewSet(MessageViewSet):
+    """Messages of one conversation at conversations/{id}/messages/, paged by keyset; read only"""
+    pagination_class = MessageHistoryPagination
+    http_method_names = ['get', 'head', 'options']
+
+    def get_queryset(self):
+        if not self.kwargs['conversation_pk'].isdigit():
+            raise NotFound()
+        self.conversation = get_object_or_404(
+            Conversation.objects.filter(
+                models.Q(buyer=self.request.user) |
+                models.Q(seller=self.request.user)
+            ).only('pk', 'archived_message_count'),
+            pk=self.kwargs['conversation_pk'],
+        )
+        return Message.objects.filter(conversation=self.conversation).select_related('sender')
@@ -1,12 +1,31 @@
 # broker/api/v1/views/kyc.py
+from django.db.models import Prefetch
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from broker.models.kyc import KYCVerification
+from broker.kyc_review import (
+    MAX_CLAIM_BATCH, ReviewRejected, claim_reviews, decide_review, my_reviews, release_reviews, renew_leases,
+)
+from broker.models.kyc import DocumentImageHash, KYCVerification
 from ..serializers.kyc import KYCVerificationSerializer, KYCVerificationAdminSerializer
 from .base import BaseViewSet
 
+REVIEW_REJECTION_STATUS = {
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'own_submission': status.HTTP_403_FORBIDDEN,
+    'decided': status.HTTP_409_CONFLICT,
+    'leased': status.HTTP_409_CONFLICT,
+}
+
+def with_duplicates(queryset):
+    """Prefetch the flagged document images KYCVerificationAdminSerializer lists"""
+    return queryset.prefetch_related(Prefetch(
+        'image_hashes',
+        queryset=DocumentImageHash.objects.filter(duplicate_of__isnull=False).select_related('duplicate_of'),
+        to_attr='flagged_images',
+    ))
+
 class KYCVerificationViewSet(BaseViewSet):
     queryset = KYCVerification.objects.all()
     serializer_class = KYCVerificationSerializer
@@ -23,25 +42,79 @@ class KYCVerificationViewSet(BaseViewSet):
     def get_queryset(self):
         queryset = self.queryset
         if self.request.user.is_staff:
-            return queryset.select_related('user', 'verified_by').all()
+            return with_duplicates(queryset.select_related('user', 'verified_by'))
         return queryset.filter(user=self.request.user).select_related('user', 'verified_by')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def review_ids(self, request):
+        """Verification ids from the request body, or None when malformed"""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return None
+        return ids
+
+    def decide(self, request, pk, approve):
+        # Skips get_object(): decide_review checks existence and state in its UPDATE
+        if not str(pk).isdigit():
+            return Response({'error': 'Verification not found', 'code': 'not_found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            decide_review(
+                request.user, int(pk), approve,
+                rejection_reason=request.data.get('rejection_reason', '') if not approve else '',
+            )
+        except ReviewRejected as exc:
+            return Response(
+                {'error': exc.message, 'code': exc.code},
+                status=REVIEW_REJECTION_STATUS.get(exc.code, status.HTTP_409_CONFLICT)
+            )
+        return Response({'status': 'KYC approved' if approve else 'KYC rejected'})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def claim(self, request):
+        """Lease the next pending verifications to the requesting reviewer: {"count": n}"""
+        try:
+            count = int(request.data.get('count', 10))
+        except (TypeError, ValueError):
+            return Response({'error': 'count must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= count <= MAX_CLAIM_BATCH:
+            return Response(
+                {'error': f'count must be between 1 and {MAX_CLAIM_BATCH}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = claim_reviews(request.user, count)
+        claimed = with_duplicates(
+            KYCVerification.objects.filter(pk__in=ids).select_related('user', 'verified_by').order_by('created_at', 'pk')
+        )
+        return Response({'results': KYCVerificationAdminSerializer(claimed, many=True).data})
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def my_queue(self, request):
+        """Verifications currently leased to the requesting reviewer"""
+        queryset = with_duplicates(my_reviews(request.user).select_related('user', 'verified_by'))
+        return Response({'results': KYCVerificationAdminSerializer(queryset, many=True).data})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def renew(self, request):
+        """Extend the requester's leases: {"ids": [...]}"""
+        ids = self.review_ids(request)
+        if ids is None:
+            return Response({'error': 'ids must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'renewed': renew_leases(request.user, ids)})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def release(self, request):
+        """Hand the requester's leases back to the queue: {"ids": [...]}"""
+        ids = self.review_ids(request)
+        if ids is None:
+            return Response({'error': 'ids must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'released': release_reviews(request.user, ids)})
+
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def approve(self, request, pk=None):
-        kyc = self.get_object()
-        kyc.status = 'approved'
-        kyc.verified_by = request.user
-        kyc.save()
-        return Response({'status': 'KYC approved'})
+        return self.decide(request, pk, approve=True)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def reject(self, request, pk=None):
-        kyc = self.get_object()
-        kyc.status = 'rejected'
-        kyc.verified_by = request.user
-        kyc.rejection_reason = request.data.get('rejection_reason', '')
-        kyc.save()
-        return Response({'status': 'KYC rejected'})
\ No newline at end of file
+        return self.decide(request, pk, approve=False)
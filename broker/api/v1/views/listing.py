@@ -4,15 +4,40 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import models
-from broker.models.listing import Listing
+from django.utils import timezone
+from django_filters import rest_framework as filters
+from broker.models.listing import Listing, SimilarListing
+from broker.listing_expiry import default_expiry
+from broker.listing_search import search_listings
+from broker.tagging import filter_all_tags, filter_any_tags, parse_tag_query, tag_cloud
 from ..serializers.listing import ListingSerializer
 from .base import BaseViewSet
 
+DEFAULT_TAG_CLOUD_SIZE = 50
+MAX_TAG_CLOUD_SIZE = 200
+
+class ListingFilter(filters.FilterSet):
+    """Field filters plus ?tags__all=a,b and ?tags__any=a,b over the normalized tag index"""
+    tags__all = filters.CharFilter(method='filter_tags_all')
+    tags__any = filters.CharFilter(method='filter_tags_any')
+
+    class Meta:
+        model = Listing
+        fields = ['status', 'category', 'listing_type', 'is_active']
+
+    def filter_tags_all(self, queryset, name, value):
+        tags = parse_tag_query(value)
+        return filter_all_tags(queryset, tags) if tags else queryset
+
+    def filter_tags_any(self, queryset, name, value):
+        tags = parse_tag_query(value)
+        return filter_any_tags(queryset, tags) if tags else queryset
+
 class ListingViewSet(BaseViewSet):
     queryset = Listing.objects.all()
     serializer_class = ListingSerializer
     permission_classes = [IsAuthenticated]
-    filterset_fields = ['status', 'category', 'listing_type', 'is_active']
+    filterset_class = ListingFilter
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'price', 'updated_at']
 
@@ -37,8 +62,52 @@ class ListingViewSet(BaseViewSet):
                 {'error': 'Only the listing creator can publish it'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        listing.status = 'published'
+        listing.status = Listing.ListingStatus.PUBLISHED
+        # Republishing an expired listing renews it
+        if listing.expires_at is None or listing.expires_at <= timezone.now():
+            listing.expires_at = default_expiry(listing.listing_type)
         listing.save()
-        return Response({'status': 'listing published'})
+        return Response({'status': 'listing published', 'expires_at': listing.expires_at})
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked, typo-tolerant search over published listings: ?q=
+        Field filters such as ?category= or ?tags__any= still apply
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = search_listings(text).select_related('user', 'business')
+        queryset = ListingFilter(request.query_params, queryset=queryset, request=request).qs
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Precomputed similar published listings, best first"""
+        listing = self.get_object()
+        neighbours = SimilarListing.objects.filter(
+            listing=listing,
+            similar__status=Listing.ListingStatus.PUBLISHED,
+            similar__is_active=True,
+        ).select_related('similar__user', 'similar__business').order_by('rank')
+        return Response({
+            'results': [
+                {'score': round(neighbour.score, 4), **self.get_serializer(neighbour.similar).data}
+                for neighbour in neighbours
+            ]
+        })
+
+    @action(detail=False, methods=['get'])
+    def tag_cloud(self, request):
+        """Most used tags on published listings with their counts; ?limit= up to 200"""
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_TAG_CLOUD_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_TAG_CLOUD_SIZE))
+        return Response({'results': tag_cloud(limit)})
 
 # DraftOrder model was removed - functionality moved to product.Order
\ No newline at end of file
@@ -0,0 +1,27 @@
+# broker/api/v1/views/notification.py
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from broker.models.notification import Notification
+from ..serializers.notification import NotificationSerializer
+from .base import BaseViewSet
+
+class NotificationViewSet(BaseViewSet):
+    """The requesting user's notifications; created by background jobs, never through the API"""
+    queryset = Notification.objects.all()
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+    filterset_fields = ['notification_type', 'is_read']
+    ordering_fields = ['created_at']
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        return self.http_method_not_allowed(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+        return Response({'marked_read': updated})
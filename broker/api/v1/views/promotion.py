@@ -2,12 +2,32 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db import models
-from broker.models.promotion import Promotion, PromotionClaim
-from ..serializers.promotion import PromotionSerializer, PromotionClaimSerializer
+from django.db.models.functions import Coalesce, Greatest
+from broker.models.promotion import Promotion, PromotionClaim, PromotionClaimCounter
+from broker.claims import ClaimRejected, claim_promotion, moderate_claims
+from broker.promotion_feed import get_promotion_feed
+from ..serializers.promotion import PromotionSerializer, PromotionClaimSerializer, PromotionFeedSerializer
 from .base import BaseViewSet
 
+CLAIM_REJECTION_STATUS = {
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'already_claimed': status.HTTP_409_CONFLICT,
+    'sold_out': status.HTTP_409_CONFLICT,
+    'inactive': status.HTTP_409_CONFLICT,
+    'no_wallet': status.HTTP_409_CONFLICT,
+    'insufficient_points': status.HTTP_400_BAD_REQUEST,
+}
+
+MODERATION_REJECTION_STATUS = {
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'forbidden': status.HTTP_403_FORBIDDEN,
+}
+
+MAX_BULK_CLAIMS = 5000
+
 class PromotionViewSet(BaseViewSet):
     queryset = Promotion.objects.all()
     serializer_class = PromotionSerializer
@@ -24,41 +44,107 @@ class PromotionViewSet(BaseViewSet):
                 models.Q(business__members__user=self.request.user) |
                 models.Q(is_active=True)
             )
-        return queryset.select_related('business').prefetch_related('claims__user').distinct()
+        return self.with_claim_summary(queryset.select_related('business')).distinct()
+
+    def with_claim_summary(self, queryset):
+        """
+        Annotate claim count, remaining capacity and whether the requester has
+        claimed, with correlated subqueries instead of prefetching every claim
+        Remaining capacity comes from the counters claim_promotion enforces:
+        current_claims plus any shard counts
+        """
+        claim_count = PromotionClaim.objects.filter(
+            promotion=models.OuterRef('pk')
+        ).exclude(
+            status=PromotionClaim.ClaimStatus.REJECTED
+        ).order_by().values('promotion').annotate(
+            total=models.Count('pk')
+        ).values('total')
+        shard_count = PromotionClaimCounter.objects.filter(
+            promotion=models.OuterRef('pk')
+        ).order_by().values('promotion').annotate(
+            total=models.Sum('count')
+        ).values('total')
+        return queryset.annotate(
+            claim_count=Coalesce(models.Subquery(claim_count, output_field=models.IntegerField()), 0),
+            remaining_capacity=Greatest(
+                models.F('max_claims') - models.F('current_claims')
+                - Coalesce(models.Subquery(shard_count, output_field=models.IntegerField()), 0),
+                0,
+            ),
+            has_claimed=models.Exists(
+                PromotionClaim.objects.filter(promotion=models.OuterRef('pk'), user=self.request.user.pk)
+            ),
+        )
 
     def perform_create(self, serializer):
         # Business is required and should be set in serializer
         serializer.save()
 
-    @action(detail=True, methods=['post'])
-    def claim(self, request, pk=None):
-        promotion = self.get_object()
-        if promotion.status != 'active':
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def feed(self, request):
+        """
+        Public feed of promotions running right now, optionally per category.
+        Served from cache; only active rows inside their window are queried on a miss.
+        """
+        category = request.query_params.get('category')
+        if category and category not in Promotion.PromotionCategory.values:
             return Response(
-                {'error': 'This promotion is not active'},
+                {'error': 'Unknown promotion category'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        if promotion.claims.filter(user=request.user).exists():
+
+        feed = get_promotion_feed(
+            lambda promotions: PromotionFeedSerializer(promotions, many=True).data,
+            category=category,
+        )
+        page = self.paginate_queryset(feed)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(feed)
+
+    @action(detail=True, methods=['get'])
+    def claimers(self, request, pk=None):
+        """Paginated list of a promotion's claims, for the owning business"""
+        promotion = self.get_object()
+        is_team = (
+            request.user.is_staff
+            or promotion.business.user_id == request.user.id
+            or promotion.business.members.filter(user=request.user).exists()
+        )
+        if not is_team:
+            return Response(
+                {'error': 'Only the business team can list claimers'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        claims = promotion.claims.select_related('user', 'promotion').order_by('-claimed_at', '-pk')
+        page = self.paginate_queryset(claims)
+        serializer = PromotionClaimSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def claim(self, request, pk=None):
+        # Capacity, duplicate and points checks all happen inside claim_promotion's
+        # conditional UPDATEs, so skip get_object() and its claim prefetch here
+        try:
+            claim = claim_promotion(request.user, pk)
+        except ClaimRejected as exc:
             return Response(
-                {'error': 'You have already claimed this promotion'},
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': exc.message, 'code': exc.code},
+                status=CLAIM_REJECTION_STATUS.get(exc.code, status.HTTP_400_BAD_REQUEST)
             )
-            
-        serializer = PromotionClaimSerializer(
-            data={},
-            context={'request': request, 'promotion': promotion}
-        )
-        if serializer.is_valid():
-            serializer.save(user=request.user, promotion=promotion)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = PromotionClaimSerializer(claim, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 class PromotionClaimViewSet(BaseViewSet):
+    """Claims are made through PromotionViewSet.claim and change status only through moderation"""
     queryset = PromotionClaim.objects.all()
     serializer_class = PromotionClaimSerializer
     permission_classes = [IsAuthenticated]
-    filterset_fields = []
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    filterset_fields = ['status']
     search_fields = ['promotion__title', 'user__email']
     ordering_fields = ['claimed_at']
 
@@ -69,29 +155,80 @@ class PromotionClaimViewSet(BaseViewSet):
             'promotion', 'user'
         )
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def approve(self, request, pk=None):
-        claim = self.get_object()
-        if claim.promotion.business.user != request.user:
+    def create(self, request, *args, **kwargs):
+        return self.http_method_not_allowed(request, *args, **kwargs)
+
+    def claim_pk(self, pk):
+        try:
+            return int(pk)
+        except (TypeError, ValueError):
+            raise NotFound()
+
+    def moderate(self, request, new_status, claim_ids=None, promotion_id=None):
+        try:
+            updated, skipped = moderate_claims(
+                request.user,
+                new_status,
+                claim_ids=claim_ids,
+                promotion_id=promotion_id,
+                rejection_reason=request.data.get('rejection_reason', ''),
+                limit=MAX_BULK_CLAIMS if promotion_id is not None else None,
+            )
+        except ClaimRejected as exc:
             return Response(
-                {'error': 'Only the business owner can approve claims'},
-                status=status.HTTP_403_FORBIDDEN
+                {'error': exc.message, 'code': exc.code},
+                status=MODERATION_REJECTION_STATUS.get(exc.code, status.HTTP_400_BAD_REQUEST)
             )
-            
-        claim.status = 'approved'
-        claim.save()
-        return Response({'status': 'Claim approved'})
+        data = {'status': new_status, 'updated': updated, 'skipped': skipped}
+        if promotion_id is not None:
+            # At most MAX_BULK_CLAIMS claims per request; clients repeat while has_more
+            data['has_more'] = PromotionClaim.objects.filter(
+                promotion_id=promotion_id, status=PromotionClaim.ClaimStatus.PENDING
+            ).exists()
+        return Response(data)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def reject(self, request, pk=None):
-        claim = self.get_object()
-        if claim.promotion.business.user != request.user:
+    def moderate_bulk(self, request, new_status):
+        claim_ids = request.data.get('ids')
+        promotion_id = request.data.get('promotion')
+        if (claim_ids is None) == (promotion_id is None):
             return Response(
-                {'error': 'Only the business owner can reject claims'},
-                status=status.HTTP_403_FORBIDDEN
+                {'error': 'Provide either a list of claim ids or a promotion id'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-        claim.status = 'rejected'
-        claim.rejection_reason = request.data.get('rejection_reason', '')
-        claim.save()
-        return Response({'status': 'Claim rejected'})
\ No newline at end of file
+        if claim_ids is not None:
+            if not isinstance(claim_ids, list) or not all(isinstance(pk, int) for pk in claim_ids):
+                return Response(
+                    {'error': 'ids must be a list of integers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(claim_ids) > MAX_BULK_CLAIMS:
+                return Response(
+                    {'error': f'At most {MAX_BULK_CLAIMS} claims can be moderated per request'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif not isinstance(promotion_id, int):
+            return Response(
+                {'error': 'promotion must be an integer id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.moderate(request, new_status, claim_ids=claim_ids, promotion_id=promotion_id)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def approve(self, request, pk=None):
+        # Claims are only listed to their claimant, so ownership of the promotion
+        # is checked by moderate_claims rather than through get_object()
+        return self.moderate(request, PromotionClaim.ClaimStatus.APPROVED, claim_ids=[self.claim_pk(pk)])
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def reject(self, request, pk=None):
+        return self.moderate(request, PromotionClaim.ClaimStatus.REJECTED, claim_ids=[self.claim_pk(pk)])
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_approve(self, request):
+        """Approve pending claims given as {"ids": [...]} or {"promotion": id}"""
+        return self.moderate_bulk(request, PromotionClaim.ClaimStatus.APPROVED)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_reject(self, request):
+        """Reject pending claims, refunding points and releasing capacity in batches"""
+        return self.moderate_bulk(request, PromotionClaim.ClaimStatus.REJECTED)
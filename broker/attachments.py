@@ -0,0 +1,227 @@
+"""
+Chat attachments
+An upload is opened with its name and size, then receives its bytes as
+sequential chunks, each streamed from the request into a part file and then
+appended to the upload's file under ATTACHMENT_ROOT at the offset the client
+asserts. A chunk that does not start where the previous one ended is refused
+with the current offset, so a client resumes after a dropped connection by
+asking for the offset and sending the rest. The SHA-256 is updated chunk by chunk; a process that did not see the
+earlier chunks rebuilds it once from the file. Completing the upload creates
+the IMAGE or FILE message.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttachmentUpload, Message
+
+MAX_ATTACHMENT_SIZE = 100 * 1024 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+READ_BLOCK_SIZE = 64 * 1024
+STALE_UPLOAD_HOURS = 24
+# Running digests of uploads in progress, kept per process
+HASHER_CACHE_SIZE = 256
+
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+class UploadRejected(Exception):
+    """Raised when an upload step cannot be accepted; `code` is stable for API clients"""
+
+    def __init__(self, message, code, offset=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.offset = offset
+
+
+def attachment_root():
+    return Path(getattr(settings, 'ATTACHMENT_ROOT', Path(settings.BASE_DIR) / 'attachments'))
+
+
+def attachment_path(upload):
+    return attachment_root() / str(upload.conversation_id) / str(upload.pk)
+
+
+def message_type_for(content_type):
+    return Message.MessageType.IMAGE if content_type.startswith('image/') else Message.MessageType.FILE
+
+
+def start_upload(user, conversation, filename, size, content_type):
+    """Open an upload in a conversation the user takes part in and create its empty file"""
+    if user.pk not in (conversation.buyer_id, conversation.seller_id):
+        raise UploadRejected('You are not a participant in this conversation', 'forbidden')
+    if not 0 < size <= MAX_ATTACHMENT_SIZE:
+        raise UploadRejected(f'size must be between 1 and {MAX_ATTACHMENT_SIZE} bytes', 'invalid_size')
+    upload = AttachmentUpload.objects.create(
+        conversation=conversation,
+        uploader=user,
+        filename=os.path.basename(filename)[:255] or 'attachment',
+        content_type=content_type or 'application/octet-stream',
+        size=size,
+    )
+    path = attachment_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload
+
+
+def _hasher(upload, path):
+    """The running digest of the first upload.received_size bytes"""
+    with _hashers_lock:
+        cached = _hashers.pop(upload.pk, None)
+    if cached is not None and cached[0] == upload.received_size:
+        return cached[1]
+    hasher = hashlib.sha256()
+    remaining = upload.received_size
+    with open(path, 'rb') as handle:
+        while remaining:
+            block = handle.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _remember_hasher(upload_id, offset, hasher):
+    with _hashers_lock:
+        _hashers[upload_id] = (offset, hasher)
+        while len(_hashers) > HASHER_CACHE_SIZE:
+            _hashers.popitem(last=False)
+
+
+def _spool_chunk(upload, stream, length):
+    """Copy `length` bytes from the client into a part file of its own; returns the part path"""
+    part = attachment_path(upload).with_name(f'{upload.pk}.{uuid.uuid4().hex}.part')
+    written = 0
+    try:
+        with open(part, 'wb') as handle:
+            while written < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                handle.write(block)
+                written += len(block)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    if written != length:
+        part.unlink(missing_ok=True)
+        raise UploadRejected('The chunk ended early', 'incomplete_chunk', upload.received_size)
+    return part
+
+
+def write_chunk(upload_id, user, offset, stream, length):
+    """
+    Append `length` bytes read from `stream` at `offset`; returns the new
+    received size. The chunk is read from the client into a part file with no
+    transaction open, so a slow client holds neither a lock nor a connection's
+    transaction. It is then appended under a conditional
+    UPDATE ... WHERE received_size = offset, which lets exactly one of two
+    racing writers of the same offset through
+    """
+    upload = AttachmentUpload.objects.filter(pk=upload_id, uploader=user).first()
+    if upload is None:
+        raise UploadRejected('Upload not found', 'not_found')
+    if upload.is_complete:
+        raise UploadRejected('This upload is already complete', 'complete', upload.received_size)
+    if offset != upload.received_size:
+        raise UploadRejected('Chunk does not start at the current offset', 'offset_mismatch', upload.received_size)
+    if not 0 < length <= MAX_CHUNK_SIZE:
+        raise UploadRejected(f'Chunks must be between 1 and {MAX_CHUNK_SIZE} bytes', 'invalid_chunk')
+    if offset + length > upload.size:
+        raise UploadRejected('Chunk runs past the declared size', 'too_large', upload.received_size)
+
+    part = _spool_chunk(upload, stream, length)
+    try:
+        with transaction.atomic():
+            advanced = AttachmentUpload.objects.filter(
+                pk=upload.pk, received_size=offset, completed_at__isnull=True
+            ).update(received_size=offset + length, updated_at=timezone.now())
+            if not advanced:
+                current = AttachmentUpload.objects.filter(pk=upload.pk).values_list('received_size', flat=True).first()
+                raise UploadRejected('Chunk does not start at the current offset', 'offset_mismatch', current)
+            # The row stays locked by the UPDATE until commit, so only local disk I/O happens under it
+            path = attachment_path(upload)
+            hasher = _hasher(upload, path)
+            with open(path, 'r+b') as handle, open(part, 'rb') as chunk:
+                # Drop whatever a failed earlier attempt left past the committed offset
+                handle.truncate(offset)
+                handle.seek(offset)
+                while block := chunk.read(READ_BLOCK_SIZE):
+                    handle.write(block)
+                    hasher.update(block)
+    finally:
+        part.unlink(missing_ok=True)
+
+    _remember_hasher(upload.pk, offset + length, hasher)
+    return offset + length
+
+
+@transaction.atomic
+def complete_upload(upload_id, user, sha256='', caption=''):
+    """
+    Finish an upload whose bytes have all arrived and create its message;
+    completing twice returns the same message
+    """
+    upload = AttachmentUpload.objects.select_for_update().select_related('conversation').filter(
+        pk=upload_id, uploader=user
+    ).first()
+    if upload is None:
+        raise UploadRejected('Upload not found', 'not_found')
+    if upload.is_complete:
+        return upload.message
+    if upload.received_size != upload.size:
+        raise UploadRejected('The upload is missing data', 'incomplete', upload.received_size)
+
+    digest = _hasher(upload, attachment_path(upload)).hexdigest()
+    if sha256 and sha256.lower() != digest:
+        raise UploadRejected('Checksum mismatch', 'checksum_mismatch', upload.received_size)
+
+    message = Message.objects.create(
+        conversation=upload.conversation,
+        sender=user,
+        message_type=message_type_for(upload.content_type),
+        content=caption,
+        metadata={'attachment': {
+            'id': upload.pk,
+            'filename': upload.filename,
+            'content_type': upload.content_type,
+            'size': upload.size,
+            'sha256': digest,
+        }},
+    )
+    upload.message = message
+    upload.sha256 = digest
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['message', 'sha256', 'completed_at', 'updated_at'])
+    with _hashers_lock:
+        _hashers.pop(upload.pk, None)
+    return message
+
+
+def purge_stale_uploads(now=None, hours=STALE_UPLOAD_HOURS):
+    """Delete unfinished uploads untouched for `hours` and their files; returns how many"""
+    now = now or timezone.now()
+    stale = AttachmentUpload.objects.filter(completed_at__isnull=True, updated_at__lt=now - timedelta(hours=hours))
+    # Files go with the rows through the post_delete signal
+    count, _ = stale.delete()
+    return count
+
+
+def remove_file(upload):
+    """Delete the file behind an upload and any chunk a crashed writer left, if still there"""
+    path = attachment_path(upload)
+    path.unlink(missing_ok=True)
+    for part in path.parent.glob(f'{upload.pk}.*.part'):
+        part.unlink(missing_ok=True)
@@ -0,0 +1,33 @@
+"""
+Versioned cache keys
+A family of cached values (every category feed, every tag cloud size) is
+dropped at once by bumping a version number that is part of each key; the old
+entries are never read again and expire on their own
+"""
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return f'{name}_version'
+
+
+def cache_version(name):
+    """Current version of the `name` family, starting at 1"""
+    version = cache.get(_version_key(name))
+    if version is None:
+        version = 1
+        cache.add(_version_key(name), version, None)
+    return version
+
+
+def bump_cache_version(name):
+    """Invalidate every key of the `name` family by moving to a new version"""
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), 2, None)
+
+
+def versioned_key(name, *parts):
+    """Cache key for one member of the `name` family at its current version"""
+    return '_'.join([f'{name}_v{cache_version(name)}', *map(str, parts)])
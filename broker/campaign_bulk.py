@@ -0,0 +1,92 @@
+"""
+Bulk campaign onboarding
+Attaches many listings or collaborators to a campaign with one existence
+check per referenced table and batched inserts. Rows that already exist are
+left alone through the unique_together constraints, and every item gets its own
+result so clients can tell what happened to each one.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import access
+from .models import CampaignCollaborator, CampaignProduct, Listing
+
+User = get_user_model()
+
+INSERT_BATCH_SIZE = 500
+
+
+def _attach(campaign, items, key, model, known_ids, build):
+    """
+    Insert one row per item whose `key` refers to a known id and is not
+    attached yet; returns a result dict per item, in input order
+    """
+    keys = [item[key] for item in items]
+    attached = dict(
+        model.objects.filter(campaign=campaign, **{f'{key}_id__in': keys}).values_list(f'{key}_id', 'pk')
+    )
+
+    results, new_rows, seen = [], [], set()
+    for index, item in enumerate(items):
+        value = item[key]
+        result = {'index': index, key: value}
+        if value not in known_ids:
+            result.update(status='invalid', errors={key: [f'Invalid pk "{value}" - object does not exist.']})
+        elif value in attached:
+            result.update(status='exists', id=attached[value])
+        elif value in seen:
+            result.update(status='duplicate')
+        else:
+            seen.add(value)
+            result.update(status='created')
+            new_rows.append(build(item))
+        results.append(result)
+
+    # Rows attached concurrently since the lookup above are skipped by the constraint
+    model.objects.bulk_create(new_rows, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+    created = dict(
+        model.objects.filter(campaign=campaign, **{f'{key}_id__in': seen}).values_list(f'{key}_id', 'pk')
+    )
+    for result in results:
+        if result['status'] == 'created':
+            result['id'] = created.get(result[key])
+    return results
+
+
+@transaction.atomic
+def attach_products(campaign, items):
+    """Attach listings given as validated {listing, commission_rate, status, notes} items"""
+    known = set(Listing.objects.filter(
+        pk__in={item['listing'] for item in items}
+    ).values_list('pk', flat=True))
+    return _attach(
+        campaign, items, 'listing', CampaignProduct, known,
+        lambda item: CampaignProduct(
+            campaign=campaign,
+            listing_id=item['listing'],
+            commission_rate=item.get('commission_rate'),
+            status=item.get('status', CampaignProduct.Status.PENDING),
+            notes=item.get('notes'),
+        ),
+    )
+
+
+@transaction.atomic
+def attach_collaborators(campaign, items):
+    """Invite users given as validated {user, role, status} items"""
+    known = set(User.objects.filter(
+        pk__in={item['user'] for item in items}
+    ).values_list('pk', flat=True))
+    results = _attach(
+        campaign, items, 'user', CampaignCollaborator, known,
+        lambda item: CampaignCollaborator(
+            campaign=campaign,
+            user_id=item['user'],
+            role=item['role'],
+            status=item.get('status', CampaignCollaborator.CollaboratorStatus.PENDING),
+        ),
+    )
+    # bulk_create sends no post_save, so refresh the campaign's grants in one pass
+    if any(result['status'] == 'created' for result in results):
+        access.sync_campaign_access(campaign.pk)
+    return results
@@ -0,0 +1,93 @@
+"""
+Campaign lifecycle scheduling
+Moves campaigns DRAFT -> ACTIVE -> COMPLETED when their start/end boundaries
+pass, with set-based UPDATEs over the (status, start_date, end_date) index.
+Safe to run on several nodes: PostgreSQL ticks are serialized by an advisory
+lock, and rows are claimed with SKIP LOCKED everywhere else.
+"""
+import zlib
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Campaign
+from .signals import campaign_status_changed
+
+Status = Campaign.CampaignStatus
+
+TRANSITION_BATCH_SIZE = 1000
+SCHEDULER_LOCK_KEY = zlib.crc32(b'broker.campaign_lifecycle')
+
+
+def transitions(now):
+    """(from statuses, to status, boundary filter) for every automatic move"""
+    return [
+        ([Status.DRAFT], Status.ACTIVE, Q(start_date__lte=now, end_date__gt=now)),
+        ([Status.ACTIVE, Status.PAUSED], Status.COMPLETED, Q(end_date__lte=now)),
+    ]
+
+
+@contextmanager
+def scheduler_lock():
+    """
+    Yield True if this node may run the current tick
+    Uses a transaction-scoped advisory lock on PostgreSQL; other backends rely
+    on the SKIP LOCKED row claims alone
+    """
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [SCHEDULER_LOCK_KEY])
+        yield cursor.fetchone()[0]
+
+
+def _move_batch(from_statuses, to_status, boundary, now, batch_size):
+    """
+    Claim up to batch_size due campaigns and move them with one UPDATE
+    Returns [(from_status, [campaign ids])]
+    """
+    claimed = Campaign.objects.filter(boundary, status__in=from_statuses).order_by().select_for_update(
+        skip_locked=True
+    ).values_list('pk', 'status')[:batch_size]
+    by_status = {}
+    for pk, status in claimed:
+        by_status.setdefault(status, []).append(pk)
+    if by_status:
+        Campaign.objects.filter(
+            pk__in=[pk for pks in by_status.values() for pk in pks]
+        ).update(status=to_status, updated_at=now)
+    return list(by_status.items())
+
+
+def advance_campaigns(now=None, batch_size=TRANSITION_BATCH_SIZE):
+    """
+    Run one scheduler tick and return {(from_status, to_status): count}
+    Each batch commits on its own; campaign_status_changed is sent after commit
+    """
+    now = now or timezone.now()
+    moved = {}
+    for from_statuses, to_status, boundary in transitions(now):
+        while True:
+            with transaction.atomic():
+                with scheduler_lock() as acquired:
+                    if not acquired:
+                        return moved
+                    batch = _move_batch(from_statuses, to_status, boundary, now, batch_size)
+                for from_status, pks in batch:
+                    transaction.on_commit(
+                        lambda pks=pks, from_status=from_status, to_status=to_status: campaign_status_changed.send(
+                            sender=Campaign,
+                            campaign_ids=pks,
+                            from_status=from_status,
+                            to_status=to_status,
+                        )
+                    )
+            for from_status, pks in batch:
+                key = (from_status, to_status)
+                moved[key] = moved.get(key, 0) + len(pks)
+            if sum(len(pks) for _, pks in batch) < batch_size:
+                break
+    return moved
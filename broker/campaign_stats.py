@@ -0,0 +1,241 @@
+"""
+Campaign analytics rollups
+Aggregates products, collaborators, linked promotion claims and attributed
+orders into one CampaignStats row per campaign. Refreshes are incremental:
+only campaigns whose source rows changed since the previous run (or that a
+delete marked dirty) are recomputed, with one grouped query per metric.
+
+Orders are ORDER messages in conversations about listings approved into the
+campaign, sent inside the campaign window. Commission accrues on the listing
+price at the campaign product's rate, falling back to the listing's own rate.
+Orders moved into message archive segments are counted from the segments'
+order_times, so archiving a conversation does not shrink the rollups.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Campaign,
+    CampaignCollaborator,
+    CampaignProduct,
+    CampaignStats,
+    Message,
+    MessageArchiveSegment,
+    Promotion,
+    PromotionClaim,
+)
+
+REFRESH_BATCH_SIZE = 500
+# Re-read a little history so rows committed just after the previous run are not missed
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+STAT_FIELDS = [
+    'product_count',
+    'approved_product_count',
+    'collaborator_count',
+    'accepted_collaborator_count',
+    'promotion_count',
+    'claim_count',
+    'order_count',
+    'commission_total',
+]
+
+ORDER_CAMPAIGN = 'conversation__listing__campaign_products__campaign'
+
+
+def touched_campaign_ids(since):
+    """Ids of campaigns with a source row created or updated after `since`"""
+    sources = [
+        Campaign.objects.filter(updated_at__gt=since).values_list('pk', flat=True),
+        Campaign.objects.filter(stats__isnull=True).values_list('pk', flat=True),
+        CampaignStats.objects.filter(is_dirty=True).values_list('campaign_id', flat=True),
+        CampaignProduct.objects.filter(updated_at__gt=since).values_list('campaign_id', flat=True),
+        CampaignCollaborator.objects.filter(updated_at__gt=since).values_list('campaign_id', flat=True),
+        Promotion.objects.filter(
+            updated_at__gt=since, campaign__isnull=False
+        ).values_list('campaign_id', flat=True),
+        PromotionClaim.objects.filter(
+            updated_at__gt=since, promotion__campaign__isnull=False
+        ).values_list('promotion__campaign_id', flat=True),
+        Message.objects.filter(
+            created_at__gt=since,
+            message_type=Message.MessageType.ORDER,
+            **{f'{ORDER_CAMPAIGN}__isnull': False},
+        ).values_list(f'{ORDER_CAMPAIGN}_id', flat=True),
+    ]
+    ids = set()
+    for source in sources:
+        ids.update(source.order_by().distinct())
+    return ids
+
+
+def _grouped(queryset, key, **aggregates):
+    """{campaign id: {aggregate: value}} from one GROUP BY query"""
+    return {
+        row.pop(key): row
+        for row in queryset.order_by().values(key).annotate(**aggregates)
+    }
+
+
+def _commission(price, *rates):
+    rate = next((rate for rate in rates if rate is not None), Decimal('0'))
+    return price * rate / Decimal('100')
+
+
+def archived_orders(campaign_ids):
+    """
+    {campaign id: {'order_count', 'commission_total'}} for ORDER messages that
+    now live in archive segments, with the same attribution rules as the hot ones
+    """
+    links = CampaignProduct.objects.filter(
+        campaign_id__in=campaign_ids,
+        status=CampaignProduct.Status.APPROVED,
+        listing__conversations__archived_message_count__gt=0,
+    ).values_list(
+        'campaign_id', 'campaign__start_date', 'campaign__end_date', 'commission_rate',
+        'listing__price', 'listing__commission_rate', 'listing__conversations',
+    )
+    by_conversation = {}
+    for *link, conversation_id in links:
+        by_conversation.setdefault(conversation_id, []).append(link)
+    if not by_conversation:
+        return {}
+
+    orders = {}
+    segments = MessageArchiveSegment.objects.filter(
+        conversation_id__in=by_conversation
+    ).exclude(order_times=[]).values_list('conversation_id', 'order_times')
+    for conversation_id, order_times in segments.iterator():
+        times = [parse_datetime(at) for at in order_times]
+        for campaign_id, start, end, product_rate, price, listing_rate in by_conversation[conversation_id]:
+            count = sum(1 for at in times if start <= at <= end)
+            if not count:
+                continue
+            totals = orders.setdefault(campaign_id, {'order_count': 0, 'commission_total': Decimal('0')})
+            totals['order_count'] += count
+            if price is not None:
+                totals['commission_total'] += count * _commission(price, product_rate, listing_rate)
+    return orders
+
+
+def compute_stats(campaign_ids):
+    """Fresh metric values for a batch of campaigns, as {campaign id: {field: value}}"""
+    products = _grouped(
+        CampaignProduct.objects.filter(campaign_id__in=campaign_ids),
+        'campaign_id',
+        product_count=Count('pk'),
+        approved_product_count=Count('pk', filter=Q(status=CampaignProduct.Status.APPROVED)),
+    )
+    collaborators = _grouped(
+        CampaignCollaborator.objects.filter(campaign_id__in=campaign_ids).exclude(
+            status=CampaignCollaborator.CollaboratorStatus.REMOVED
+        ),
+        'campaign_id',
+        collaborator_count=Count('pk'),
+        accepted_collaborator_count=Count(
+            'pk', filter=Q(status=CampaignCollaborator.CollaboratorStatus.ACCEPTED)
+        ),
+    )
+    promotions = _grouped(
+        Promotion.objects.filter(campaign_id__in=campaign_ids),
+        'campaign_id',
+        promotion_count=Count('pk'),
+    )
+    claims = _grouped(
+        PromotionClaim.objects.filter(promotion__campaign_id__in=campaign_ids).exclude(
+            status=PromotionClaim.ClaimStatus.REJECTED
+        ),
+        'promotion__campaign_id',
+        claim_count=Count('pk'),
+    )
+    # A single filter() call keeps every campaign_products condition on the same join
+    orders = _grouped(
+        Message.objects.filter(**{
+            'message_type': Message.MessageType.ORDER,
+            f'{ORDER_CAMPAIGN}__in': campaign_ids,
+            'conversation__listing__campaign_products__status': CampaignProduct.Status.APPROVED,
+            'created_at__gte': F(f'{ORDER_CAMPAIGN}__start_date'),
+            'created_at__lte': F(f'{ORDER_CAMPAIGN}__end_date'),
+        }),
+        f'{ORDER_CAMPAIGN}_id',
+        order_count=Count('pk'),
+        commission_total=Sum(ExpressionWrapper(
+            F('conversation__listing__price') * Coalesce(
+                'conversation__listing__campaign_products__commission_rate',
+                'conversation__listing__commission_rate',
+                Value(Decimal('0')),
+            ) / Value(Decimal('100')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )),
+    )
+
+    archived = archived_orders(campaign_ids)
+
+    stats = {}
+    for campaign_id in campaign_ids:
+        values = dict.fromkeys(STAT_FIELDS, 0)
+        for metric in (products, collaborators, promotions, claims, orders):
+            values.update(metric.get(campaign_id, {}))
+        values['commission_total'] = Decimal(values['commission_total'] or 0)
+        if campaign_id in archived:
+            values['order_count'] += archived[campaign_id]['order_count']
+            values['commission_total'] += archived[campaign_id]['commission_total']
+        values['commission_total'] = values['commission_total'].quantize(Decimal('0.01'))
+        stats[campaign_id] = values
+    return stats
+
+
+def _batches(ids, size):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def refresh_campaign_stats(campaign_ids, now=None, batch_size=REFRESH_BATCH_SIZE):
+    """Recompute and upsert the rollup rows of the given campaigns; returns how many were written"""
+    now = now or timezone.now()
+    written = 0
+    for batch in _batches(campaign_ids, batch_size):
+        with transaction.atomic():
+            existing = list(Campaign.objects.filter(pk__in=batch).values_list('pk', flat=True))
+            if not existing:
+                continue
+            stats = compute_stats(existing)
+            CampaignStats.objects.bulk_create(
+                [
+                    CampaignStats(campaign_id=campaign_id, refreshed_at=now, is_dirty=False, **values)
+                    for campaign_id, values in stats.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['campaign'],
+                update_fields=[*STAT_FIELDS, 'is_dirty', 'refreshed_at'],
+            )
+            written += len(stats)
+    return written
+
+
+def refresh_stale_stats(full=False, batch_size=REFRESH_BATCH_SIZE):
+    """
+    Refresh every campaign touched since the previous run, or all campaigns
+    when `full` is set or nothing has been rolled up yet
+    """
+    now = timezone.now()
+    since = None if full else CampaignStats.objects.aggregate(at=Max('refreshed_at'))['at']
+    if since is None:
+        campaign_ids = set(Campaign.objects.values_list('pk', flat=True))
+    else:
+        campaign_ids = touched_campaign_ids(since - REFRESH_OVERLAP)
+    return refresh_campaign_stats(campaign_ids, now, batch_size)
+
+
+def mark_stats_dirty(campaign_ids):
+    """Flag rollups for recomputation; used where a delete leaves no timestamp behind"""
+    campaign_ids = [pk for pk in campaign_ids if pk]
+    if campaign_ids:
+        CampaignStats.objects.filter(campaign_id__in=campaign_ids, is_dirty=False).update(is_dirty=True)
@@ -0,0 +1,286 @@
+"""
+Promotion claiming
+Reserves promotion capacity with conditional UPDATEs instead of read-then-write
+checks, so concurrent claimers never over-allocate and never queue on a lock
+longer than the final statement of their transaction
+"""
+import random
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Promotion, PromotionClaim, PromotionClaimCounter, Wallet
+
+CLAIM_TOTAL_CACHE_SECONDS = 5
+MODERATION_BATCH_SIZE = 1000
+
+
+class ClaimRejected(Exception):
+    """Raised when a claim cannot be granted; `code` is stable for API clients"""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def claimable_promotions(now=None):
+    """Promotions that are active and inside their claim window"""
+    now = now or timezone.now()
+    return Promotion.objects.filter(is_active=True, start_date__lte=now, end_date__gte=now)
+
+
+def _reserve_capacity(promotion_id, now):
+    """Take one slot with UPDATE ... SET current_claims = current_claims + 1 WHERE current_claims < max_claims"""
+    return claimable_promotions(now).filter(
+        pk=promotion_id,
+        current_claims__lt=F('max_claims'),
+    ).update(current_claims=F('current_claims') + 1)
+
+
+def _reserve_shard(promotion_id, shards):
+    """
+    Take one slot from a randomly picked counter shard, falling back to the
+    other shards when it is exhausted. Shard capacities add up to the remaining
+    capacity, so this stays strict even when the promotion is nearly sold out.
+    """
+    order = list(range(shards))
+    random.shuffle(order)
+    for shard in order:
+        if PromotionClaimCounter.objects.filter(
+            promotion_id=promotion_id,
+            shard=shard,
+            count__lt=F('capacity'),
+        ).update(count=F('count') + 1):
+            return True
+    return False
+
+
+def _rejection_for(promotion_id, now):
+    """Explain why a capacity reservation matched no rows"""
+    promotion = Promotion.objects.filter(pk=promotion_id).only(
+        'is_active', 'start_date', 'end_date', 'max_claims', 'current_claims'
+    ).first()
+    if promotion is None:
+        return ClaimRejected('Promotion not found', 'not_found')
+    if not promotion.is_active or not promotion.start_date <= now <= promotion.end_date:
+        return ClaimRejected('This promotion is not active', 'inactive')
+    return ClaimRejected('This promotion has no claims left', 'sold_out')
+
+
+@transaction.atomic
+def claim_promotion(user, promotion_id):
+    """
+    Claim a promotion for a user in one transaction
+
+    The claim row is inserted first and relies on the (user, promotion) unique
+    constraint to reject duplicates, then the points cost is deducted with a
+    conditional UPDATE on the user's own wallet row. The shared promotion row
+    (or one of its counter shards) is touched last so its row lock is held only
+    until commit.
+    """
+    now = timezone.now()
+    promotion = Promotion.objects.filter(pk=promotion_id).values(
+        'points_cost', 'counter_shards', 'is_active', 'start_date', 'end_date'
+    ).first()
+    if promotion is None:
+        raise ClaimRejected('Promotion not found', 'not_found')
+    points_cost = promotion['points_cost']
+
+    try:
+        with transaction.atomic():
+            # Recorded up front; a rejection below rolls the whole claim back
+            claim = PromotionClaim.objects.create(
+                user=user, promotion_id=promotion_id, points=points_cost, capacity_reserved=True
+            )
+    except IntegrityError:
+        raise ClaimRejected('You have already claimed this promotion', 'already_claimed')
+
+    if points_cost:
+        charged = Wallet.objects.filter(user=user, points__gte=points_cost).update(
+            points=F('points') - points_cost,
+            updated_at=now,
+        )
+        if not charged:
+            if not Wallet.objects.filter(user=user).exists():
+                raise ClaimRejected('You need a wallet to claim this promotion', 'no_wallet')
+            raise ClaimRejected('Not enough points to claim this promotion', 'insufficient_points')
+
+    if promotion['counter_shards']:
+        if not promotion['is_active'] or not promotion['start_date'] <= now <= promotion['end_date']:
+            raise ClaimRejected('This promotion is not active', 'inactive')
+        if not _reserve_shard(promotion_id, promotion['counter_shards']):
+            raise ClaimRejected('This promotion has no claims left', 'sold_out')
+    elif not _reserve_capacity(promotion_id, now):
+        raise _rejection_for(promotion_id, now)
+
+    return claim
+
+
+def promotion_claim_total(promotion):
+    """
+    Claims granted so far; sharded promotions sum their shards, cached briefly
+    since the shards are what absorbs the write traffic
+    """
+    if not promotion.counter_shards:
+        return promotion.current_claims
+    cache_key = f'promotion_claim_total_{promotion.pk}'
+    total = cache.get(cache_key)
+    if total is None:
+        shard_total = PromotionClaimCounter.objects.filter(promotion=promotion).aggregate(
+            total=Sum('count')
+        )['total'] or 0
+        current_claims = Promotion.objects.filter(pk=promotion.pk).values_list(
+            'current_claims', flat=True
+        ).first()
+        if current_claims is None:
+            # Deleted since it was loaded; its shards went with it
+            return promotion.current_claims
+        total = current_claims + shard_total
+        cache.set(cache_key, total, CLAIM_TOTAL_CACHE_SECONDS)
+    return total
+
+
+def _split_capacity(remaining, shards):
+    """Spread the remaining capacity as evenly as possible over the shards"""
+    if not shards:
+        return []
+    base, extra = divmod(max(remaining, 0), shards)
+    return [base + (1 if shard < extra else 0) for shard in range(shards)]
+
+
+@transaction.atomic
+def compact_claim_counters(promotion_id):
+    """
+    Fold a promotion's shard counts into current_claims and re-split the
+    remaining capacity across `counter_shards` fresh shards
+    Returns the number of claims folded in
+    """
+    # NO KEY UPDATE still lets in-flight claims reference the promotion row
+    promotion = Promotion.objects.select_for_update(no_key=True).filter(pk=promotion_id).first()
+    if promotion is None:
+        return 0
+    counters = list(
+        PromotionClaimCounter.objects.select_for_update().filter(promotion=promotion).order_by('shard')
+    )
+    folded = sum(counter.count for counter in counters)
+    if not counters and not promotion.counter_shards:
+        return 0
+
+    current_claims = promotion.current_claims + folded
+    Promotion.objects.filter(pk=promotion.pk).update(current_claims=current_claims)
+
+    capacities = _split_capacity(promotion.max_claims - current_claims, promotion.counter_shards)
+    PromotionClaimCounter.objects.filter(
+        promotion=promotion, shard__gte=promotion.counter_shards
+    ).delete()
+    existing = {counter.shard: counter for counter in counters}
+    to_update, to_create = [], []
+    for shard, capacity in enumerate(capacities):
+        counter = existing.get(shard)
+        if counter is None:
+            to_create.append(PromotionClaimCounter(promotion=promotion, shard=shard, capacity=capacity))
+        else:
+            counter.count = 0
+            counter.capacity = capacity
+            to_update.append(counter)
+    PromotionClaimCounter.objects.bulk_update(to_update, ['count', 'capacity'])
+    PromotionClaimCounter.objects.bulk_create(to_create)
+
+    cache.delete(f'promotion_claim_total_{promotion.pk}')
+    return folded
+
+
+@transaction.atomic
+def release_claim_capacity(promotion_id, count):
+    """Give `count` claim slots back to a promotion, folding shards around the change"""
+    sharded = Promotion.objects.filter(pk=promotion_id, counter_shards__gt=0).exists()
+    if sharded:
+        compact_claim_counters(promotion_id)
+    Promotion.objects.filter(pk=promotion_id).update(
+        current_claims=Greatest(F('current_claims') - count, 0)
+    )
+    if sharded:
+        compact_claim_counters(promotion_id)
+
+
+def _batches(items, size=MODERATION_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@transaction.atomic
+def moderate_claims(owner, new_status, claim_ids=None, promotion_id=None, rejection_reason=None, limit=None):
+    """
+    Approve or reject pending claims on promotions of businesses owned by `owner`
+
+    Claims are selected either by id or as the oldest `limit` pending claims of
+    one promotion (all of them when limit is None).
+    Ownership is checked and the rows are locked with a single joined query, the
+    status change is one UPDATE, and rejections refund points and release
+    capacity in per-promotion batches. Only claims that reserved capacity are
+    refunded, by the points they were charged; older claims never took either.
+    Claims that are no longer pending are skipped. Returns (updated_ids, skipped_ids).
+    """
+    Status = PromotionClaim.ClaimStatus
+    claims = PromotionClaim.objects.select_for_update(of=('self',)).filter(
+        promotion__business__user=owner
+    )
+    columns = ('pk', 'promotion_id', 'user_id', 'status', 'points', 'capacity_reserved')
+    if claim_ids is not None:
+        rows = list(claims.filter(pk__in=claim_ids).values_list(*columns))
+        foreign = set(claim_ids) - {row[0] for row in rows}
+        if foreign:
+            missing = foreign - set(PromotionClaim.objects.filter(pk__in=foreign).values_list('pk', flat=True))
+            if missing:
+                raise ClaimRejected(f'Claims not found: {sorted(missing)}', 'not_found')
+            raise ClaimRejected(
+                f'Only the business owner can moderate claims {sorted(foreign)}', 'forbidden'
+            )
+    else:
+        promotion = Promotion.objects.filter(pk=promotion_id).values('business__user').first()
+        if promotion is None:
+            raise ClaimRejected('Promotion not found', 'not_found')
+        if promotion['business__user'] != owner.pk:
+            raise ClaimRejected('Only the business owner can moderate these claims', 'forbidden')
+        rows = claims.filter(promotion_id=promotion_id, status=Status.PENDING).order_by('pk').values_list(*columns)
+        rows = list(rows[:limit] if limit is not None else rows)
+
+    pending = [row for row in rows if row[3] == Status.PENDING]
+    skipped = [row[0] for row in rows if row[3] != Status.PENDING]
+    updated = [row[0] for row in pending]
+    if not pending:
+        return updated, skipped
+
+    now = timezone.now()
+    PromotionClaim.objects.filter(pk__in=updated).update(
+        status=new_status,
+        rejection_reason=rejection_reason if new_status == Status.REJECTED else None,
+        updated_at=now,
+    )
+
+    if new_status == Status.REJECTED:
+        released = {}
+        refunds = {}
+        for _, claim_promotion_id, user_id, _, points, reserved in pending:
+            if reserved:
+                released[claim_promotion_id] = released.get(claim_promotion_id, 0) + 1
+                refunds[user_id] = refunds.get(user_id, 0) + max(points, 0)
+        # Wallets owed the same amount are credited with one UPDATE per batch
+        users_by_amount = {}
+        for user_id, amount in refunds.items():
+            if amount:
+                users_by_amount.setdefault(amount, []).append(user_id)
+        for amount, user_ids in users_by_amount.items():
+            for batch in _batches(user_ids):
+                Wallet.objects.filter(user_id__in=batch).update(
+                    points=F('points') + amount,
+                    updated_at=now,
+                )
+        for claim_promotion_id, count in released.items():
+            release_claim_capacity(claim_promotion_id, count)
+
+    return updated, skipped
@@ -0,0 +1,315 @@
+"""
+Document image hashing
+An offline worker fetches KYC and business document images, computes a 64-bit
+average hash (aHash) and difference hash (dHash) with Pillow and stores them
+in DocumentImageHash. Re-used ID images hash to values a few bits apart, so a
+new hash is compared against the hashes of every other user's documents.
+
+Comparing against all of them is avoided with a multi-index lookup: the dHash
+is split into BAND_COUNT bands of 16 bits, each indexed. Two hashes within
+MATCH_DISTANCE bits of each other must have at least one band within
+MATCH_DISTANCE // BAND_COUNT bits, so the candidates are the rows whose band
+equals ours or one of its few single-bit variants; only those are compared in
+full. A match is flagged on the new row as duplicate_of.
+
+Image URLs are user supplied, so fetching is limited to public addresses
+(checked on every connection, redirects included) and, when
+DOCUMENT_IMAGE_HOSTS is set, to the document storage hosts listed there.
+"""
+import ipaddress
+import socket
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from io import BytesIO
+from itertools import combinations
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import (
+    HTTPDefaultErrorHandler, HTTPErrorProcessor, HTTPHandler, HTTPRedirectHandler, HTTPSHandler, OpenerDirector,
+    UnknownHandler,
+)
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import BusinessDocument, DocumentImageHash, KYCVerification
+
+HASH_SIZE = 8
+BAND_COUNT = 4
+BAND_BITS = HASH_SIZE * HASH_SIZE // BAND_COUNT
+MATCH_DISTANCE = 7
+BAND_RADIUS = MATCH_DISTANCE // BAND_COUNT
+# The aHash has to agree loosely too, which weeds out plain templates whose gradients match
+AHASH_DISTANCE = 12
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+FETCH_TIMEOUT = 10
+MAX_REDIRECTS = 3
+BATCH_SIZE = 100
+
+KYC_IMAGE_FIELDS = ('document_front', 'document_back', 'selfie')
+
+
+class ImageUnavailable(Exception):
+    """Raised when a document image cannot be fetched or decoded"""
+
+
+def _bits(values):
+    value = 0
+    for bit in values:
+        value = (value << 1) | bit
+    return value
+
+
+def grayscale(image, size):
+    return ImageOps.exif_transpose(image).convert('L').resize(size, Image.Resampling.LANCZOS)
+
+
+def average_hash(image):
+    pixels = list(grayscale(image, (HASH_SIZE, HASH_SIZE)).getdata())
+    mean = sum(pixels) / len(pixels)
+    return _bits(pixel > mean for pixel in pixels)
+
+
+def difference_hash(image):
+    pixels = list(grayscale(image, (HASH_SIZE + 1, HASH_SIZE)).getdata())
+    width = HASH_SIZE + 1
+    return _bits(
+        pixels[row * width + col] < pixels[row * width + col + 1]
+        for row in range(HASH_SIZE) for col in range(HASH_SIZE)
+    )
+
+
+def image_hashes(data):
+    """(ahash, dhash) of encoded image bytes as unsigned 64-bit integers"""
+    try:
+        with Image.open(BytesIO(data)) as image:
+            # Let JPEG decode at reduced scale; an 8x8 hash needs nothing near full size
+            image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+            image.load()
+            return average_hash(image), difference_hash(image)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise ImageUnavailable(f'Cannot decode image: {exc}') from exc
+
+
+def check_image_url(url):
+    """
+    Refuse URLs the worker must not fetch: anything but http(s), and hosts
+    outside settings.DOCUMENT_IMAGE_HOSTS when that allow-list is set
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ImageUnavailable('Only http and https URLs are fetched')
+    allowed = getattr(settings, 'DOCUMENT_IMAGE_HOSTS', None)
+    host = parsed.hostname.lower()
+    if allowed and not any(host == entry or host.endswith(f'.{entry}') for entry in allowed):
+        raise ImageUnavailable('Image host is not allowed')
+
+
+def _public_connection(address, *args, **kwargs):
+    """
+    socket.create_connection that refuses to talk to private, loopback,
+    link-local and other non-public addresses; the check runs on the address
+    actually connected to, so DNS answers that change between lookups do not matter
+    """
+    sock = socket.create_connection(address, *args, **kwargs)
+    peer = ipaddress.ip_address(sock.getpeername()[0])
+    if peer.version == 6 and peer.ipv4_mapped:
+        peer = peer.ipv4_mapped
+    if not peer.is_global:
+        sock.close()
+        raise ImageUnavailable('Image host is not allowed')
+    return sock
+
+
+class _PublicHTTPConnection(HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPSConnection(HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(HTTPRedirectHandler):
+    max_redirections = MAX_REDIRECTS
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_image_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# No ProxyHandler: a proxy would be the peer and hide where the request really goes
+_opener = OpenerDirector()
+for _handler in (
+    _PublicHTTPHandler(), _PublicHTTPSHandler(), _CheckedRedirectHandler(), HTTPDefaultErrorHandler(),
+    HTTPErrorProcessor(), UnknownHandler(),
+):
+    _opener.add_handler(_handler)
+
+
+def fetch_image(url):
+    """
+    Download a document image from a public host. Error messages end up in
+    DocumentImageHash.error, so they never echo what the fetch ran into
+    """
+    check_image_url(url)
+    try:
+        with _opener.open(url, timeout=FETCH_TIMEOUT) as response:
+            data = response.read(MAX_IMAGE_BYTES + 1)
+    except ImageUnavailable:
+        raise
+    except HTTPError as exc:
+        raise ImageUnavailable(f'Cannot fetch image (HTTP {exc.code})') from exc
+    except (OSError, ValueError, HTTPException) as exc:
+        raise ImageUnavailable('Cannot fetch image') from exc
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageUnavailable(f'Image is larger than {MAX_IMAGE_BYTES} bytes')
+    return data
+
+
+def to_signed(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value & ((1 << 64) - 1)
+
+
+def hamming(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def dhash_bands(dhash):
+    mask = (1 << BAND_BITS) - 1
+    return [(dhash >> (BAND_BITS * index)) & mask for index in range(BAND_COUNT)]
+
+
+def band_variants(band, radius=BAND_RADIUS):
+    """The band and every value within `radius` flipped bits of it"""
+    variants = [band]
+    for flips in range(1, radius + 1):
+        for positions in combinations(range(BAND_BITS), flips):
+            variant = band
+            for position in positions:
+                variant ^= 1 << position
+            variants.append(variant)
+    return variants
+
+
+def candidates(dhash):
+    """Hashes sharing a band, within BAND_RADIUS bits, with `dhash`"""
+    match = Q()
+    for index, band in enumerate(dhash_bands(dhash)):
+        match |= Q(**{f'dhash_band{index}__in': band_variants(band)})
+    return DocumentImageHash.objects.filter(match)
+
+
+def find_duplicate(user_id, ahash, dhash):
+    """The closest hash of another user's document within MATCH_DISTANCE, as (row, distance), or (None, None)"""
+    best, best_distance = None, None
+    for row in candidates(dhash).exclude(user_id=user_id).only('pk', 'ahash', 'dhash').order_by('pk'):
+        distance = hamming(row.dhash, dhash)
+        if distance > MATCH_DISTANCE or hamming(row.ahash, ahash) > AHASH_DISTANCE:
+            continue
+        if best is None or distance < best_distance:
+            best, best_distance = row, distance
+    return best, best_distance
+
+
+def hash_image(user_id, url, source_field, kyc_id=None, business_document_id=None):
+    """Hash one document image, flag it if another user has a near-identical one, and store the row"""
+    defaults = {
+        'user_id': user_id,
+        'source_url': url,
+        'ahash': None,
+        'dhash': None,
+        'error': '',
+        'duplicate_of': None,
+        'duplicate_distance': None,
+    }
+    defaults.update({f'dhash_band{index}': None for index in range(BAND_COUNT)})
+    try:
+        ahash, dhash = image_hashes(fetch_image(url))
+    except ImageUnavailable as exc:
+        defaults['error'] = str(exc)[:255]
+    else:
+        match, distance = find_duplicate(user_id, ahash, dhash)
+        defaults.update({
+            'ahash': to_signed(ahash),
+            'dhash': to_signed(dhash),
+            'duplicate_of': match,
+            'duplicate_distance': distance,
+        })
+        defaults.update({f'dhash_band{index}': band for index, band in enumerate(dhash_bands(dhash))})
+    row, _ = DocumentImageHash.objects.update_or_create(
+        kyc_id=kyc_id,
+        business_document_id=business_document_id,
+        source_field=source_field,
+        defaults=defaults,
+    )
+    return row
+
+
+def _unhashed(queryset, owner, field, retry_before):
+    """
+    Rows of `queryset` whose image in `field` has no hash for its current URL,
+    counting failures recorded before `retry_before` as missing
+    """
+    hashed = DocumentImageHash.objects.filter(
+        **{owner: OuterRef('pk')}, source_field=field, source_url=OuterRef(field)
+    )
+    if retry_before is not None:
+        hashed = hashed.filter(Q(error='') | Q(updated_at__gte=retry_before))
+    return queryset.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}).filter(~Exists(hashed)).order_by('pk')
+
+
+def pending_images(limit=BATCH_SIZE, retry_before=None):
+    """Up to `limit` (user_id, url, source_field, owner kwargs) still to hash, oldest documents first"""
+    pending = []
+    for field in KYC_IMAGE_FIELDS:
+        rows = _unhashed(KYCVerification.objects.all(), 'kyc', field, retry_before)
+        for pk, user_id, url in rows.values_list('pk', 'user_id', field)[:limit - len(pending)]:
+            pending.append((user_id, url, field, {'kyc_id': pk}))
+        if len(pending) >= limit:
+            return pending
+    documents = BusinessDocument.objects.filter(mime_type__startswith='image/')
+    rows = _unhashed(documents, 'business_document', 'file_url', retry_before)
+    for pk, user_id, url in rows.values_list('pk', 'user_id', 'file_url')[:limit - len(pending)]:
+        pending.append((user_id, url, 'file_url', {'business_document_id': pk}))
+    return pending
+
+
+def hash_documents(limit=None, batch_size=BATCH_SIZE, retry_failed=False):
+    """
+    Hash pending document images in batches; returns (hashed, flagged, failed)
+    With retry_failed, images that failed before this run are tried once more
+    """
+    retry_before = timezone.now() if retry_failed else None
+    hashed = flagged = failed = 0
+    while limit is None or hashed + failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - hashed - failed)
+        batch = pending_images(size, retry_before)
+        if not batch:
+            break
+        for user_id, url, field, owner in batch:
+            row = hash_image(user_id, url, field, **owner)
+            if row.error:
+                failed += 1
+            else:
+                hashed += 1
+                flagged += row.duplicate_of_id is not None
+    return hashed, flagged, failed
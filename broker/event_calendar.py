@@ -0,0 +1,111 @@
+"""
+Calendar occupancy for campaigns and promotions
+Finds everything running inside a window with a single UNION query over the
+period indexes, then buckets it into days. On PostgreSQL the overlap test is
+the range operator `&&`, answered by the GiST indexes on
+tstzrange(start_date, end_date); elsewhere it is the equivalent
+start_date < end AND end_date > start over the (start_date, end_date) btrees.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connections
+from django.db.models import CharField, F, Func, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+CAMPAIGN = 'campaign'
+PROMOTION = 'promotion'
+KINDS = (CAMPAIGN, PROMOTION)
+
+
+def period_expression():
+    """
+    tstzrange over a row's start and end; the upper bound is clamped so rows
+    with an end before their start give an empty range instead of an error.
+    Must stay identical to the expression indexed in the period index migration.
+    """
+    from django.contrib.postgres.fields import DateTimeRangeField
+
+    return Func(
+        F('start_date'),
+        Greatest('start_date', 'end_date'),
+        function='TSTZRANGE',
+        output_field=DateTimeRangeField(),
+    )
+
+
+def overlapping(queryset, start, end):
+    """Rows whose [start_date, end_date) overlaps [start, end)"""
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.alias(period=period_expression()).filter(period__overlap=(start, end))
+    return queryset.filter(start_date__lt=end, end_date__gt=start)
+
+
+def window_bounds(first_day, last_day):
+    """Aware datetimes covering whole local days first_day..last_day"""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first_day, time.min), tz),
+        timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz),
+    )
+
+
+def _occupied_days(start, end):
+    """First and last local day touched by [start, end)"""
+    first = timezone.localtime(start).date()
+    local_end = timezone.localtime(end)
+    last = local_end.date()
+    if local_end.time() == time.min and last > first:
+        last -= timedelta(days=1)
+    return first, last
+
+
+def calendar_occupancy(campaigns, promotions, first_day, last_day):
+    """
+    Items from the given querysets running between first_day and last_day
+    (inclusive local dates) and the number of each kind running on every day
+    Pass None for a kind to leave it out.
+    """
+    start, end = window_bounds(first_day, last_day)
+    parts = []
+    for kind, queryset, title in ((CAMPAIGN, campaigns, 'name'), (PROMOTION, promotions, 'title')):
+        if queryset is not None:
+            parts.append(overlapping(queryset, start, end).order_by().annotate(
+                kind=Value(kind, output_field=CharField()),
+                label=F(title),
+            ).values_list('kind', 'pk', 'label', 'start_date', 'end_date'))
+
+    rows = list(parts[0].union(*parts[1:], all=True)) if parts else []
+
+    span = (last_day - first_day).days + 1
+    # Difference arrays: +1 on the first occupied day, -1 the day after the last
+    deltas = {kind: [0] * (span + 1) for kind in KINDS}
+    items = []
+    for kind, pk, label, item_start, item_end in rows:
+        first, last = _occupied_days(item_start, item_end)
+        first_index = max((first - first_day).days, 0)
+        last_index = min((last - first_day).days, span - 1)
+        if first_index <= last_index:
+            deltas[kind][first_index] += 1
+            deltas[kind][last_index + 1] -= 1
+        items.append({
+            'type': kind,
+            'id': pk,
+            'title': label,
+            'start_date': item_start,
+            'end_date': item_end,
+        })
+
+    days = []
+    running = dict.fromkeys(KINDS, 0)
+    for index in range(span):
+        for kind in KINDS:
+            running[kind] += deltas[kind][index]
+        days.append({
+            'date': first_day + timedelta(days=index),
+            'campaigns': running[CAMPAIGN],
+            'promotions': running[PROMOTION],
+        })
+
+    items.sort(key=lambda item: (item['start_date'], item['type'], item['id']))
+    return {'days': days, 'items': items}
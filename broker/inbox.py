@@ -0,0 +1,155 @@
+"""
+Conversation inbox read model
+Keeps the last message preview and per-participant unread counters on the
+Conversation row, so an inbox page is one indexed read of conversations with
+no message rows involved
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .listing_search import published_listings
+from .models import Conversation, Message
+
+PREVIEW_LENGTH = 140
+
+PREVIEW_PLACEHOLDERS = {
+    Message.MessageType.IMAGE: 'Sent an image',
+    Message.MessageType.FILE: 'Sent a file',
+    Message.MessageType.ORDER: 'Sent an order',
+    Message.MessageType.PAYMENT: 'Sent a payment',
+}
+
+
+class ConversationRejected(Exception):
+    """Raised when a conversation cannot be opened; `code` is stable for API clients"""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def message_preview(message):
+    """Single-line preview of a message for the inbox"""
+    text = ' '.join((message.content or '').split())
+    if not text:
+        text = PREVIEW_PLACEHOLDERS.get(message.message_type, '')
+    return text[:PREVIEW_LENGTH]
+
+
+def record_message(message):
+    """
+    Fold a newly inserted message into its conversation with one UPDATE
+    The preview only moves forward in time, so concurrent inserts committing
+    out of order cannot leave an older message on top; the recipient's unread
+    counter is incremented in place
+    """
+    is_latest = Q(last_message_at__lte=message.created_at)
+
+    def if_latest(name, value):
+        field = Conversation._meta.get_field(name)
+        return Case(
+            When(is_latest, then=Value(value)),
+            default=F(field.attname),
+            output_field=field.target_field if field.is_relation else field,
+        )
+
+    def unread_unless_sender(participant, name):
+        # Senders do not get unread counts for their own messages
+        return Case(
+            When(~Q(**{participant: message.sender_id}), then=F(name) + 1),
+            default=F(name),
+            output_field=Conversation._meta.get_field(name),
+        )
+
+    Conversation.objects.filter(pk=message.conversation_id).update(
+        last_message_at=if_latest('last_message_at', message.created_at),
+        last_message_preview=if_latest('last_message_preview', message_preview(message)),
+        last_message_sender=if_latest('last_message_sender', message.sender_id),
+        last_message_type=if_latest('last_message_type', message.message_type),
+        buyer_unread_count=unread_unless_sender('buyer_id', 'buyer_unread_count'),
+        seller_unread_count=unread_unless_sender('seller_id', 'seller_unread_count'),
+    )
+
+
+def unread_count_for(user):
+    """Expression for the requesting participant's unread counter"""
+    return Case(
+        When(buyer=user, then=F('buyer_unread_count')),
+        default=F('seller_unread_count'),
+    )
+
+
+def inbox(user):
+    """The user's conversations, newest activity first"""
+    return Conversation.objects.filter(
+        Q(buyer=user) | Q(seller=user)
+    ).select_related('listing', 'buyer', 'seller').annotate(
+        unread_count=unread_count_for(user)
+    ).order_by('-last_message_at', '-pk')
+
+
+def open_conversation(user, listing_id):
+    """
+    The user's conversation with the owner of a published listing as an inbox
+    row, created if needed; returns (conversation, created)
+    Concurrent calls for the same listing end up on the same row: the unique
+    (buyer, seller, listing) index is read first, and an insert that loses the
+    race to another request falls back to reading the winner's row
+    """
+    listing = published_listings().filter(pk=listing_id).annotate(
+        owner_id=Coalesce('user_id', 'business__user_id')
+    ).values_list('pk', 'owner_id').first()
+    if listing is None:
+        raise ConversationRejected('Listing not found', 'not_found')
+    owner_id = listing[1]
+    if owner_id is None:
+        raise ConversationRejected('This listing has no owner to contact', 'no_owner')
+    if owner_id == user.pk:
+        raise ConversationRejected('You cannot open a conversation on your own listing', 'own_listing')
+
+    rows = inbox(user).filter(buyer=user, seller_id=owner_id, listing_id=listing_id)
+    conversation = rows.first()
+    if conversation is not None:
+        return conversation, False
+    try:
+        with transaction.atomic():
+            Conversation.objects.create(buyer=user, seller_id=owner_id, listing_id=listing_id)
+        created = True
+    except IntegrityError:
+        created = False
+    return rows.get(), created
+
+
+def unread_messages(conversation, user):
+    """Messages of the conversation the user has not read; served by the partial unread index"""
+    return Message.objects.filter(conversation=conversation, is_read=False).exclude(sender=user)
+
+
+@transaction.atomic
+def mark_read(conversation, user, up_to_id=None, up_to=None):
+    """
+    Mark the messages the user received in the conversation as read, all of them
+    or only those up to a message id or timestamp, with one UPDATE
+    Returns (messages marked, unread count left). The conversation row is locked
+    first, so a message committed concurrently is either marked here or counted
+    afterwards by record_message, never lost from the counter
+    """
+    counter = 'buyer_unread_count' if conversation.buyer_id == user.pk else 'seller_unread_count'
+    Conversation.objects.select_for_update().filter(pk=conversation.pk).values_list('pk').get()
+
+    messages = unread_messages(conversation, user)
+    if up_to_id is not None:
+        boundary = Message.objects.filter(conversation=conversation, pk=up_to_id).values_list('created_at', flat=True).first()
+        if boundary is None:
+            raise Message.DoesNotExist
+        messages = messages.filter(Q(created_at__lt=boundary) | Q(created_at=boundary, pk__lte=up_to_id))
+    if up_to is not None:
+        messages = messages.filter(created_at__lte=up_to)
+    marked = messages.update(is_read=True, read_at=timezone.now())
+
+    remaining = unread_messages(conversation, user).count() if up_to_id is not None or up_to is not None else 0
+    Conversation.objects.filter(pk=conversation.pk).update(**{counter: remaining})
+    return marked, remaining
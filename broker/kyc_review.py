@@ -0,0 +1,115 @@
+"""
+KYC review queue
+Reviewers claim the oldest pending verifications in batches. Claiming walks
+the (status, created_at) index with SELECT ... FOR UPDATE SKIP LOCKED, so
+concurrent reviewers never block on or receive the same rows, and leases each
+claimed row for LEASE_SECONDS. A lease that runs out simply makes the row
+claimable again; nothing has to sweep it.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import KYCVerification
+
+Status = KYCVerification.KYCStatus
+
+LEASE_SECONDS = 15 * 60
+MAX_CLAIM_BATCH = 50
+
+
+class ReviewRejected(Exception):
+    """Raised when a review action is not possible; `code` is stable for API clients"""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def unleased(now):
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+
+
+def leased_to(reviewer, now):
+    return Q(claimed_by=reviewer, lease_expires_at__gt=now)
+
+
+def my_reviews(reviewer, now=None):
+    """Pending verifications currently leased to the reviewer, oldest first"""
+    now = now or timezone.now()
+    return KYCVerification.objects.filter(leased_to(reviewer, now), status=Status.PENDING).order_by('created_at', 'pk')
+
+
+@transaction.atomic
+def claim_reviews(reviewer, count, now=None, lease_seconds=LEASE_SECONDS):
+    """
+    Lease up to `count` of the oldest unleased pending verifications to the
+    reviewer and return their ids; reviewers never get their own submissions
+    """
+    now = now or timezone.now()
+    count = max(1, min(count, MAX_CLAIM_BATCH))
+    ids = list(
+        KYCVerification.objects.filter(unleased(now), status=Status.PENDING).exclude(user=reviewer).order_by(
+            'created_at', 'pk'
+        ).select_for_update(skip_locked=True).values_list('pk', flat=True)[:count]
+    )
+    if ids:
+        KYCVerification.objects.filter(pk__in=ids).update(
+            claimed_by=reviewer,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            updated_at=now,
+        )
+    return ids
+
+
+def renew_leases(reviewer, ids, now=None, lease_seconds=LEASE_SECONDS):
+    """Extend the reviewer's live leases on `ids`; returns how many were extended"""
+    now = now or timezone.now()
+    return KYCVerification.objects.filter(leased_to(reviewer, now), pk__in=ids, status=Status.PENDING).update(
+        lease_expires_at=now + timedelta(seconds=lease_seconds),
+    )
+
+
+def release_reviews(reviewer, ids):
+    """Give the reviewer's leases on `ids` back to the queue; returns how many"""
+    return KYCVerification.objects.filter(claimed_by=reviewer, pk__in=ids, status=Status.PENDING).update(
+        claimed_by=None,
+        lease_expires_at=None,
+    )
+
+
+def decide_review(reviewer, kyc_id, approve, rejection_reason='', now=None):
+    """
+    Approve or reject a pending verification with one conditional UPDATE
+    Allowed when the reviewer holds the lease or nobody does; a row leased to
+    another reviewer, already decided or submitted by the reviewer is refused
+    """
+    now = now or timezone.now()
+    fields = {
+        'status': Status.APPROVED if approve else Status.REJECTED,
+        'verified_by': reviewer,
+        'verified_at': now,
+        'claimed_by': None,
+        'lease_expires_at': None,
+        'updated_at': now,
+    }
+    if not approve:
+        fields['rejection_reason'] = rejection_reason
+    decided = KYCVerification.objects.filter(
+        Q(claimed_by=reviewer) | unleased(now),
+        pk=kyc_id,
+        status=Status.PENDING,
+    ).exclude(user=reviewer).update(**fields)
+    if decided:
+        return
+    current = KYCVerification.objects.filter(pk=kyc_id).values('status', 'user').first()
+    if current is None:
+        raise ReviewRejected('Verification not found', 'not_found')
+    if current['user'] == reviewer.pk:
+        raise ReviewRejected('You cannot review your own verification', 'own_submission')
+    if current['status'] != Status.PENDING:
+        raise ReviewRejected('This verification has already been decided', 'decided')
+    raise ReviewRejected('Another reviewer holds this verification', 'leased')
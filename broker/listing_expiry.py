@@ -0,0 +1,78 @@
+"""
+Listing expiry
+Published listings get an expiry timestamp derived from their type, and a
+sweeper moves the ones past it to EXPIRED in bounded batches over the partial
+(expires_at) index on published rows, queueing one notification per listing
+for its owner with a single bulk insert per batch
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Listing, Notification
+
+Type = Listing.ListingType
+
+LISTING_LIFETIME_DAYS = {
+    Type.PRODUCT: 90,
+    Type.SERVICE: 180,
+    Type.JOB: 30,
+    Type.EVENT: 60,
+    Type.OTHER: 90,
+}
+EXPIRY_BATCH_SIZE = 500
+
+
+def default_expiry(listing_type, now=None):
+    """When a listing of this type published at `now` should expire"""
+    now = now or timezone.now()
+    return now + timedelta(days=LISTING_LIFETIME_DAYS.get(listing_type, LISTING_LIFETIME_DAYS[Type.OTHER]))
+
+
+def due_listings(now):
+    """Published listings whose expiry has passed"""
+    return Listing.objects.filter(status=Listing.ListingStatus.PUBLISHED, expires_at__lte=now)
+
+
+def _expire_batch(now, batch_size):
+    """
+    Claim up to batch_size due listings, expire them with one UPDATE and queue
+    owner notifications with one INSERT; returns the number expired
+    """
+    claimed = list(
+        due_listings(now).order_by('expires_at').select_for_update(skip_locked=True, of=('self',)).annotate(
+            owner_id=Coalesce('user_id', 'business__user_id')
+        ).values_list('pk', 'title', 'owner_id')[:batch_size]
+    )
+    if not claimed:
+        return 0
+    Listing.objects.filter(pk__in=[pk for pk, _, _ in claimed]).update(
+        status=Listing.ListingStatus.EXPIRED,
+        updated_at=now,
+    )
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=owner_id,
+            notification_type=Notification.NotificationType.LISTING_EXPIRED,
+            title=f'Your listing "{title}" has expired',
+            message='It is no longer shown to buyers. Publish it again to renew it.',
+            data={'listing_id': pk},
+        )
+        for pk, title, owner_id in claimed
+        if owner_id is not None
+    ])
+    return len(claimed)
+
+
+def expire_listings(now=None, batch_size=EXPIRY_BATCH_SIZE):
+    """Expire every due listing, committing after each batch; returns the number expired"""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            count = _expire_batch(now, batch_size)
+        expired += count
+        if count < batch_size:
+            return expired
@@ -0,0 +1,80 @@
+"""
+Listing search
+On PostgreSQL, published listings are matched against a weighted tsvector
+(title A, tags B, category C, description D) stored in Listing.search_vector,
+or by trigram similarity on the title to tolerate typos. Both predicates are
+served by partial GIN indexes over published, active rows. Matches are ranked
+by text rank and similarity, boosted for recent listings and listings open to
+collaboration. Other backends fall back to substring matching.
+"""
+from django.contrib.postgres.lookups import SearchVectorExact, TrigramSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, DurationField, ExpressionWrapper, F, FloatField, Q, Value, When
+from django.db.models.functions import Extract, Now
+
+from .models import Listing
+
+SEARCH_CONFIG = 'english'
+SEARCH_FIELDS = [('title', 'A'), ('tags', 'B'), ('category', 'C'), ('description', 'D')]
+
+SIMILARITY_WEIGHT = 0.5
+RECENCY_WEIGHT = 0.2
+RECENCY_HALF_LIFE_DAYS = 30
+COLLABORATION_BOOST = 0.1
+
+
+def published_listings():
+    """The rows covered by the partial search indexes"""
+    return Listing.objects.filter(status=Listing.ListingStatus.PUBLISHED, is_active=True)
+
+
+def search_vector():
+    """Weighted document expression stored in Listing.search_vector"""
+    vector = None
+    for field, weight in SEARCH_FIELDS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored vector of the given listings with one UPDATE; PostgreSQL only"""
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.update(search_vector=search_vector())
+    return 0
+
+
+def _postgres_search(queryset, text):
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    age_days = Extract(
+        ExpressionWrapper(Now() - F('created_at'), output_field=DurationField()), 'epoch'
+    ) / Value(86400.0)
+    return queryset.filter(
+        Q(SearchVectorExact(F('search_vector'), query)) | Q(TrigramSimilar(F('title'), Value(text)))
+    ).annotate(
+        text_rank=SearchRank(F('search_vector'), query),
+        similarity=TrigramSimilarity('title', text),
+        score=ExpressionWrapper(
+            F('text_rank')
+            + Value(SIMILARITY_WEIGHT) * F('similarity')
+            + Value(RECENCY_WEIGHT) / (Value(1.0) + age_days / Value(float(RECENCY_HALF_LIFE_DAYS)))
+            + Case(When(is_for_collaboration=True, then=Value(COLLABORATION_BOOST)), default=Value(0.0)),
+            output_field=FloatField(),
+        ),
+    ).order_by('-score', '-created_at', '-pk')
+
+
+def _fallback_search(queryset, text):
+    matches = Q()
+    for field, _ in SEARCH_FIELDS:
+        matches |= Q(**{f'{field}__icontains': text})
+    return queryset.filter(matches).order_by('-is_for_collaboration', '-created_at', '-pk')
+
+
+def search_listings(text, queryset=None):
+    """Published listings matching `text`, best first"""
+    queryset = published_listings() if queryset is None else queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return _postgres_search(queryset, text)
+    return _fallback_search(queryset, text)
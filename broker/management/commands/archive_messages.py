@@ -0,0 +1,64 @@
+"""
+Django management command to move messages of inactive conversations into compressed archive segments
+Usage: python manage.py archive_messages [--days 180] [--segment-size 500] [--limit 1000] [--dry-run]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from broker.message_archive import ARCHIVE_AFTER_DAYS, SEGMENT_SIZE, archivable_conversations, archive_messages
+
+
+class Command(BaseCommand):
+    help = 'Archives the messages of COMPLETED/ARCHIVED conversations inactive for N days; safe to interrupt and rerun'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help=f'Archive conversations without messages for this many days (default: {ARCHIVE_AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--segment-size',
+            type=int,
+            default=SEGMENT_SIZE,
+            help=f'Messages per compressed segment and transaction (default: {SEGMENT_SIZE})',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Archive at most this many conversations (default: all)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be archived',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['segment_size'] < 1:
+            raise CommandError('--days and --segment-size must be positive')
+        now = timezone.now()
+
+        if options['dry_run']:
+            cutoff = now - timedelta(days=options['days'])
+            totals = archivable_conversations(now, options['days']).aggregate(
+                conversations=Count('pk', distinct=True),
+                messages=Count('messages', filter=Q(messages__created_at__lt=cutoff)),
+            )
+            self.stdout.write(
+                f"Would archive {totals['messages']} messages from {totals['conversations']} conversations"
+            )
+            return
+
+        conversations, messages = archive_messages(
+            now=now,
+            days=options['days'],
+            segment_size=options['segment_size'],
+            limit=options['limit'] or None,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {messages} messages from {conversations} conversations'))
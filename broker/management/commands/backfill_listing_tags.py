@@ -0,0 +1,25 @@
+"""
+Django management command to build the normalized listing tag index
+Usage: python manage.py backfill_listing_tags [--batch-size 1000]
+"""
+from django.core.management.base import BaseCommand
+
+from broker.tagging import SYNC_BATCH_SIZE, backfill_listing_tags
+
+
+class Command(BaseCommand):
+    help = 'Parses Listing.tags of every listing into Tag and ListingTag rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SYNC_BATCH_SIZE,
+            help=f'Listings synced per transaction (default: {SYNC_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        listings, changes = backfill_listing_tags(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced tags of {listings} listings ({changes} links added or removed)'
+        ))
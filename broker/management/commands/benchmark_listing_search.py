@@ -0,0 +1,131 @@
+"""
+Django management command to benchmark listing search against the legacy ILIKE filter
+Usage: python manage.py benchmark_listing_search --query "leather boots" --iterations 20 [--listings 50000]
+"""
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from broker.listing_search import published_listings, search_listings, update_search_vectors
+from broker.models import Listing
+
+User = get_user_model()
+
+PAGE_SIZE = 20
+DEFAULT_QUERIES = ['leather boots', 'vintage camera', 'web design', 'lether bots']
+VOCABULARY = [
+    'leather', 'boots', 'vintage', 'camera', 'design', 'web', 'handmade', 'wooden', 'table', 'lamp',
+    'bicycle', 'repair', 'guitar', 'lessons', 'catering', 'wedding', 'photography', 'organic', 'coffee',
+    'ceramic', 'mug', 'laptop', 'stand', 'consulting', 'marketing', 'translation', 'jacket', 'silk', 'scarf',
+]
+
+
+class Command(BaseCommand):
+    help = 'Times the ranked listing search and the legacy icontains search over the same queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Search text to time; repeat for several (default: a small built-in set)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Timed runs per query and engine (default: 20)',
+        )
+        parser.add_argument(
+            '--listings',
+            type=int,
+            default=0,
+            help='Generate this many throwaway published listings first (default: use existing data)',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Print the query plan of the ranked search for each query (PostgreSQL only)',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Not on PostgreSQL: the ranked search falls back to substring matching'
+            ))
+
+        run_id = uuid.uuid4().hex[:8]
+        if options['listings']:
+            self.create_listings(run_id, options['listings'])
+        try:
+            for text in options['queries'] or DEFAULT_QUERIES:
+                self.benchmark(text, options)
+        finally:
+            User.objects.filter(email__endswith=f'@benchmark-{run_id}.invalid').delete()
+
+    def create_listings(self, run_id, count):
+        """Bulk insert random published listings owned by a throwaway user"""
+        owner = User.objects.create_user(
+            email=f'owner@benchmark-{run_id}.invalid', first_name='Search', last_name='Benchmark'
+        )
+        rng = random.Random(run_id)
+        batch_size = 5000
+        for start in range(0, count, batch_size):
+            Listing.objects.bulk_create([
+                Listing(
+                    user=owner,
+                    title=' '.join(rng.sample(VOCABULARY, 3)).capitalize(),
+                    description=' '.join(rng.choices(VOCABULARY, k=40)),
+                    category=rng.choice(VOCABULARY),
+                    tags=', '.join(rng.sample(VOCABULARY, 3)),
+                    listing_type=Listing.ListingType.PRODUCT,
+                    price=rng.randint(1, 1000),
+                    status=Listing.ListingStatus.PUBLISHED,
+                    is_for_collaboration=rng.random() < 0.2,
+                )
+                for _ in range(min(batch_size, count - start))
+            ])
+        # bulk_create skips post_save, so the stored vectors are filled in here
+        update_search_vectors(Listing.objects.filter(user=owner))
+        self.stdout.write(f'Generated {count} listings')
+
+    def legacy_search(self, text):
+        """What ?search= did before: ILIKE on title and description behind distinct()"""
+        return published_listings().filter(
+            Q(title__icontains=text) | Q(description__icontains=text)
+        ).distinct()
+
+    def time_page(self, queryset, iterations):
+        """Per-run seconds for a count plus the first page, as the list endpoints do"""
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            total = queryset.count()
+            list(queryset[:PAGE_SIZE])
+            timings.append(time.perf_counter() - started)
+        return total, timings
+
+    def benchmark(self, text, options):
+        self.stdout.write(self.style.SUCCESS(f'Query: {text!r}'))
+        engines = [
+            ('ranked', search_listings(text)),
+            ('legacy', self.legacy_search(text)),
+        ]
+        for name, queryset in engines:
+            total, timings = self.time_page(queryset, options['iterations'])
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'   - {name}: {total} matches, median {statistics.median(timings) * 1000:.1f}ms, '
+                f'p95 {p95 * 1000:.1f}ms'
+            )
+        if options['explain'] and connection.vendor == 'postgresql':
+            self.stdout.write(search_listings(text)[:PAGE_SIZE].explain(analyze=True))
@@ -0,0 +1,45 @@
+"""
+Django management command to rebuild the "similar listings" recommendations
+Usage: python manage.py build_similar_listings [--full] [--top-k 10] [--chunk-size 1000]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from broker.recommendations import DEFAULT_CHUNK_SIZE, DEFAULT_TOP_K, build_similar_listings
+
+
+class Command(BaseCommand):
+    help = 'Computes TF-IDF cosine neighbours of published listings into SimilarListing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every listing instead of only those affected since the last run',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=DEFAULT_TOP_K,
+            help=f'Neighbours stored per listing (default: {DEFAULT_TOP_K})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Listings scored per sparse product (default: {DEFAULT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--top-k and --chunk-size must be positive')
+        started = time.perf_counter()
+        written = build_similar_listings(
+            full=options['full'],
+            top_k=options['top_k'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated neighbours of {written} listings in {time.perf_counter() - started:.1f}s'
+        ))
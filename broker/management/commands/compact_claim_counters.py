@@ -0,0 +1,47 @@
+"""
+Django management command to fold sharded promotion claim counters into current_claims
+Usage: python manage.py compact_claim_counters [--interval 30]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from broker.claims import compact_claim_counters
+from broker.models import Promotion
+
+
+class Command(BaseCommand):
+    help = 'Folds claim counter shards back into Promotion.current_claims and re-splits remaining capacity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--promotion-id',
+            type=int,
+            help='Only compact this promotion',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and compact every N seconds (default: run once)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.compact(options['promotion_id'])
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def compact(self, promotion_id):
+        promotions = Promotion.objects.filter(
+            Q(counter_shards__gt=0) | Q(claim_counters__isnull=False)
+        ).distinct()
+        if promotion_id:
+            promotions = promotions.filter(pk=promotion_id)
+
+        folded = 0
+        for pk in promotions.values_list('pk', flat=True).iterator():
+            folded += compact_claim_counters(pk)
+        self.stdout.write(f'Folded {folded} sharded claims into current_claims')
@@ -0,0 +1,35 @@
+"""
+Django management command to expire published listings past their expiry date
+Usage: python manage.py expire_listings [--interval 300]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from broker.listing_expiry import EXPIRY_BATCH_SIZE, expire_listings
+
+
+class Command(BaseCommand):
+    help = 'Marks published listings past expires_at as EXPIRED and notifies their owners'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and sweep every N seconds (default: run once)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EXPIRY_BATCH_SIZE,
+            help=f'Listings expired per transaction (default: {EXPIRY_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_listings(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Expired {expired} listings'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+"""
+Django management command to compute perceptual hashes of KYC and business document images and flag near-duplicates
+Usage: python manage.py hash_documents [--limit 1000] [--batch-size 100] [--retry-failed]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from broker.document_hashes import BATCH_SIZE, hash_documents
+
+
+class Command(BaseCommand):
+    help = 'Hashes document images not hashed yet and flags those matching another user\'s documents; run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Hash at most this many images (default: all pending)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Pending images fetched per query (default: {BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Try images that could not be fetched or decoded on earlier runs again',
+        )
+
+    def handle(self, *args, **options):
+        if options['limit'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--limit must not be negative and --batch-size must be positive')
+        hashed, flagged, failed = hash_documents(
+            limit=options['limit'] or None,
+            batch_size=options['batch_size'],
+            retry_failed=options['retry_failed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Hashed {hashed} images, flagged {flagged} near-duplicates, {failed} failed'))
@@ -0,0 +1,189 @@
+"""
+Django management command to load test concurrent promotion claiming
+Usage: python manage.py loadtest_promotion_claims --claimers 1000 --capacity 250
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from queue import Empty, Queue
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+from broker.claims import ClaimRejected, claim_promotion, compact_claim_counters
+from broker.models import BusinessProfile, Promotion, PromotionClaim, Wallet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Fires concurrent claims at a throwaway promotion and verifies capacity is never over-allocated'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--claimers',
+            type=int,
+            default=1000,
+            help='Number of distinct users claiming the promotion (default: 1000)',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            default=250,
+            help='max_claims of the promotion under test (default: 250)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of threads, each holding its own database connection (default: 50)',
+        )
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=2,
+            help='Claims sent per user, extra ones must hit the unique constraint (default: 2)',
+        )
+        parser.add_argument(
+            '--points-cost',
+            type=int,
+            default=10,
+            help='points_cost of the promotion; every claimer wallet starts with exactly this much (default: 10)',
+        )
+        parser.add_argument(
+            '--counter-shards',
+            type=int,
+            default=0,
+            help='Run against a promotion using this many sharded claim counters (default: 0)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the generated users, business and promotion after the run',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite serializes all writers; run this against PostgreSQL for meaningful numbers'
+            ))
+
+        run_id = uuid.uuid4().hex[:8]
+        promotion, claimers = self.create_fixtures(run_id, options)
+        try:
+            outcomes, elapsed = self.run_claims(promotion, claimers, options)
+            self.report(promotion, claimers, outcomes, elapsed, options)
+        finally:
+            if not options['keep']:
+                User.objects.filter(email__endswith=f'@loadtest-{run_id}.invalid').delete()
+
+    def create_fixtures(self, run_id, options):
+        """Create an owner, a business, a promotion and the claimer accounts"""
+        domain = f'loadtest-{run_id}.invalid'
+        now = timezone.now()
+        owner = User.objects.create_user(
+            email=f'owner@{domain}', first_name='Load', last_name='Test'
+        )
+        business = BusinessProfile.objects.create(
+            user=owner, business_name=f'Load test {run_id}', industry='Testing'
+        )
+        promotion = Promotion.objects.create(
+            business=business,
+            title=f'Load test {run_id}',
+            start_date=now - timedelta(minutes=1),
+            end_date=now + timedelta(hours=1),
+            max_claims=options['capacity'],
+            points_cost=options['points_cost'],
+            category=Promotion.PromotionCategory.OTHER,
+            counter_shards=options['counter_shards'],
+        )
+        # bulk_create skips the post_save signal, so wallets are created explicitly
+        claimers = User.objects.bulk_create([
+            User(email=f'claimer{i}@{domain}', first_name='Claimer', last_name=str(i))
+            for i in range(options['claimers'])
+        ])
+        if not all(user.pk for user in claimers):
+            claimers = list(User.objects.filter(email__startswith='claimer', email__endswith=f'@{domain}'))
+        Wallet.objects.bulk_create([
+            Wallet(user=user, points=options['points_cost']) for user in claimers
+        ])
+        return promotion, claimers
+
+    def run_claims(self, promotion, claimers, options):
+        """Release every thread at once and collect one outcome per claim attempt"""
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency must be positive')
+
+        work = Queue()
+        for user in claimers:
+            for _ in range(options['attempts']):
+                work.put(user)
+
+        outcomes = Counter()
+        lock = threading.Lock()
+        start = threading.Barrier(concurrency + 1)
+
+        def worker():
+            local = Counter()
+            start.wait()
+            try:
+                while True:
+                    try:
+                        user = work.get_nowait()
+                    except Empty:
+                        break
+                    try:
+                        claim_promotion(user, promotion.pk)
+                        local['granted'] += 1
+                    except ClaimRejected as exc:
+                        local[exc.code] += 1
+                    except Exception as exc:
+                        local[f'error: {type(exc).__name__}'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    outcomes.update(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        start.wait()
+        for thread in threads:
+            thread.join()
+        return outcomes, time.perf_counter() - started
+
+    def report(self, promotion, claimers, outcomes, elapsed, options):
+        """Print throughput and fail loudly if any invariant was violated"""
+        compact_claim_counters(promotion.pk)
+        promotion.refresh_from_db()
+        claim_rows = PromotionClaim.objects.filter(promotion=promotion).count()
+        attempts = sum(outcomes.values())
+        expected = min(options['capacity'], len(claimers))
+        charged = Wallet.objects.filter(user__in=claimers, points=0).count() if options['points_cost'] else claim_rows
+
+        self.stdout.write(f'{attempts} claim attempts in {elapsed:.2f}s ({attempts / elapsed:.0f}/s)')
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f'   - {outcome}: {count}')
+        self.stdout.write(
+            f'current_claims={promotion.current_claims} claim_rows={claim_rows} '
+            f'max_claims={promotion.max_claims} wallets_charged={charged}'
+        )
+
+        problems = []
+        if promotion.current_claims != claim_rows:
+            problems.append('current_claims does not match the number of claim rows')
+        if claim_rows > promotion.max_claims:
+            problems.append('promotion was over-allocated')
+        if claim_rows != expected or outcomes['granted'] != expected:
+            problems.append(f'expected exactly {expected} granted claims')
+        if charged != claim_rows:
+            problems.append('points were charged for claims that were rolled back')
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('All claim invariants held'))
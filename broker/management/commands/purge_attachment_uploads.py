@@ -0,0 +1,25 @@
+"""
+Django management command to delete abandoned attachment uploads and their files
+Usage: python manage.py purge_attachment_uploads [--hours 24]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from broker.attachments import STALE_UPLOAD_HOURS, purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Deletes unfinished attachment uploads that received no chunk for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=STALE_UPLOAD_HOURS,
+            help=f'Purge uploads untouched for this many hours (default: {STALE_UPLOAD_HOURS})',
+        )
+
+    def handle(self, *args, **options):
+        if options['hours'] < 1:
+            raise CommandError('--hours must be positive')
+        purged = purge_stale_uploads(hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} abandoned uploads'))
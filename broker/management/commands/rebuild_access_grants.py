@@ -0,0 +1,24 @@
+"""
+Django management command to rebuild the materialized access grant index
+Usage: python manage.py rebuild_access_grants
+"""
+from django.core.management.base import BaseCommand
+
+from broker.access import REBUILD_BATCH_SIZE, rebuild_access_grants
+
+
+class Command(BaseCommand):
+    help = 'Recreates AccessGrant rows from business ownership, memberships and campaign collaborators'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help=f'Grants inserted per batch (default: {REBUILD_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding access grants...')
+        total = rebuild_access_grants(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Created {total} access grants'))
@@ -0,0 +1,116 @@
+"""
+Django management command to reconcile wallet balances against completed transactions
+Usage: python manage.py reconcile_wallets --workers 4 --output discrepancies.csv
+"""
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from broker.reconciliation import (
+    DEFAULT_BATCH_SIZE,
+    reconcile_range,
+    reconcile_worker,
+    split_user_range,
+    to_cents,
+    user_id_bounds,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compares every wallet balance with the sum of its completed transactions and reports discrepancies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes, each taking a slice of the user id range (default: 1)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows fetched and compared per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--min-user-id',
+            type=int,
+            help='Only reconcile users with an id greater than or equal to this value',
+        )
+        parser.add_argument(
+            '--max-user-id',
+            type=int,
+            help='Only reconcile users with an id less than or equal to this value',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=Decimal,
+            default=Decimal('0'),
+            help='Ignore differences up to this amount (default: 0)',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Path of the CSV discrepancy report, "-" for stdout (default: -)',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch_size = options['batch_size']
+        if workers < 1 or batch_size < 1:
+            raise CommandError('--workers and --batch-size must be positive')
+
+        low, high = user_id_bounds()
+        if options['min_user_id'] is not None and low is not None:
+            low = max(low, options['min_user_id'])
+        if options['max_user_id'] is not None and high is not None:
+            high = min(high, options['max_user_id'])
+        if low is None or low > high:
+            self.stdout.write(self.style.WARNING('No wallets or transactions in range, nothing to reconcile'))
+            return
+
+        tolerance_cents = to_cents(options['tolerance'])
+        ranges = split_user_range(low, high, workers)
+        self.stderr.write(f'Reconciling users {low}-{high} across {len(ranges)} worker(s)...')
+
+        if len(ranges) == 1:
+            results = [reconcile_range(low, high, batch_size, tolerance_cents)]
+        else:
+            # Forked workers must not share the parent's database connection
+            connections.close_all()
+            worker = partial(reconcile_worker, batch_size=batch_size, tolerance_cents=tolerance_cents)
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                results = list(pool.map(worker, ranges))
+
+        checked = sum(count for count, _ in results)
+        discrepancies = sorted(row for _, rows in results for row in rows)
+        self.write_report(discrepancies, options['output'])
+
+        summary = f'Checked {checked} users, found {len(discrepancies)} discrepancies'
+        if discrepancies:
+            self.stderr.write(self.style.WARNING(summary))
+        else:
+            self.stderr.write(self.style.SUCCESS(summary))
+
+    def write_report(self, discrepancies, output):
+        """Write discrepancies as CSV, amounts in currency units"""
+        handle = sys.stdout if output == '-' else open(output, 'w', newline='')
+        try:
+            writer = csv.writer(handle)
+            writer.writerow(['user_id', 'wallet_balance', 'ledger_balance', 'difference', 'has_wallet'])
+            for user_id, balance, expected, has_wallet in discrepancies:
+                writer.writerow([
+                    user_id,
+                    Decimal(balance).scaleb(-2),
+                    Decimal(expected).scaleb(-2),
+                    Decimal(balance - expected).scaleb(-2),
+                    has_wallet,
+                ])
+        finally:
+            if handle is not sys.stdout:
+                handle.close()
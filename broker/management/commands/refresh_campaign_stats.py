@@ -0,0 +1,42 @@
+"""
+Django management command to refresh the campaign analytics rollups
+Usage: python manage.py refresh_campaign_stats [--full] [--interval 300]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from broker.campaign_stats import REFRESH_BATCH_SIZE, refresh_stale_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes CampaignStats rows for campaigns whose products, collaborators, claims or orders changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every campaign instead of only those touched since the last run',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and refresh every N seconds (default: run once)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REFRESH_BATCH_SIZE,
+            help=f'Campaigns recomputed per transaction (default: {REFRESH_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            written = refresh_stale_stats(full=full, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Refreshed stats for {written} campaigns'))
+            if not options['interval']:
+                break
+            full = False
+            time.sleep(options['interval'])
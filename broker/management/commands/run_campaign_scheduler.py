@@ -0,0 +1,36 @@
+"""
+Django management command to move campaigns through their lifecycle on schedule
+Usage: python manage.py run_campaign_scheduler [--interval 60]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from broker.campaign_lifecycle import TRANSITION_BATCH_SIZE, advance_campaigns
+
+
+class Command(BaseCommand):
+    help = 'Activates campaigns whose start date has passed and completes those past their end date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and tick every N seconds (default: run once)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TRANSITION_BATCH_SIZE,
+            help=f'Campaigns moved per UPDATE (default: {TRANSITION_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            moved = advance_campaigns(batch_size=options['batch_size'])
+            for (from_status, to_status), count in sorted(moved.items()):
+                self.stdout.write(f'{count} campaigns moved {from_status} -> {to_status}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
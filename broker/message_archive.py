@@ -0,0 +1,164 @@
+"""
+Message archival
+Messages of COMPLETED or ARCHIVED conversations with no activity for
+ARCHIVE_AFTER_DAYS are moved, oldest first, into MessageArchiveSegment rows of
+up to SEGMENT_SIZE messages each, stored as zlib-compressed JSON lines. Every
+segment is written and its messages deleted in one transaction, so an
+interrupted run leaves whole segments behind and the next run carries on from
+the oldest message still in the hot table.
+
+Archiving leaves campaign rollups unchanged: each segment lists the times of
+its ORDER messages in order_times, which campaign_stats counts alongside the
+hot table, and the deletes it issues do not mark any rollup dirty.
+
+Because archiving always takes the oldest messages first and only messages
+older than the inactivity cutoff, every archived message of a conversation
+sorts before every message still in Message on (created_at, id). Readers rely
+on that to page through archive and hot table as one history.
+"""
+import json
+import zlib
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Conversation, Message, MessageArchiveSegment
+
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVABLE_STATUSES = [Conversation.ConversationStatus.COMPLETED, Conversation.ConversationStatus.ARCHIVED]
+SEGMENT_SIZE = 500
+COMPRESSION_LEVEL = 9
+
+ARCHIVED_FIELDS = ['id', 'sender_id', 'message_type', 'content', 'is_read', 'read_at', 'metadata', 'created_at', 'updated_at']
+DATETIME_FIELDS = ('read_at', 'created_at', 'updated_at')
+
+# Set while archive_segment deletes the messages it has just archived
+archiving = ContextVar('archiving', default=False)
+
+
+def encode_segment(messages):
+    lines = []
+    for message in messages:
+        row = {field: getattr(message, field) for field in ARCHIVED_FIELDS}
+        for field in DATETIME_FIELDS:
+            row[field] = row[field].isoformat() if row[field] else None
+        lines.append(json.dumps(row, separators=(',', ':')))
+    return zlib.compress('\n'.join(lines).encode(), COMPRESSION_LEVEL)
+
+
+def decode_segment(segment):
+    """Unsaved Message instances of a segment, oldest first"""
+    messages = []
+    for line in zlib.decompress(bytes(segment.payload)).decode().split('\n'):
+        row = json.loads(line)
+        for field in DATETIME_FIELDS:
+            row[field] = parse_datetime(row[field]) if row[field] else None
+        messages.append(Message(conversation_id=segment.conversation_id, **row))
+    return messages
+
+
+def archivable_conversations(now=None, days=ARCHIVE_AFTER_DAYS):
+    """Inactive COMPLETED or ARCHIVED conversations that still have messages before the cutoff"""
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return Conversation.objects.filter(
+        status__in=ARCHIVABLE_STATUSES,
+        last_message_at__lt=cutoff,
+    ).filter(
+        Exists(Message.objects.filter(conversation=OuterRef('pk'), created_at__lt=cutoff))
+    )
+
+
+@transaction.atomic
+def archive_segment(conversation_id, cutoff, segment_size=SEGMENT_SIZE):
+    """Move the oldest messages before cutoff into one segment; returns how many moved"""
+    Conversation.objects.select_for_update().filter(pk=conversation_id).values_list('pk').get()
+    messages = list(
+        Message.objects.filter(conversation_id=conversation_id, created_at__lt=cutoff).order_by(
+            'created_at', 'pk'
+        ).only(*ARCHIVED_FIELDS)[:segment_size]
+    )
+    if not messages:
+        return 0
+    MessageArchiveSegment.objects.create(
+        conversation_id=conversation_id,
+        first_message_id=messages[0].pk,
+        last_message_id=messages[-1].pk,
+        first_created_at=messages[0].created_at,
+        last_created_at=messages[-1].created_at,
+        message_count=len(messages),
+        payload=encode_segment(messages),
+        order_times=[
+            message.created_at.isoformat() for message in messages
+            if message.message_type == Message.MessageType.ORDER
+        ],
+    )
+    token = archiving.set(True)
+    try:
+        Message.objects.filter(pk__in=[message.pk for message in messages]).delete()
+    finally:
+        archiving.reset(token)
+    Conversation.objects.filter(pk=conversation_id).update(
+        archived_message_count=F('archived_message_count') + len(messages)
+    )
+    return len(messages)
+
+
+def archive_conversation(conversation_id, cutoff, segment_size=SEGMENT_SIZE):
+    """Archive every message of the conversation before cutoff, one segment per transaction"""
+    moved = 0
+    while True:
+        count = archive_segment(conversation_id, cutoff, segment_size)
+        moved += count
+        if count < segment_size:
+            return moved
+
+
+def archive_messages(now=None, days=ARCHIVE_AFTER_DAYS, segment_size=SEGMENT_SIZE, limit=None):
+    """Archive inactive conversations in primary key order; returns (conversations, messages)"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=days)
+    conversation_ids = archivable_conversations(now, days).order_by('pk').values_list('pk', flat=True)
+    if limit:
+        conversation_ids = conversation_ids[:limit]
+    conversations = messages = 0
+    for conversation_id in list(conversation_ids):
+        messages += archive_conversation(conversation_id, cutoff, segment_size)
+        conversations += 1
+    return conversations, messages
+
+
+def archived_messages(conversation, before=None, after=None, limit=None):
+    """
+    Archived messages of the conversation as unsaved Message instances with
+    their senders loaded, newest first, or oldest first when `after` is given
+    before and after are (created_at, id) keys; only segments that can hold
+    matches are decompressed
+    """
+    segments = MessageArchiveSegment.objects.filter(conversation=conversation)
+    if after is not None:
+        segments = segments.filter(
+            Q(last_created_at__gt=after[0]) | Q(last_created_at=after[0], last_message_id__gt=after[1])
+        ).order_by('first_created_at', 'first_message_id')
+    else:
+        if before is not None:
+            segments = segments.filter(
+                Q(first_created_at__lt=before[0]) | Q(first_created_at=before[0], first_message_id__lt=before[1])
+            )
+        segments = segments.order_by('-first_created_at', '-first_message_id')
+
+    found = []
+    for segment in segments.iterator():
+        rows = decode_segment(segment)
+        if after is not None:
+            found.extend(row for row in rows if (row.created_at, row.pk) > after)
+        else:
+            found.extend(row for row in reversed(rows) if before is None or (row.created_at, row.pk) < before)
+        if limit is not None and len(found) >= limit:
+            found = found[:limit]
+            break
+    prefetch_related_objects(found, 'sender')
+    return found
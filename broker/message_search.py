@@ -0,0 +1,65 @@
+"""
+Message search
+On PostgreSQL, Message.search_vector holds the tsvector of the message text and
+a btree_gin index on (conversation_id, search_vector) answers "matches in this
+conversation" directly, so a search only probes the conversations the user
+takes part in instead of every message. Matches are ranked and returned with
+a highlighted snippet. Other backends fall back to substring matching.
+"""
+from django.contrib.postgres.lookups import SearchVectorExact
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast, Substr
+
+from .models import Conversation, Message
+
+SEARCH_CONFIG = 'english'
+SNIPPET_LENGTH = 200
+
+
+def search_vector():
+    """Document expression stored in Message.search_vector"""
+    return SearchVector('content', config=SEARCH_CONFIG)
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored vector of the given messages with one UPDATE; PostgreSQL only"""
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.update(search_vector=search_vector())
+    return 0
+
+
+def participant_conversations(user):
+    return Conversation.objects.filter(Q(buyer=user) | Q(seller=user)).values('pk')
+
+
+def _postgres_search(queryset, text):
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(SearchVectorExact(F('search_vector'), query)).annotate(
+        # ts_rank is float4; as float8 the value clients get back in a cursor compares equal to the row
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        snippet=SearchHeadline(
+            'content', query, config=SEARCH_CONFIG, start_sel='<mark>', stop_sel='</mark>', max_words=30,
+        ),
+    )
+
+
+def _fallback_search(queryset, text):
+    return queryset.filter(content__icontains=text).annotate(
+        rank=Value(0.0, output_field=FloatField()),
+        snippet=Substr('content', 1, SNIPPET_LENGTH),
+    )
+
+
+def search_messages(user, text, conversation=None):
+    """
+    Messages in the user's conversations matching `text`, annotated with rank
+    and snippet; order them by ('-rank', '-pk')
+    """
+    queryset = Message.objects.defer('search_vector').filter(conversation__in=participant_conversations(user))
+    if conversation is not None:
+        queryset = queryset.filter(conversation=conversation)
+    if connections[queryset.db].vendor == 'postgresql':
+        return _postgres_search(queryset, text)
+    return _fallback_search(queryset, text)
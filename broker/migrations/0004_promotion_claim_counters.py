@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 04:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0003_businessdocument_business'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotion',
+            name='counter_shards',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='counter shards'),
+        ),
+        migrations.CreateModel(
+            name='PromotionClaimCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='shard')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='count')),
+                ('capacity', models.PositiveIntegerField(default=0, verbose_name='capacity')),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claim_counters', to='broker.promotion')),
+            ],
+            options={
+                'verbose_name': 'promotion claim counter',
+                'verbose_name_plural': 'promotion claim counters',
+                'unique_together': {('promotion', 'shard')},
+            },
+        ),
+    ]
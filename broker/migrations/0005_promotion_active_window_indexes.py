@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0004_promotion_claim_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['end_date', 'start_date'], name='promotion_active_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'end_date', 'start_date'], name='promotion_active_cat_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-19 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0005_promotion_active_window_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotionclaim',
+            name='rejection_reason',
+            field=models.TextField(blank=True, null=True, verbose_name='rejection reason'),
+        ),
+        migrations.AddField(
+            model_name='promotionclaim',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], default='PENDING', max_length=20, verbose_name='status'),
+        ),
+        migrations.AddIndex(
+            model_name='promotionclaim',
+            index=models.Index(fields=['promotion', 'status'], name='broker_prom_promoti_a95229_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 04:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0006_promotionclaim_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessGrant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('BUSINESS', 'Business'), ('CAMPAIGN', 'Campaign')], max_length=20, verbose_name='object type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='object id')),
+                ('role', models.CharField(choices=[('BUSINESS_OWNER', 'Business Owner'), ('BUSINESS_MEMBER', 'Business Member'), ('COLLABORATOR', 'Campaign Collaborator')], max_length=20, verbose_name='role')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_grants', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'access grant',
+                'verbose_name_plural': 'access grants',
+                'indexes': [models.Index(fields=['object_type', 'object_id'], name='broker_acce_object__d55ce5_idx')],
+                'unique_together': {('user', 'object_type', 'object_id', 'role')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def backfill_access_grants(apps, schema_editor):
+    AccessGrant = apps.get_model('broker', 'AccessGrant')
+    BusinessProfile = apps.get_model('broker', 'BusinessProfile')
+    BusinessMember = apps.get_model('broker', 'BusinessMember')
+    Campaign = apps.get_model('broker', 'Campaign')
+    CampaignCollaborator = apps.get_model('broker', 'CampaignCollaborator')
+
+    rows = set()
+    for business_id, user_id in BusinessProfile.objects.values_list('pk', 'user_id'):
+        rows.add((user_id, 'BUSINESS', business_id, 'BUSINESS_OWNER'))
+    for business_id, user_id in BusinessMember.objects.values_list('business_id', 'user_id'):
+        rows.add((user_id, 'BUSINESS', business_id, 'BUSINESS_MEMBER'))
+    for campaign_id, user_id in Campaign.objects.filter(business__isnull=False).values_list('pk', 'business__user_id'):
+        rows.add((user_id, 'CAMPAIGN', campaign_id, 'BUSINESS_OWNER'))
+    for campaign_id, user_id in Campaign.objects.filter(business__members__isnull=False).values_list(
+        'pk', 'business__members__user_id'
+    ):
+        rows.add((user_id, 'CAMPAIGN', campaign_id, 'BUSINESS_MEMBER'))
+    for campaign_id, user_id in CampaignCollaborator.objects.values_list('campaign_id', 'user_id'):
+        rows.add((user_id, 'CAMPAIGN', campaign_id, 'COLLABORATOR'))
+
+    AccessGrant.objects.bulk_create(
+        [
+            AccessGrant(user_id=user_id, object_type=object_type, object_id=object_id, role=role)
+            for user_id, object_type, object_id, role in rows
+        ],
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0007_access_grants'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_access_grants, migrations.RunPython.noop),
+    ]
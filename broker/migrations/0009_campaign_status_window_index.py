@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0008_backfill_access_grants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['status', 'start_date', 'end_date'], name='broker_camp_status_0ff33b_idx'),
+        ),
+    ]
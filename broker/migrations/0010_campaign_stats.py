@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0009_campaign_status_window_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotion',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='promotions', to='broker.campaign'),
+        ),
+        migrations.CreateModel(
+            name='CampaignStats',
+            fields=[
+                ('campaign', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='broker.campaign')),
+                ('product_count', models.PositiveIntegerField(default=0, verbose_name='products')),
+                ('approved_product_count', models.PositiveIntegerField(default=0, verbose_name='approved products')),
+                ('collaborator_count', models.PositiveIntegerField(default=0, verbose_name='collaborators')),
+                ('accepted_collaborator_count', models.PositiveIntegerField(default=0, verbose_name='accepted collaborators')),
+                ('promotion_count', models.PositiveIntegerField(default=0, verbose_name='linked promotions')),
+                ('claim_count', models.PositiveIntegerField(default=0, verbose_name='claims on linked promotions')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='orders')),
+                ('commission_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='commission accrued')),
+                ('is_dirty', models.BooleanField(default=False, verbose_name='needs refresh')),
+                ('refreshed_at', models.DateTimeField(verbose_name='refreshed at')),
+            ],
+            options={
+                'verbose_name': 'campaign stats',
+                'verbose_name_plural': 'campaign stats',
+                'indexes': [models.Index(fields=['refreshed_at'], name='broker_camp_refresh_ad3338_idx'), models.Index(condition=models.Q(('is_dirty', True)), fields=['is_dirty'], name='campaignstats_dirty_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Calendar overlap queries: GiST over the same tstzrange expression that
+# broker.event_calendar.period_expression() builds on PostgreSQL, a plain
+# (start_date, end_date) btree on other backends
+PERIOD_TABLES = [
+    ('broker_campaign', 'campaign_period_idx'),
+    ('broker_promotion', 'promotion_period_idx'),
+]
+
+
+def create_period_indexes(apps, schema_editor):
+    for table, name in PERIOD_TABLES:
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+                f'USING gist (tstzrange(start_date, GREATEST(start_date, end_date)))'
+            )
+        else:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (start_date, end_date)')
+
+
+def drop_period_indexes(apps, schema_editor):
+    for table, name in PERIOD_TABLES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0010_campaign_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_period_indexes, drop_period_indexes),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 05:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0011_period_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='name')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'tag',
+                'verbose_name_plural': 'tags',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ListingTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listing_tags', to='broker.listing')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listing_tags', to='broker.tag')),
+            ],
+            options={
+                'verbose_name': 'listing tag',
+                'verbose_name_plural': 'listing tags',
+                'indexes': [models.Index(fields=['tag', 'listing'], name='broker_list_tag_id_94f9a9_idx')],
+                'unique_together': {('listing', 'tag')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 05:06
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Must match broker.listing_search.search_vector()
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'C') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'D')"
+)
+PUBLISHED = "status = 'PUBLISHED' AND is_active"
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(f'UPDATE broker_listing SET search_vector = {SEARCH_VECTOR_SQL}')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS listing_search_published_idx ON broker_listing '
+        f'USING gin (search_vector) WHERE {PUBLISHED}'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS listing_title_trgm_published_idx ON broker_listing '
+        f'USING gin (title gin_trgm_ops) WHERE {PUBLISHED}'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS listing_title_trgm_published_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS listing_search_published_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0012_listing_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-19 05:07
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Snapshot of broker.listing_expiry.LISTING_LIFETIME_DAYS when this ran
+LISTING_LIFETIME_DAYS = {'PRODUCT': 90, 'SERVICE': 180, 'JOB': 30, 'EVENT': 60, 'OTHER': 90}
+# Listings already past their lifetime get this long before the first sweep
+BACKFILL_GRACE = timedelta(days=14)
+
+
+def backfill_expiry(apps, schema_editor):
+    Listing = apps.get_model('broker', 'Listing')
+    pending = Listing.objects.filter(status='PUBLISHED', expires_at__isnull=True)
+    for listing_type, days in LISTING_LIFETIME_DAYS.items():
+        pending.filter(listing_type=listing_type).update(expires_at=models.F('created_at') + timedelta(days=days))
+    pending.update(expires_at=models.F('created_at') + timedelta(days=LISTING_LIFETIME_DAYS['OTHER']))
+    grace_until = timezone.now() + BACKFILL_GRACE
+    Listing.objects.filter(status='PUBLISHED', expires_at__lt=grace_until).update(expires_at=grace_until)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0013_listing_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('LISTING_EXPIRED', 'Listing expired'), ('SYSTEM', 'System')], max_length=30, verbose_name='type')),
+                ('title', models.CharField(max_length=255, verbose_name='title')),
+                ('message', models.TextField(blank=True, verbose_name='message')),
+                ('data', models.JSONField(blank=True, null=True, verbose_name='data')),
+                ('is_read', models.BooleanField(default=False, verbose_name='read')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'notification',
+                'verbose_name_plural': 'notifications',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='expires at'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('status', 'PUBLISHED')), fields=['expires_at'], name='listing_published_expiry_idx'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='broker_noti_user_id_bc9150_idx'),
+        ),
+        migrations.RunPython(backfill_expiry, migrations.RunPython.noop),
+    ]
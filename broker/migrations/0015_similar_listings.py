@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 05:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0014_listing_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='rank')),
+                ('score', models.FloatField(verbose_name='score')),
+                ('computed_at', models.DateTimeField(verbose_name='computed at')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_listings', to='broker.listing')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='broker.listing')),
+            ],
+            options={
+                'verbose_name': 'similar listing',
+                'verbose_name_plural': 'similar listings',
+                'ordering': ['listing', 'rank'],
+                'indexes': [models.Index(fields=['listing', 'rank'], name='broker_simi_listing_fe96f1_idx'), models.Index(fields=['computed_at'], name='broker_simi_compute_4d8e20_idx')],
+                'unique_together': {('listing', 'similar')},
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0 on 2026-10-19 05:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+PREVIEW_LENGTH = 140
+
+
+def backfill_inbox(apps, schema_editor):
+    Conversation = apps.get_model('broker', 'Conversation')
+    Message = apps.get_model('broker', 'Message')
+    messages = Message.objects.filter(conversation=OuterRef('pk'))
+    last = messages.order_by('-created_at', '-pk')
+
+    def unread_for(participant):
+        return Coalesce(Subquery(
+            messages.filter(is_read=False).exclude(sender=OuterRef(participant)).order_by().values(
+                'conversation'
+            ).annotate(total=Count('pk')).values('total')
+        ), Value(0))
+
+    Conversation.objects.filter(Exists(messages)).update(
+        last_message_at=Subquery(last.values('created_at')[:1]),
+        last_message_preview=Substr(Subquery(last.values('content')[:1]), 1, PREVIEW_LENGTH),
+        last_message_sender=Subquery(last.values('sender')[:1]),
+        last_message_type=Subquery(last.values('message_type')[:1]),
+        buyer_unread_count=unread_for('buyer'),
+        seller_unread_count=unread_for('seller'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0015_similar_listings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='buyer_unread_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='unread by buyer'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='last message preview'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_type',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='last message type'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='seller_unread_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='unread by seller'),
+        ),
+        migrations.AlterField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='last message at'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['buyer', '-last_message_at'], name='conversation_buyer_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['seller', '-last_message_at'], name='conversation_seller_inbox_idx'),
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
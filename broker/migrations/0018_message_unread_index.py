@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0017_message_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['conversation', 'created_at'], name='message_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-19 05:16
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Must match broker.message_search.search_vector()
+SEARCH_VECTOR_SQL = "to_tsvector('english', coalesce(content, ''))"
+BACKFILL_BATCH_SIZE = 10000
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # btree_gin lets one GIN index hold the conversation id next to the vector
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM broker_message')
+        last_id = cursor.fetchone()[0]
+    for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+        schema_editor.execute(
+            f'UPDATE broker_message SET search_vector = {SEARCH_VECTOR_SQL} WHERE id > %s AND id <= %s',
+            [start, start + BACKFILL_BATCH_SIZE],
+        )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS message_search_idx ON broker_message '
+        'USING gin (conversation_id, search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS message_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0018_message_unread_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
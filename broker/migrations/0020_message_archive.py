@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 05:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0019_message_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='archived_message_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='archived messages'),
+        ),
+        migrations.CreateModel(
+            name='MessageArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_message_id', models.BigIntegerField(verbose_name='first message id')),
+                ('last_message_id', models.BigIntegerField(verbose_name='last message id')),
+                ('first_created_at', models.DateTimeField(verbose_name='first message at')),
+                ('last_created_at', models.DateTimeField(verbose_name='last message at')),
+                ('message_count', models.PositiveIntegerField(verbose_name='messages')),
+                ('payload', models.BinaryField(verbose_name='payload')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_segments', to='broker.conversation')),
+            ],
+            options={
+                'verbose_name': 'message archive segment',
+                'verbose_name_plural': 'message archive segments',
+                'ordering': ['conversation', 'first_created_at', 'first_message_id'],
+                'indexes': [models.Index(fields=['conversation', 'first_created_at', 'first_message_id'], name='archive_segment_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('conversation', 'first_message_id'), name='unique_archive_segment_start')],
+            },
+        ),
+    ]
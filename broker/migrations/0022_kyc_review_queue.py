@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 05:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def uppercase_decisions(apps, schema_editor):
+    # The approve/reject actions used to store lowercase statuses outside the choices
+    KYCVerification = apps.get_model('broker', 'KYCVerification')
+    for status in ('approved', 'rejected'):
+        KYCVerification.objects.filter(status=status).update(status=status.upper())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0021_attachment_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kycverification',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_kyc_reviews', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='kycverification',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='lease expires at'),
+        ),
+        migrations.AddIndex(
+            model_name='kycverification',
+            index=models.Index(fields=['status', 'created_at'], name='kyc_review_queue_idx'),
+        ),
+        migrations.RunPython(uppercase_decisions, migrations.RunPython.noop),
+    ]
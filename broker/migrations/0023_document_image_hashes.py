@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 05:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0022_kyc_review_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentImageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_field', models.CharField(max_length=30, verbose_name='source field')),
+                ('source_url', models.URLField(verbose_name='source URL')),
+                ('ahash', models.BigIntegerField(blank=True, null=True, verbose_name='average hash')),
+                ('dhash', models.BigIntegerField(blank=True, null=True, verbose_name='difference hash')),
+                ('dhash_band0', models.PositiveIntegerField(blank=True, null=True)),
+                ('dhash_band1', models.PositiveIntegerField(blank=True, null=True)),
+                ('dhash_band2', models.PositiveIntegerField(blank=True, null=True)),
+                ('dhash_band3', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, default='', max_length=255, verbose_name='error')),
+                ('duplicate_distance', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='duplicate distance')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('business_document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_hashes', to='broker.businessdocument')),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='broker.documentimagehash')),
+                ('kyc', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_hashes', to='broker.kycverification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_image_hashes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'document image hash',
+                'verbose_name_plural': 'document image hashes',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['dhash_band0'], name='doc_hash_band0_idx'), models.Index(fields=['dhash_band1'], name='doc_hash_band1_idx'), models.Index(fields=['dhash_band2'], name='doc_hash_band2_idx'), models.Index(fields=['dhash_band3'], name='doc_hash_band3_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kyc__isnull', False)), fields=('kyc', 'source_field'), name='unique_kyc_image_hash'), models.UniqueConstraint(condition=models.Q(('business_document__isnull', False)), fields=('business_document', 'source_field'), name='unique_business_document_image_hash')],
+            },
+        ),
+    ]
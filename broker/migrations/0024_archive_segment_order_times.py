@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 05:36
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+
+def backfill_order_times(apps, schema_editor):
+    # Segments written before this field existed list their ORDER messages only in the payload
+    MessageArchiveSegment = apps.get_model('broker', 'MessageArchiveSegment')
+    for segment in MessageArchiveSegment.objects.only('pk', 'payload').iterator():
+        rows = (json.loads(line) for line in zlib.decompress(bytes(segment.payload)).decode().split('\n'))
+        order_times = [row['created_at'] for row in rows if row['message_type'] == 'ORDER']
+        if order_times:
+            MessageArchiveSegment.objects.filter(pk=segment.pk).update(order_times=order_times)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0023_document_image_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagearchivesegment',
+            name='order_times',
+            field=models.JSONField(blank=True, default=list, verbose_name='order message times'),
+        ),
+        migrations.RunPython(backfill_order_times, migrations.RunPython.noop),
+    ]
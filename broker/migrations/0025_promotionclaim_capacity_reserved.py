@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0024_archive_segment_order_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotionclaim',
+            name='capacity_reserved',
+            field=models.BooleanField(default=False, verbose_name='capacity reserved'),
+        ),
+    ]
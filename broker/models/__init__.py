@@ -6,3 +6,5 @@ from .kyc import *
 from .campaign import *
 from .listing import *
 from .conversation import *
+from .access import *
+from .notification import *
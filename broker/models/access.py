@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from .user import User
+
+class AccessGrant(models.Model):
+    """
+    Materialized "who can see what" index for businesses and campaigns
+    Maintained by signals on ownership, membership and collaboration changes;
+    rebuild with `manage.py rebuild_access_grants`
+    """
+    class ObjectType(models.TextChoices):
+        BUSINESS = 'BUSINESS', _('Business')
+        CAMPAIGN = 'CAMPAIGN', _('Campaign')
+
+    class GrantRole(models.TextChoices):
+        BUSINESS_OWNER = 'BUSINESS_OWNER', _('Business Owner')
+        BUSINESS_MEMBER = 'BUSINESS_MEMBER', _('Business Member')
+        COLLABORATOR = 'COLLABORATOR', _('Campaign Collaborator')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='access_grants')
+    object_type = models.CharField(_('object type'), max_length=20, choices=ObjectType.choices)
+    object_id = models.PositiveBigIntegerField(_('object id'))
+    role = models.CharField(_('role'), max_length=20, choices=GrantRole.choices)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        # (user, object_type) leads so "ids this user can access" is an index range scan
+        unique_together = ('user', 'object_type', 'object_id', 'role')
+        verbose_name = _('access grant')
+        verbose_name_plural = _('access grants')
+        indexes = [
+            models.Index(fields=['object_type', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.get_role_display()} of {self.object_type} {self.object_id}"
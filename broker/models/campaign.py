@@ -32,6 +32,9 @@ class Campaign(models.Model):
         verbose_name = _('campaign')
         verbose_name_plural = _('campaigns')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'start_date', 'end_date']),
+        ]
 
 class CampaignCollaborator(models.Model):
     class CollaboratorRole(models.TextChoices):
@@ -59,3 +62,37 @@ class CampaignCollaborator(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.get_role_display()} in {self.campaign.name}"
+
+class CampaignStats(models.Model):
+    """
+    Per-campaign analytics rollup, refreshed incrementally by
+    `manage.py refresh_campaign_stats` so dashboards read one row per campaign
+    """
+    campaign = models.OneToOneField(Campaign, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    product_count = models.PositiveIntegerField(_('products'), default=0)
+    approved_product_count = models.PositiveIntegerField(_('approved products'), default=0)
+    collaborator_count = models.PositiveIntegerField(_('collaborators'), default=0)
+    accepted_collaborator_count = models.PositiveIntegerField(_('accepted collaborators'), default=0)
+    promotion_count = models.PositiveIntegerField(_('linked promotions'), default=0)
+    claim_count = models.PositiveIntegerField(_('claims on linked promotions'), default=0)
+    order_count = models.PositiveIntegerField(_('orders'), default=0)
+    commission_total = models.DecimalField(_('commission accrued'), max_digits=14, decimal_places=2, default=0)
+    is_dirty = models.BooleanField(_('needs refresh'), default=False)
+    refreshed_at = models.DateTimeField(_('refreshed at'))
+
+    class Meta:
+        verbose_name = _('campaign stats')
+        verbose_name_plural = _('campaign stats')
+        indexes = [
+            models.Index(fields=['refreshed_at']),
+            models.Index(fields=['is_dirty'], condition=models.Q(is_dirty=True), name='campaignstats_dirty_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats for campaign {self.campaign_id}"
+
+    @property
+    def acceptance_rate(self):
+        if not self.collaborator_count:
+            return None
+        return round(self.accepted_collaborator_count / self.collaborator_count, 4)
@@ -1,4 +1,6 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from .user import User
 from .listing import Listing
@@ -14,7 +16,15 @@ class Conversation(models.Model):
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='buyer_conversations')
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seller_conversations')
     status = models.CharField(_('status'), max_length=20, choices=ConversationStatus.choices, default=ConversationStatus.ACTIVE)
-    last_message_at = models.DateTimeField(_('last message at'), auto_now=True)
+    # Inbox read model, maintained by broker.inbox when messages are inserted
+    last_message_at = models.DateTimeField(_('last message at'), default=timezone.now)
+    last_message_preview = models.CharField(_('last message preview'), max_length=255, blank=True, default='')
+    last_message_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_type = models.CharField(_('last message type'), max_length=20, blank=True, default='')
+    buyer_unread_count = models.PositiveIntegerField(_('unread by buyer'), default=0)
+    seller_unread_count = models.PositiveIntegerField(_('unread by seller'), default=0)
+    # Messages moved to MessageArchiveSegment by broker.message_archive
+    archived_message_count = models.PositiveIntegerField(_('archived messages'), default=0)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -23,6 +33,10 @@ class Conversation(models.Model):
         ordering = ['-last_message_at']
         verbose_name = _('conversation')
         verbose_name_plural = _('conversations')
+        indexes = [
+            models.Index(fields=['buyer', '-last_message_at'], name='conversation_buyer_inbox_idx'),
+            models.Index(fields=['seller', '-last_message_at'], name='conversation_seller_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"{self.buyer.email} - {self.seller.email} - {self.listing.title if self.listing else 'No Listing'}"
@@ -43,6 +57,8 @@ class Message(models.Model):
     is_read = models.BooleanField(_('read'), default=False)
     read_at = models.DateTimeField(_('read at'), null=True, blank=True)
     metadata = models.JSONField(_('metadata'), blank=True, null=True)
+    # Maintained by broker.message_search; indexed by migration 0019
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -50,7 +66,73 @@ class Message(models.Model):
         ordering = ['created_at']
         verbose_name = _('message')
         verbose_name_plural = _('messages')
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_history_idx'),
+            models.Index(
+                fields=['conversation', 'created_at'],
+                condition=models.Q(is_read=False),
+                name='message_unread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.sender.email} - {self.get_message_type_display()} - {self.content[:50]}"
 
+class MessageArchiveSegment(models.Model):
+    """
+    A run of consecutive messages of one conversation moved out of the hot
+    Message table, stored as zlib-compressed JSON lines
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archive_segments')
+    first_message_id = models.BigIntegerField(_('first message id'))
+    last_message_id = models.BigIntegerField(_('last message id'))
+    first_created_at = models.DateTimeField(_('first message at'))
+    last_created_at = models.DateTimeField(_('last message at'))
+    message_count = models.PositiveIntegerField(_('messages'))
+    payload = models.BinaryField(_('payload'))
+    # ISO timestamps of the ORDER messages in the payload, read by the campaign rollups
+    order_times = models.JSONField(_('order message times'), default=list, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        ordering = ['conversation', 'first_created_at', 'first_message_id']
+        verbose_name = _('message archive segment')
+        verbose_name_plural = _('message archive segments')
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'first_message_id'], name='unique_archive_segment_start'),
+        ]
+        indexes = [
+            models.Index(fields=['conversation', 'first_created_at', 'first_message_id'], name='archive_segment_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.conversation_id} - {self.message_count} messages"
+
+class AttachmentUpload(models.Model):
+    """
+    A file for an IMAGE or FILE message, received in sequential chunks by
+    broker.attachments; the message is created once every byte has arrived
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='attachment_uploads')
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attachment_uploads')
+    message = models.OneToOneField(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='attachment')
+    filename = models.CharField(_('file name'), max_length=255)
+    content_type = models.CharField(_('content type'), max_length=100)
+    size = models.PositiveBigIntegerField(_('size'))
+    received_size = models.PositiveBigIntegerField(_('received'), default=0)
+    sha256 = models.CharField(_('SHA-256'), max_length=64, blank=True, default='')
+    completed_at = models.DateTimeField(_('completed at'), null=True, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _('attachment upload')
+        verbose_name_plural = _('attachment uploads')
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.size})"
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
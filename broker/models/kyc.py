@@ -35,6 +35,15 @@ class KYCVerification(models.Model):
         blank=True,
         related_name='verified_kyc_documents'
     )
+    # Review queue lease, see broker.kyc_review; free again once lease_expires_at passes
+    claimed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_kyc_reviews'
+    )
+    lease_expires_at = models.DateTimeField(_('lease expires at'), blank=True, null=True)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -45,6 +54,9 @@ class KYCVerification(models.Model):
         verbose_name = _('KYC verification')
         verbose_name_plural = _('KYC verifications')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='kyc_review_queue_idx'),
+        ]
 
 class BusinessDocument(models.Model):
     class DocumentType(models.TextChoices):
@@ -82,3 +94,65 @@ class BusinessDocument(models.Model):
         verbose_name = _('business document')
         verbose_name_plural = _('business documents')
         ordering = ['-created_at']
+
+class DocumentImageHash(models.Model):
+    """
+    Perceptual hashes of one document image, computed offline by
+    broker.document_hashes. The dHash is also stored as four 16-bit bands,
+    each indexed, so near-duplicates are found without scanning every hash
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_image_hashes')
+    kyc = models.ForeignKey(KYCVerification, on_delete=models.CASCADE, null=True, blank=True, related_name='image_hashes')
+    business_document = models.ForeignKey(
+        BusinessDocument,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='image_hashes'
+    )
+    source_field = models.CharField(_('source field'), max_length=30)
+    source_url = models.URLField(_('source URL'))
+    # Unsigned 64-bit hashes stored two's-complement in a signed column
+    ahash = models.BigIntegerField(_('average hash'), null=True, blank=True)
+    dhash = models.BigIntegerField(_('difference hash'), null=True, blank=True)
+    dhash_band0 = models.PositiveIntegerField(null=True, blank=True)
+    dhash_band1 = models.PositiveIntegerField(null=True, blank=True)
+    dhash_band2 = models.PositiveIntegerField(null=True, blank=True)
+    dhash_band3 = models.PositiveIntegerField(null=True, blank=True)
+    error = models.CharField(_('error'), max_length=255, blank=True, default='')
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates'
+    )
+    duplicate_distance = models.PositiveSmallIntegerField(_('duplicate distance'), null=True, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.source_field}"
+
+    class Meta:
+        verbose_name = _('document image hash')
+        verbose_name_plural = _('document image hashes')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['dhash_band0'], name='doc_hash_band0_idx'),
+            models.Index(fields=['dhash_band1'], name='doc_hash_band1_idx'),
+            models.Index(fields=['dhash_band2'], name='doc_hash_band2_idx'),
+            models.Index(fields=['dhash_band3'], name='doc_hash_band3_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kyc', 'source_field'],
+                condition=models.Q(kyc__isnull=False),
+                name='unique_kyc_image_hash',
+            ),
+            models.UniqueConstraint(
+                fields=['business_document', 'source_field'],
+                condition=models.Q(business_document__isnull=False),
+                name='unique_business_document_image_hash',
+            ),
+        ]
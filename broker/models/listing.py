@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from .user import User
@@ -37,6 +38,10 @@ class Listing(models.Model):
     lead_time = models.CharField(_('lead time'), max_length=100, blank=True, null=True)
     commission_rate = models.DecimalField(_('commission rate'), max_digits=5, decimal_places=2, null=True, blank=True)
     metadata = models.JSONField(_('metadata'), blank=True, null=True)
+    # Defaults from the listing type on publish; see broker.listing_expiry
+    expires_at = models.DateTimeField(_('expires at'), null=True, blank=True)
+    # Maintained by broker.listing_search; indexed by migration 0013
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -47,6 +52,13 @@ class Listing(models.Model):
         verbose_name = _('listing')
         verbose_name_plural = _('listings')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(status='PUBLISHED'),
+                name='listing_published_expiry_idx',
+            ),
+        ]
 
 class CampaignProduct(models.Model):
     class Status(models.TextChoices):
@@ -69,3 +81,53 @@ class CampaignProduct(models.Model):
 
     def __str__(self):
         return f"{self.campaign.name} - {self.listing.title}"
+
+class Tag(models.Model):
+    """Normalized tag name; see broker.tagging.normalize_tag"""
+    name = models.CharField(_('name'), max_length=50, unique=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('tag')
+        verbose_name_plural = _('tags')
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class ListingTag(models.Model):
+    """Index row linking a listing to one of the tags parsed from Listing.tags"""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='listing_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='listing_tags')
+
+    class Meta:
+        unique_together = ('listing', 'tag')
+        verbose_name = _('listing tag')
+        verbose_name_plural = _('listing tags')
+        indexes = [
+            models.Index(fields=['tag', 'listing']),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} - {self.tag_id}"
+
+class SimilarListing(models.Model):
+    """Precomputed nearest neighbour of a listing; rebuilt by `manage.py build_similar_listings`"""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='similar_listings')
+    similar = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='similar_to')
+    rank = models.PositiveSmallIntegerField(_('rank'))
+    score = models.FloatField(_('score'))
+    computed_at = models.DateTimeField(_('computed at'))
+
+    class Meta:
+        unique_together = ('listing', 'similar')
+        verbose_name = _('similar listing')
+        verbose_name_plural = _('similar listings')
+        ordering = ['listing', 'rank']
+        indexes = [
+            models.Index(fields=['listing', 'rank']),
+            models.Index(fields=['computed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} -> {self.similar_id} ({self.score:.3f})"
@@ -0,0 +1,28 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from .user import User
+
+class Notification(models.Model):
+    """In-app notification queued for a user; written in bulk by background jobs"""
+    class NotificationType(models.TextChoices):
+        LISTING_EXPIRED = 'LISTING_EXPIRED', _('Listing expired')
+        SYSTEM = 'SYSTEM', _('System')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    notification_type = models.CharField(_('type'), max_length=30, choices=NotificationType.choices)
+    title = models.CharField(_('title'), max_length=255)
+    message = models.TextField(_('message'), blank=True)
+    data = models.JSONField(_('data'), blank=True, null=True)
+    is_read = models.BooleanField(_('read'), default=False)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('notification')
+        verbose_name_plural = _('notifications')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.title}"
@@ -15,6 +15,7 @@ class Promotion(models.Model):
         OTHER = 'OTHER', _('Other')
 
     business = models.ForeignKey(BusinessProfile, on_delete=models.CASCADE, related_name='promotions')
+    campaign = models.ForeignKey('Campaign', on_delete=models.SET_NULL, null=True, blank=True, related_name='promotions')
     title = models.CharField(_('title'), max_length=100)
     description = models.TextField(_('description'), blank=True, null=True)
     image_url = models.URLField(_('image URL'), blank=True, null=True)
@@ -25,22 +26,56 @@ class Promotion(models.Model):
     current_claims = models.PositiveIntegerField(_('current claims'), default=0)
     points_cost = models.PositiveIntegerField(_('points cost'))
     category = models.CharField(_('category'), max_length=20, choices=PromotionCategory.choices)
+    # Number of claim counter shards, 0 keeps every claim on current_claims
+    counter_shards = models.PositiveSmallIntegerField(_('counter shards'), default=0)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
     def __str__(self):
         return f"{self.title} - {self.business.business_name}"
 
+    def save(self, *args, **kwargs):
+        # current_claims is maintained by conditional UPDATEs, so a full save of an
+        # existing row (admin, activate/deactivate) must not write back the copy it loaded
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'current_claims'
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _('promotion')
         verbose_name_plural = _('promotions')
         ordering = ['-created_at']
+        indexes = [
+            # Partial indexes over active rows only, for "running now" browse queries
+            models.Index(
+                fields=['end_date', 'start_date'],
+                condition=models.Q(is_active=True),
+                name='promotion_active_window_idx',
+            ),
+            models.Index(
+                fields=['category', 'end_date', 'start_date'],
+                condition=models.Q(is_active=True),
+                name='promotion_active_cat_idx',
+            ),
+        ]
 
 class PromotionClaim(models.Model):
+    class ClaimStatus(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        APPROVED = 'APPROVED', _('Approved')
+        REJECTED = 'REJECTED', _('Rejected')
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='promotion_claims')
     promotion = models.ForeignKey(Promotion, on_delete=models.CASCADE, related_name='claims')
     shared_count = models.PositiveIntegerField(_('shared count'), default=0)
     points = models.IntegerField(_('points'), default=0)
+    # Set by claim_promotion when the claim took a capacity slot; `points` then holds what was charged
+    capacity_reserved = models.BooleanField(_('capacity reserved'), default=False)
+    status = models.CharField(_('status'), max_length=20, choices=ClaimStatus.choices, default=ClaimStatus.PENDING)
+    rejection_reason = models.TextField(_('rejection reason'), blank=True, null=True)
     claimed_at = models.DateTimeField(_('claimed at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
@@ -48,6 +83,28 @@ class PromotionClaim(models.Model):
         unique_together = ('user', 'promotion')
         verbose_name = _('promotion claim')
         verbose_name_plural = _('promotion claims')
+        indexes = [
+            models.Index(fields=['promotion', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.promotion.title}"
+
+class PromotionClaimCounter(models.Model):
+    """
+    One shard of a hot promotion's claim counter
+    Each shard owns a slice of the remaining capacity; the compactor folds
+    shard counts back into Promotion.current_claims and re-splits what is left
+    """
+    promotion = models.ForeignKey(Promotion, on_delete=models.CASCADE, related_name='claim_counters')
+    shard = models.PositiveSmallIntegerField(_('shard'))
+    count = models.PositiveIntegerField(_('count'), default=0)
+    capacity = models.PositiveIntegerField(_('capacity'), default=0)
+
+    class Meta:
+        unique_together = ('promotion', 'shard')
+        verbose_name = _('promotion claim counter')
+        verbose_name_plural = _('promotion claim counters')
+
+    def __str__(self):
+        return f"{self.promotion_id} shard {self.shard}: {self.count}/{self.capacity}"
@@ -0,0 +1,61 @@
+"""
+Public feed of currently running promotions
+Serialized feeds are cached per category until the next promotion write or
+the next start/end boundary, whichever comes first. Invalidation bumps a
+version key, which reaches every worker only when CACHE_BACKEND points at a
+shared cache; the cached rows carry no claim counters, which change on
+every claim without touching the promotion through save()
+"""
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from .cache_versions import bump_cache_version, versioned_key
+from .claims import claimable_promotions
+from .models import Promotion
+
+FEED_CACHE_SECONDS = 300
+FEED_CACHE_NAME = 'promotion_feed'
+
+
+def invalidate_promotion_feed():
+    """Drop every cached category feed"""
+    bump_cache_version(FEED_CACHE_NAME)
+
+
+def active_promotions(category=None, now=None):
+    """Promotions inside their window; served by the partial active-window indexes"""
+    queryset = claimable_promotions(now).select_related('business').order_by('end_date', 'pk')
+    if category:
+        queryset = queryset.filter(category=category)
+    return queryset
+
+
+def _seconds_until_next_boundary(category, now):
+    """Time until a running promotion ends or an upcoming one starts"""
+    upcoming = Promotion.objects.filter(is_active=True, start_date__gt=now)
+    if category:
+        upcoming = upcoming.filter(category=category)
+    next_start = upcoming.aggregate(at=Min('start_date'))['at']
+    next_end = active_promotions(category, now).order_by().aggregate(at=Min('end_date'))['at']
+
+    boundaries = [at for at in (next_start, next_end) if at is not None]
+    if not boundaries:
+        return FEED_CACHE_SECONDS
+    # end_date is inclusive, so the feed changes just after it
+    seconds = int((min(boundaries) - now).total_seconds()) + 1
+    return max(1, min(seconds, FEED_CACHE_SECONDS))
+
+
+def get_promotion_feed(serialize, category=None):
+    """
+    Return the serialized active feed for a category (or all categories)
+    `serialize` turns a queryset into plain data and is only called on a miss
+    """
+    cache_key = versioned_key(FEED_CACHE_NAME, category or 'all')
+    feed = cache.get(cache_key)
+    if feed is None:
+        now = timezone.now()
+        feed = serialize(active_promotions(category, now))
+        cache.set(cache_key, feed, _seconds_until_next_boundary(category, now))
+    return feed
@@ -0,0 +1,184 @@
+"""
+Real-time chat delivery
+New messages are published once their transaction commits to a per-user
+channel for each conversation participant, and every open WebSocket of that
+user receives them. The backend is pluggable through REALTIME_PUBSUB_BACKEND:
+InMemoryPubSub fans out within one process (single node, tests), while a
+BrokerPubSub subclass relays events between nodes through an external broker
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'broker.realtime.InMemoryPubSub'
+# Events a slow client may fall behind by before it is disconnected to resync
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+def user_channel(user_id):
+    return f'user.{user_id}'
+
+
+class SubscriptionOverflow(Exception):
+    """The subscriber fell too far behind and missed events"""
+
+
+class Subscription:
+    """One listener on a channel, bound to the event loop it was created in"""
+
+    def __init__(self, pubsub, channel):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(SUBSCRIPTION_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Always runs on self.loop
+        if self.overflowed:
+            return
+        if self.queue.full():
+            # A full queue means the reader is not waiting, so its next get() sees the flag
+            self.overflowed = True
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        """Next event; raises SubscriptionOverflow once events were dropped"""
+        if self.overflowed:
+            raise SubscriptionOverflow
+        event = await self.queue.get()
+        if self.overflowed:
+            raise SubscriptionOverflow
+        return event
+
+    def close(self):
+        self.pubsub.unsubscribe(self)
+
+
+class InMemoryPubSub:
+    """Process-local fan-out; publish() may be called from any thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    async def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self.lock:
+            listeners = self.subscriptions.setdefault(channel, set())
+            first = not listeners
+            listeners.add(subscription)
+        if first:
+            await self.channel_opened(channel)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            listeners = self.subscriptions.get(subscription.channel, set())
+            listeners.discard(subscription)
+            last = not listeners
+            if last:
+                self.subscriptions.pop(subscription.channel, None)
+        if last:
+            self.channel_closed(subscription.channel)
+
+    def publish(self, channel, event):
+        self.fan_out(channel, event)
+
+    def fan_out(self, channel, event):
+        """Hand an event to every local subscriber of the channel on its own loop"""
+        with self.lock:
+            listeners = list(self.subscriptions.get(channel, ()))
+        for subscription in listeners:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; its socket is gone
+                pass
+
+    async def channel_opened(self, channel):
+        """Called when a channel gets its first local subscriber"""
+
+    def channel_closed(self, channel):
+        """Called when a channel loses its last local subscriber"""
+
+
+class BrokerPubSub(InMemoryPubSub):
+    """
+    Base for multi-node backends: publish() goes through the broker and each
+    node fans the events it receives out to its local subscribers
+    Subclasses implement send(), listen(), and usually channel_opened() and
+    channel_closed() to (un)subscribe the node on the broker
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+
+    def publish(self, channel, event):
+        self.send(channel, json.dumps(event, cls=DjangoJSONEncoder))
+
+    def send(self, channel, data):
+        """Deliver a serialized event to every node subscribed to channel"""
+        raise NotImplementedError('BrokerPubSub subclasses must implement send()')
+
+    def listen(self):
+        """Async iterator of (channel, serialized event) received from the broker"""
+        raise NotImplementedError('BrokerPubSub subclasses must implement listen()')
+
+    async def channel_opened(self, channel):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.get_running_loop().create_task(self.relay())
+
+    async def relay(self):
+        async for channel, data in self.listen():
+            self.fan_out(channel, json.loads(data))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_pubsub():
+    """The process-wide pub/sub backend"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(getattr(settings, 'REALTIME_PUBSUB_BACKEND', DEFAULT_BACKEND))()
+        return _backend
+
+
+def message_event(message, participant_ids):
+    return {
+        'type': 'message.created',
+        'conversation': message.conversation_id,
+        'participants': participant_ids,
+        'message': {
+            'id': message.pk,
+            'sender': message.sender_id,
+            'message_type': message.message_type,
+            'content': message.content,
+            'metadata': message.metadata,
+            'created_at': message.created_at.isoformat(),
+        },
+    }
+
+
+def publish_message(message):
+    """Publish a new message to both participants once the current transaction commits"""
+    conversation = message.conversation
+    participant_ids = [conversation.buyer_id, conversation.seller_id]
+    event = message_event(message, participant_ids)
+
+    def publish():
+        pubsub = get_pubsub()
+        for user_id in set(participant_ids):
+            pubsub.publish(user_channel(user_id), event)
+
+    transaction.on_commit(publish)
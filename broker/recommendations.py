@@ -0,0 +1,197 @@
+"""
+Similar listing recommendations
+Builds TF-IDF vectors for published listings from title, tags, category and
+description as a SciPy sparse matrix, computes top-k cosine neighbours chunk by
+chunk from sparse products without ever densifying a chunk, and stores them in
+SimilarListing so detail pages read their rail with one indexed query.
+
+Incremental runs recompute only listings that changed since the previous run,
+listings that lost a neighbour, and listings whose current top-k a changed
+listing now beats. IDF weights drift as the catalogue grows, so schedule a
+periodic full rebuild as well.
+"""
+import re
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from .listing_search import published_listings
+from .models import SimilarListing
+
+TOKEN_PATTERN = re.compile(r'[^\W\d_]{2,}')
+STOP_WORDS = frozenset(
+    'an and are as at be by for from has have in is it its of on or our that the this to was we with you your'.split()
+)
+# Repeating the tokens of a field gives it more weight in the term counts
+FIELD_WEIGHTS = [('title', 3), ('tags', 2), ('category', 2), ('description', 1)]
+# Terms in more than this share of listings say nothing about similarity and make products dense
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+DEFAULT_TOP_K = 10
+DEFAULT_CHUNK_SIZE = 1000
+MIN_SIMILARITY = 0.05
+READ_CHUNK_SIZE = 2000
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+def _terms(texts):
+    """Weighted term counts of one listing"""
+    terms = Counter()
+    for (_, weight), text in zip(FIELD_WEIGHTS, texts):
+        for token in TOKEN_PATTERN.findall((text or '').lower()):
+            if token not in STOP_WORDS:
+                terms[token] += weight
+    return terms
+
+
+def build_matrix():
+    """
+    Return (listing ids, TF-IDF matrix) for every published listing; row i of
+    the L2-normalized CSR matrix belongs to ids[i]
+    """
+    vocabulary = {}
+    ids, indptr, indices, counts = [], [0], [], []
+    rows = published_listings().order_by('pk').values_list(
+        'pk', *[field for field, _ in FIELD_WEIGHTS]
+    ).iterator(chunk_size=READ_CHUNK_SIZE)
+    for pk, *texts in rows:
+        for token, count in _terms(texts).items():
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            counts.append(count)
+        ids.append(pk)
+        indptr.append(len(indices))
+
+    documents = len(ids)
+    matrix = sparse.csr_matrix(
+        (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(documents, len(vocabulary)),
+    )
+    if not documents:
+        return np.asarray(ids, dtype=np.int64), matrix
+
+    # Sublinear term frequency and smoothed inverse document frequency
+    matrix.data = 1.0 + np.log(matrix.data)
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + documents) / (1 + document_frequency)) + 1.0
+    if documents > 1:
+        idf[document_frequency > MAX_DOCUMENT_FREQUENCY * documents] = 0.0
+    matrix = (matrix @ sparse.diags(idf)).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = (sparse.diags(1.0 / norms) @ matrix).tocsr()
+    matrix.eliminate_zeros()
+    return np.asarray(ids, dtype=np.int64), matrix
+
+
+def top_neighbours(matrix, rows, top_k):
+    """Yield (row, neighbour rows, scores) best first for each of `rows`"""
+    product = (matrix[rows] @ matrix.T).tocsr()
+    for position, row in enumerate(rows):
+        start, end = product.indptr[position], product.indptr[position + 1]
+        columns, scores = product.indices[start:end], product.data[start:end]
+        keep = (columns != row) & (scores >= MIN_SIMILARITY)
+        columns, scores = columns[keep], scores[keep]
+        if len(scores) > top_k:
+            # Keep everything tied with the k-th score so ties resolve by id, not partition order
+            kth = -np.partition(-scores, top_k - 1)[top_k - 1]
+            columns, scores = columns[scores >= kth], scores[scores >= kth]
+        order = np.lexsort((columns, -scores))[:top_k]
+        yield row, columns[order], scores[order]
+
+
+@transaction.atomic
+def _store(ids, neighbours, now):
+    """Replace the stored neighbours of every listing in `neighbours`"""
+    SimilarListing.objects.filter(listing_id__in=[int(ids[row]) for row, _, _ in neighbours]).delete()
+    SimilarListing.objects.bulk_create([
+        SimilarListing(
+            listing_id=int(ids[row]),
+            similar_id=int(ids[column]),
+            rank=rank,
+            score=float(score),
+            computed_at=now,
+        )
+        for row, columns, scores in neighbours
+        for rank, (column, score) in enumerate(zip(columns, scores), start=1)
+    ])
+
+
+def _compute(ids, matrix, rows, top_k, chunk_size, now):
+    """Recompute and store the neighbours of `rows` in chunks; returns how many listings were written"""
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        _store(ids, list(top_neighbours(matrix, chunk, top_k)), now)
+    return len(rows)
+
+
+def _drop_unpublished():
+    """Forget listings that left the published set; returns the listings that lost a neighbour"""
+    published = published_listings().values('pk')
+    SimilarListing.objects.exclude(listing_id__in=published).delete()
+    orphaned = SimilarListing.objects.exclude(similar_id__in=published)
+    affected = set(orphaned.values_list('listing_id', flat=True).distinct())
+    orphaned.delete()
+    return affected
+
+
+def _affected_rows(ids, matrix, changed_rows, top_k, chunk_size):
+    """Rows whose stored top-k a changed listing would now enter"""
+    lowest = np.full(len(ids), MIN_SIMILARITY)
+    full = np.zeros(len(ids), dtype=bool)
+    position = {pk: row for row, pk in enumerate(ids.tolist())}
+    for listing_id, count, low in SimilarListing.objects.values('listing_id').annotate(
+        count=Count('pk'), low=Min('score')
+    ).values_list('listing_id', 'count', 'low').iterator(chunk_size=READ_CHUNK_SIZE):
+        row = position.get(listing_id)
+        if row is not None and count >= top_k:
+            lowest[row], full[row] = low, True
+
+    affected = set()
+    for start in range(0, len(changed_rows), chunk_size):
+        best = np.asarray(
+            (matrix[changed_rows[start:start + chunk_size]] @ matrix.T).max(axis=0).todense()
+        ).ravel()
+        beats = np.where(full, best > lowest, best >= MIN_SIMILARITY)
+        affected.update(np.nonzero(beats)[0].tolist())
+    return affected
+
+
+def build_similar_listings(full=False, top_k=DEFAULT_TOP_K, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Refresh SimilarListing; a full run recomputes every published listing,
+    otherwise only the rows affected since the previous run
+    Returns the number of listings whose neighbours were written
+    """
+    now = timezone.now()
+    since = None if full else SimilarListing.objects.aggregate(at=Max('computed_at'))['at']
+    lost_neighbour = _drop_unpublished()
+    ids, matrix = build_matrix()
+    if not len(ids):
+        return 0
+    if since is None:
+        return _compute(ids, matrix, list(range(len(ids))), top_k, chunk_size, now)
+
+    position = {pk: row for row, pk in enumerate(ids.tolist())}
+    changed_ids = set(published_listings().filter(
+        updated_at__gt=since - REFRESH_OVERLAP
+    ).values_list('pk', flat=True))
+    changed_rows = sorted(position[pk] for pk in changed_ids if pk in position)
+    if not changed_rows and not lost_neighbour:
+        return 0
+
+    affected = set(changed_rows)
+    affected.update(position[pk] for pk in lost_neighbour if pk in position)
+    # Listings that list a changed listing need its new score
+    affected.update(
+        position[pk]
+        for pk in SimilarListing.objects.filter(similar_id__in=changed_ids).values_list('listing_id', flat=True)
+        if pk in position
+    )
+    affected |= _affected_rows(ids, matrix, changed_rows, top_k, chunk_size)
+    return _compute(ids, matrix, sorted(affected), top_k, chunk_size, now)
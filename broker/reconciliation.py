@@ -0,0 +1,163 @@
+"""
+Wallet reconciliation helpers
+Streams wallet balances and completed transaction totals per user and compares
+them in vectorized batches to find wallets that drifted from the ledger
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Case, DecimalField, F, Max, Min, Sum, Value, When
+
+from .models import Transaction, Wallet
+
+# Completed transactions of these types add to the wallet, every other type spends from it
+CREDIT_TYPES = [Transaction.TransactionType.DEPOSIT]
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def to_cents(amount):
+    """Convert a Decimal amount into an integer number of cents"""
+    return int((amount or Decimal('0')) * 100)
+
+
+def user_id_bounds():
+    """Return the (min, max) user id holding a wallet or a transaction"""
+    wallet_bounds = Wallet.objects.aggregate(low=Min('user_id'), high=Max('user_id'))
+    ledger_bounds = Transaction.objects.aggregate(low=Min('user_id'), high=Max('user_id'))
+    lows = [b['low'] for b in (wallet_bounds, ledger_bounds) if b['low'] is not None]
+    highs = [b['high'] for b in (wallet_bounds, ledger_bounds) if b['high'] is not None]
+    if not lows:
+        return None, None
+    return min(lows), max(highs)
+
+
+def split_user_range(low, high, parts):
+    """Split the inclusive user id range [low, high] into at most `parts` contiguous ranges"""
+    if low is None:
+        return []
+    parts = max(1, min(parts, high - low + 1))
+    edges = np.linspace(low, high + 1, parts + 1).astype(np.int64)
+    return [(int(edges[i]), int(edges[i + 1]) - 1) for i in range(parts) if edges[i] < edges[i + 1]]
+
+
+def ledger_totals(low, high, chunk_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream (user_id, signed completed total) rows for users in [low, high]
+    ordered by user id, using a server-side cursor where the backend supports it
+    """
+    signed_amount = Case(
+        When(transaction_type__in=CREDIT_TYPES, then=F('amount')),
+        default=F('amount') * Value(-1),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    return (
+        Transaction.objects
+        .filter(status=Transaction.TransactionStatus.COMPLETED, user_id__gte=low, user_id__lte=high)
+        .order_by()
+        .values('user_id')
+        .annotate(total=Sum(signed_amount))
+        .order_by('user_id')
+        .values_list('user_id', 'total')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def wallet_balances(low, high, chunk_size=DEFAULT_BATCH_SIZE):
+    """Stream (user_id, balance) rows for wallets in [low, high] ordered by user id"""
+    return (
+        Wallet.objects
+        .filter(user_id__gte=low, user_id__lte=high)
+        .order_by('user_id')
+        .values_list('user_id', 'balance')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _take(rows, size):
+    """Pull up to `size` rows from a stream into (ids, cents) NumPy arrays"""
+    ids = np.empty(size, dtype=np.int64)
+    cents = np.empty(size, dtype=np.int64)
+    count = 0
+    while count < size:
+        row = next(rows, None)
+        if row is None:
+            break
+        ids[count] = row[0]
+        cents[count] = to_cents(row[1])
+        count += 1
+    return ids[:count], cents[:count]
+
+
+def compare_batch(wallet_ids, wallet_cents, ledger_ids, ledger_cents, tolerance_cents=0):
+    """
+    Compare one batch of wallet balances against ledger totals
+    Both id arrays must be sorted; users missing on either side count as zero
+    Returns a list of (user_id, wallet_cents, ledger_cents, has_wallet) discrepancies
+    """
+    user_ids = np.union1d(wallet_ids, ledger_ids)
+    balances = np.zeros(len(user_ids), dtype=np.int64)
+    expected = np.zeros(len(user_ids), dtype=np.int64)
+    has_wallet = np.zeros(len(user_ids), dtype=bool)
+
+    wallet_pos = np.searchsorted(user_ids, wallet_ids)
+    balances[wallet_pos] = wallet_cents
+    has_wallet[wallet_pos] = True
+    expected[np.searchsorted(user_ids, ledger_ids)] = ledger_cents
+
+    mismatched = np.flatnonzero(np.abs(balances - expected) > tolerance_cents)
+    return [
+        (int(user_ids[i]), int(balances[i]), int(expected[i]), bool(has_wallet[i]))
+        for i in mismatched
+    ]
+
+
+def reconcile_range(low, high, batch_size=DEFAULT_BATCH_SIZE, tolerance_cents=0):
+    """
+    Reconcile every user in the inclusive id range [low, high]
+    Walks both sorted streams in lockstep so that memory stays O(batch_size)
+    Returns (users_checked, discrepancies)
+    """
+    wallets = wallet_balances(low, high, batch_size)
+    ledger = ledger_totals(low, high, batch_size)
+    discrepancies = []
+    checked = 0
+
+    wallet_ids, wallet_cents = _take(wallets, batch_size)
+    ledger_ids, ledger_cents = _take(ledger, batch_size)
+    while len(wallet_ids) or len(ledger_ids):
+        # A full batch means its stream may hold more rows, so only compare up to
+        # the highest id every unfinished stream has already reached
+        cutoffs = [ids[-1] for ids in (wallet_ids, ledger_ids) if len(ids) == batch_size]
+        cutoff = min(cutoffs) if cutoffs else high
+
+        w_end = np.searchsorted(wallet_ids, cutoff, side='right')
+        l_end = np.searchsorted(ledger_ids, cutoff, side='right')
+        batch = compare_batch(
+            wallet_ids[:w_end], wallet_cents[:w_end],
+            ledger_ids[:l_end], ledger_cents[:l_end],
+            tolerance_cents,
+        )
+        discrepancies.extend(batch)
+        checked += len(np.union1d(wallet_ids[:w_end], ledger_ids[:l_end]))
+
+        wallet_ids, wallet_cents = _refill(wallet_ids[w_end:], wallet_cents[w_end:], wallets, batch_size)
+        ledger_ids, ledger_cents = _refill(ledger_ids[l_end:], ledger_cents[l_end:], ledger, batch_size)
+
+    return checked, discrepancies
+
+
+def _refill(ids, cents, rows, size):
+    """Top up the carried-over tail of a batch from its stream"""
+    more_ids, more_cents = _take(rows, size - len(ids))
+    return np.concatenate([ids, more_ids]), np.concatenate([cents, more_cents])
+
+
+def reconcile_worker(bounds, batch_size=DEFAULT_BATCH_SIZE, tolerance_cents=0):
+    """Process pool entry point; each worker opens its own database connection"""
+    from django.db import connections
+
+    try:
+        return reconcile_range(bounds[0], bounds[1], batch_size, tolerance_cents)
+    finally:
+        connections.close_all()
@@ -1,10 +1,28 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
 from django.contrib.auth import get_user_model
-from .models import UserProfile, SocialLink, Wallet
+from .models import (
+    UserProfile, SocialLink, Wallet, Promotion,
+    BusinessProfile, BusinessMember, Campaign, CampaignCollaborator, AccessGrant,
+    CampaignProduct, PromotionClaim, Message, Listing, AttachmentUpload
+)
+from . import access
+from .campaign_stats import mark_stats_dirty
+from .tagging import sync_listing_tags
+from .listing_search import SEARCH_FIELDS, update_search_vectors
+from .listing_expiry import default_expiry
+from .inbox import record_message
+from .realtime import publish_message
+from . import message_search
+from .attachments import remove_file
+from .message_archive import archiving
 
 User = get_user_model()
 
+# Sent after commit by the campaign scheduler with campaign_ids, from_status and to_status
+campaign_status_changed = Signal()
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
@@ -31,3 +49,128 @@ def ensure_user_has_profile(sender, instance, created, **kwargs):
     """
     if not created:  # Only for updates
         UserProfile.objects.get_or_create(user=instance)
+
+@receiver(post_save, sender=Promotion)
+def rebalance_claim_counters(sender, instance, created, **kwargs):
+    """
+    Keep counter shards in line with counter_shards and max_claims.
+    Folding on every save also means switching sharding off never loses claims.
+    """
+    from .claims import compact_claim_counters
+
+    if instance.counter_shards or (not created and instance.claim_counters.exists()):
+        compact_claim_counters(instance.pk)
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def invalidate_promotion_feed_cache(sender, instance, **kwargs):
+    """
+    Drop cached promotion feeds whenever a promotion is written.
+    Start/end boundaries are handled by the feed's own cache timeout.
+    """
+    from .promotion_feed import invalidate_promotion_feed
+
+    invalidate_promotion_feed()
+
+
+# Access grants: keep the materialized access index in step with its sources.
+# Deletions cascading from a user skip the per-user recompute, since that
+# user's grants are removed by the same cascade.
+
+@receiver(post_save, sender=BusinessProfile)
+def sync_business_owner_access(sender, instance, **kwargs):
+    access.sync_business_owner(instance.pk)
+
+@receiver(post_delete, sender=BusinessProfile)
+def revoke_business_access(sender, instance, **kwargs):
+    access.revoke_object_access(AccessGrant.ObjectType.BUSINESS, instance.pk)
+
+@receiver(post_save, sender=BusinessMember)
+@receiver(post_delete, sender=BusinessMember)
+def sync_member_access(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, User):
+        access.sync_user_memberships(instance.user_id)
+
+@receiver(post_save, sender=Campaign)
+def sync_campaign_access(sender, instance, **kwargs):
+    access.sync_campaign_access(instance.pk)
+
+@receiver(post_delete, sender=Campaign)
+def revoke_campaign_access(sender, instance, **kwargs):
+    access.revoke_object_access(AccessGrant.ObjectType.CAMPAIGN, instance.pk)
+
+@receiver(post_save, sender=CampaignCollaborator)
+@receiver(post_delete, sender=CampaignCollaborator)
+def sync_collaborator_access(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, User):
+        access.sync_user_collaborations(instance.user_id)
+
+
+# Campaign rollups pick up inserts and updates from timestamps; deletions and
+# promotions moving between campaigns leave none, so they flag the rollup instead.
+
+@receiver(post_delete, sender=CampaignProduct)
+@receiver(post_delete, sender=CampaignCollaborator)
+def mark_campaign_stats_dirty(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Campaign):
+        mark_stats_dirty([instance.campaign_id])
+
+@receiver(pre_save, sender=Promotion)
+def mark_previous_campaign_stats_dirty(sender, instance, **kwargs):
+    if instance.pk:
+        previous = Promotion.objects.filter(pk=instance.pk).values_list('campaign_id', flat=True).first()
+        if previous != instance.campaign_id:
+            mark_stats_dirty([previous])
+
+@receiver(post_delete, sender=Promotion)
+def mark_promotion_campaign_stats_dirty(sender, instance, **kwargs):
+    mark_stats_dirty([instance.campaign_id])
+
+@receiver(post_delete, sender=PromotionClaim)
+def mark_claim_campaign_stats_dirty(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Promotion):
+        mark_stats_dirty(
+            Promotion.objects.filter(pk=instance.promotion_id).values_list('campaign_id', flat=True)
+        )
+
+@receiver(post_delete, sender=Message)
+def mark_order_campaign_stats_dirty(sender, instance, **kwargs):
+    # Archived orders still count towards the rollups, so archiving changes nothing there
+    if instance.message_type == Message.MessageType.ORDER and not archiving.get():
+        mark_stats_dirty(
+            CampaignProduct.objects.filter(
+                listing__conversations=instance.conversation_id
+            ).values_list('campaign_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=Listing)
+def sync_listing_tag_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'tags' in update_fields:
+        sync_listing_tags([(instance.pk, instance.tags)])
+
+@receiver(post_save, sender=Listing)
+def refresh_listing_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {field for field, _ in SEARCH_FIELDS} & set(update_fields):
+        update_search_vectors(Listing.objects.filter(pk=instance.pk))
+
+@receiver(pre_save, sender=Listing)
+def set_listing_expiry(sender, instance, **kwargs):
+    if instance.status == Listing.ListingStatus.PUBLISHED and instance.expires_at is None:
+        instance.expires_at = default_expiry(instance.listing_type)
+
+
+@receiver(post_save, sender=Message)
+def update_conversation_inbox(sender, instance, created, **kwargs):
+    if created:
+        record_message(instance)
+        publish_message(instance)
+
+@receiver(post_save, sender=Message)
+def refresh_message_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'content' in update_fields:
+        message_search.update_search_vectors(Message.objects.filter(pk=instance.pk))
+
+@receiver(post_delete, sender=AttachmentUpload)
+def delete_attachment_file(sender, instance, **kwargs):
+    transaction.on_commit(lambda: remove_file(instance))
@@ -0,0 +1,132 @@
+"""
+Listing tag index
+Parses the free-text Listing.tags field into normalized Tag rows linked through
+ListingTag, so tag filters are indexed equality lookups instead of icontains
+scans, and serves a cached tag cloud over published listings
+"""
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .cache_versions import bump_cache_version, versioned_key
+from .models import Listing, ListingTag, Tag
+
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+TAG_SEPARATORS = re.compile(r'[,;\n]+')
+SYNC_BATCH_SIZE = 1000
+
+TAG_CLOUD_CACHE_SECONDS = 600
+TAG_CLOUD_CACHE_NAME = 'tag_cloud'
+
+
+def normalize_tag(raw):
+    """Lowercase, drop a leading '#', collapse whitespace; '' when nothing is left"""
+    return ' '.join(raw.strip().lstrip('#').lower().split())[:TAG_MAX_LENGTH].strip()
+
+
+def parse_tags(text):
+    """Distinct normalized tags from a comma, semicolon or newline separated string"""
+    tags = []
+    for raw in TAG_SEPARATORS.split(text or ''):
+        tag = normalize_tag(raw)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def parse_tag_query(value):
+    """Tags from a comma separated query parameter"""
+    return parse_tags(value.replace(';', ','))
+
+
+def _tag_ids(names):
+    """{name: id}, creating the tags that do not exist yet"""
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+@transaction.atomic
+def sync_listing_tags(listings):
+    """
+    Make the ListingTag rows of each (listing id, tags text) pair match its text
+    Returns the number of links added plus removed
+    """
+    desired = {pk: parse_tags(text) for pk, text in listings}
+    if not desired:
+        return 0
+    tag_ids = _tag_ids({name for names in desired.values() for name in names})
+    wanted = {(pk, tag_ids[name]) for pk, names in desired.items() for name in names}
+
+    current = {
+        (listing_id, tag_id): pk
+        for pk, listing_id, tag_id in ListingTag.objects.filter(
+            listing_id__in=desired
+        ).values_list('pk', 'listing_id', 'tag_id')
+    }
+    stale = [pk for key, pk in current.items() if key not in wanted]
+    fresh = wanted - current.keys()
+    if stale:
+        ListingTag.objects.filter(pk__in=stale).delete()
+    ListingTag.objects.bulk_create(
+        [ListingTag(listing_id=listing_id, tag_id=tag_id) for listing_id, tag_id in fresh],
+        ignore_conflicts=True,
+    )
+    if stale or fresh:
+        transaction.on_commit(invalidate_tag_cloud)
+    return len(stale) + len(fresh)
+
+
+def backfill_listing_tags(batch_size=SYNC_BATCH_SIZE):
+    """Re-sync the tag index of every listing in primary key batches; returns (listings, changes)"""
+    last_pk, listings, changes = 0, 0, 0
+    while True:
+        batch = list(
+            Listing.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'tags')[:batch_size]
+        )
+        if not batch:
+            return listings, changes
+        changes += sync_listing_tags(batch)
+        listings += len(batch)
+        last_pk = batch[-1][0]
+
+
+def filter_any_tags(queryset, names):
+    """Listings carrying at least one of the tags"""
+    return queryset.filter(pk__in=ListingTag.objects.filter(tag__name__in=names).values('listing_id'))
+
+
+def filter_all_tags(queryset, names):
+    """Listings carrying every one of the tags"""
+    matching = ListingTag.objects.filter(tag__name__in=names).values('listing_id').annotate(
+        matched=Count('tag_id')
+    ).filter(matched=len(names)).values('listing_id')
+    return queryset.filter(pk__in=matching)
+
+
+def invalidate_tag_cloud():
+    """Drop every cached tag cloud"""
+    bump_cache_version(TAG_CLOUD_CACHE_NAME)
+
+
+def tag_cloud(limit):
+    """
+    The `limit` most used tags on published, active listings as [{name, count}]
+    Tag edits invalidate it at once; publishing or archiving shows up within
+    TAG_CLOUD_CACHE_SECONDS
+    """
+    cache_key = versioned_key(TAG_CLOUD_CACHE_NAME, limit)
+    cloud = cache.get(cache_key)
+    if cloud is None:
+        cloud = list(
+            ListingTag.objects.filter(
+                listing__status=Listing.ListingStatus.PUBLISHED,
+                listing__is_active=True,
+            ).values('tag__name').annotate(count=Count('listing_id')).order_by('-count', 'tag__name')[:limit]
+        )
+        cloud = [{'name': row['tag__name'], 'count': row['count']} for row in cloud]
+        cache.set(cache_key, cloud, TAG_CLOUD_CACHE_SECONDS)
+    return cloud
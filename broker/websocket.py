@@ -0,0 +1,83 @@
+"""
+WebSocket endpoint for real-time chat
+Served by config.asgi at /ws/chat/?token=<JWT access token>. After the
+handshake the socket receives a JSON event for every message created in the
+user's conversations; clients that reconnect catch up through the message
+history `after` cursor
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .realtime import SubscriptionOverflow, get_pubsub, user_channel
+
+CHAT_PATH = '/ws/chat/'
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+# The client missed events and should refetch before reconnecting
+CLOSE_RESYNC = 4409
+
+
+@sync_to_async
+def authenticate(scope):
+    """The active user behind the token query parameter, or None"""
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI application for websocket scopes"""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if scope['path'] != CHAT_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    user = await authenticate(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    subscription = await get_pubsub().subscribe(user_channel(user.pk))
+    await send({'type': 'websocket.accept'})
+    incoming = asyncio.ensure_future(receive())
+    outgoing = asyncio.ensure_future(subscription.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({incoming, outgoing}, return_when=asyncio.FIRST_COMPLETED)
+            if incoming in done:
+                message = incoming.result()
+                if message['type'] == 'websocket.disconnect':
+                    return
+                if _is_ping(message):
+                    await send({'type': 'websocket.send', 'text': json.dumps({'type': 'pong'})})
+                incoming = asyncio.ensure_future(receive())
+            if outgoing in done:
+                try:
+                    event = outgoing.result()
+                except SubscriptionOverflow:
+                    await send({'type': 'websocket.close', 'code': CLOSE_RESYNC})
+                    return
+                await send({'type': 'websocket.send', 'text': json.dumps(event, cls=DjangoJSONEncoder)})
+                outgoing = asyncio.ensure_future(subscription.get())
+    finally:
+        subscription.close()
+        for task in (incoming, outgoing):
+            task.cancel()
+
+
+def _is_ping(message):
+    try:
+        return json.loads(message.get('text') or '{}').get('type') == 'ping'
+    except (ValueError, AttributeError):
+        return False
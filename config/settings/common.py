@@ -1,5 +1,5 @@
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from .theme import JAZZMIN_UI_TWEAKS as THEME_UI_TWEAKS
 from datetime import timedelta
 
@@ -57,6 +57,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -79,6 +80,11 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = "/static/"
+# Chat attachments, written chunk by chunk by broker.attachments
+ATTACHMENT_ROOT = BASE_DIR / "attachments"
+# Hosts document images may be fetched from by `manage.py hash_documents`, e.g. "docs.example-cdn.com"
+# (subdomains included); empty allows any public host
+DOCUMENT_IMAGE_HOSTS = config("DOCUMENT_IMAGE_HOSTS", default="", cast=Csv(post_process=lambda hosts: [host.lower() for host in hosts]))
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -101,6 +107,18 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Per-process by default; deployments with several workers should set CACHE_BACKEND/CACHE_LOCATION
+# to a shared cache so invalidation (e.g. the promotion feed version) reaches all of them
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+
+# Real-time chat pub/sub; InMemoryPubSub only reaches sockets on the same process
+REALTIME_PUBSUB_BACKEND = "broker.realtime.InMemoryPubSub"
+
 # Django Jazzmin Settings
 JAZZMIN_SETTINGS = {
     # title of the window (Will default to current_admin_site.site_title if absent or None)